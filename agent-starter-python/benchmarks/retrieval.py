@@ -0,0 +1,281 @@
+"""Per-stage latency benchmark for the ``answer`` / ``retrieve_info`` tools.
+
+Runs the real ``Assistant`` code paths against the local stand-ins in
+``benchmarks.standins`` and reports p50/p95/p99 for embedding, vector search,
+escalation and total tool time. Results are written as JSON; pass
+``--compare`` with an earlier result to print the deltas.
+
+    uv run python -m benchmarks.retrieval --concurrency 16 --kb-size 5000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import numpy as np
+from openai import AsyncOpenAI
+
+import agent
+from agent import Assistant, send_escalation
+from embedding_cache import EmbeddingCache
+from embeddings import EmbeddingClient
+from escalation_outbox import EscalationOutbox
+from firebase_client import FirebaseClient
+from kb_index import LocalVectorIndex
+
+from .standins import FakeEmbeddingsServer, FakeFirebaseServer, kb_question
+
+STAGES = ("embedding", "search", "escalation", "total")
+
+_timings: ContextVar[Optional[dict[str, float]]] = ContextVar("timings", default=None)
+_active: ContextVar[frozenset] = ContextVar("active", default=frozenset())
+
+
+def timed(stage: str, fn):
+    """Wrap coroutine ``fn`` so its duration adds to ``stage`` of the current request.
+
+    Nested calls of the same stage (``embed_many`` -> ``embed``) count once.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        active = _active.get()
+        if stage in active:
+            return await fn(*args, **kwargs)
+        token = _active.set(active | {stage})
+        started = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            _active.reset(token)
+            timings = _timings.get()
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+    return wrapper
+
+
+def instrument(assistant: Assistant) -> None:
+    embedder = assistant.embedder
+    embedder.embed = timed("embedding", embedder.embed)
+    embedder.embed_many = timed("embedding", embedder.embed_many)
+    assistant._vector_search_many = timed("search", assistant._vector_search_many)
+    assistant.post_user_query = timed("escalation", assistant.post_user_query)
+
+
+def fake_job_context(room_name: str = "bench-room") -> SimpleNamespace:
+    participant = SimpleNamespace(attributes={"user_id": "bench-user"})
+    return SimpleNamespace(
+        room=SimpleNamespace(name=room_name, remote_participants={"p": participant}),
+        job=SimpleNamespace(id="bench-job"),
+    )
+
+
+class _Session:
+    """Stands in for AgentSession when ``answer`` speaks a KB hit itself."""
+
+    def say(self, text: str, **kwargs) -> None:
+        return None
+
+
+def summarize(samples: list[float]) -> dict[str, Any]:
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def git_commit() -> Optional[str]:
+    with contextlib.suppress(Exception):
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    return None
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    embeddings = FakeEmbeddingsServer(latency=args.embed_latency_ms / 1000)
+    firebase_server = FakeFirebaseServer(
+        kb_size=args.kb_size,
+        search_latency=args.search_latency_ms / 1000,
+        addquery_latency=args.addquery_latency_ms / 1000,
+    )
+    await embeddings.start()
+    await firebase_server.start()
+
+    openai_client = AsyncOpenAI(base_url=embeddings.base_url, api_key="bench")
+    embedder = EmbeddingClient(
+        client=openai_client,
+        cache=EmbeddingCache() if args.embedding_cache else None,
+    )
+    firebase = FirebaseClient(firebase_server.url)
+    kb_index = None
+    if args.local_index:
+        kb_index = LocalVectorIndex()
+        for doc_id, doc in firebase_server.kb_docs():
+            kb_index.upsert(doc_id, doc)
+        kb_index.mark_synced()
+    outbox = None
+    if args.outbox:
+        outbox = EscalationOutbox(functools.partial(send_escalation, firebase))
+
+    assistant = Assistant(
+        kb_index=kb_index, embedder=embedder, firebase=firebase, outbox=outbox
+    )
+    assistant.FIREBASE_URL = firebase_server.url
+    instrument(assistant)
+    agent.get_job_context = fake_job_context
+    context = SimpleNamespace(session=_Session())
+
+    rng = np.random.default_rng(args.seed)
+    queries = [
+        kb_question(int(rng.integers(max(args.kb_size, 1))))
+        if rng.random() < args.hit_ratio
+        else f"do you offer the unusual treatment number {i}"
+        for i in range(args.requests)
+    ]
+
+    samples: dict[str, list[float]] = {stage: [] for stage in STAGES}
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(query: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            timings: dict[str, float] = {}
+            _timings.set(timings)
+            started = time.perf_counter()
+            try:
+                if args.tool == "answer":
+                    await assistant.answer(context, query)
+                else:
+                    await assistant.retrieve_info(context, query)
+            except Exception:
+                errors += 1
+                logging.getLogger("agent").exception("Benchmark request failed")
+                return
+            timings["total"] = time.perf_counter() - started
+            for stage, seconds in timings.items():
+                samples[stage].append(seconds)
+
+    # open the connection pools before measuring
+    for i in range(args.warmup):
+        await assistant.retrieve_info(context, f"warm up request {i}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    wall = time.perf_counter() - started
+
+    if outbox is not None:
+        await outbox.aclose()
+        outbox.close()
+    await embedder.aclose()
+    await firebase.aclose()
+    await openai_client.close()
+    await embeddings.stop()
+    await firebase_server.stop()
+
+    return {
+        "benchmark": "retrieval",
+        "git_commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            k: v for k, v in vars(args).items() if k not in ("output", "compare")
+        },
+        "requests": args.requests,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(args.requests / wall, 1) if wall else 0.0,
+        "stages": {stage: summarize(samples[stage]) for stage in STAGES},
+        "standins": {
+            "embedding_requests": embeddings.requests,
+            "embedding_inputs": embeddings.inputs,
+            "firebase_requests": firebase_server.requests,
+            "escalations": len(firebase_server.queries),
+        },
+        "note": "standin request counts include the warmup requests",
+    }
+
+
+def compare(result: dict[str, Any], baseline: dict[str, Any]) -> str:
+    lines = [f"vs {baseline.get('git_commit') or 'baseline'}:"]
+    for stage in STAGES:
+        new, old = result["stages"].get(stage, {}), baseline["stages"].get(stage, {})
+        if not new.get("count") or not old.get("count"):
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = new[key] - old[key]
+            pct = 100.0 * change / old[key] if old[key] else 0.0
+            deltas.append(f"{key[:-3]} {new[key]:.1f}ms ({change:+.1f}ms, {pct:+.0f}%)")
+        lines.append(f"  {stage:<10} " + ", ".join(deltas))
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tool", choices=("answer", "retrieve_info"), default="answer")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--kb-size", type=int, default=1000)
+    parser.add_argument(
+        "--hit-ratio", type=float, default=0.7, help="share of queries the KB answers"
+    )
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0)
+    parser.add_argument("--search-latency-ms", type=float, default=20.0)
+    parser.add_argument("--addquery-latency-ms", type=float, default=60.0)
+    parser.add_argument(
+        "--local-index", action="store_true", help="search an in-process KB copy"
+    )
+    parser.add_argument("--embedding-cache", action="store_true")
+    parser.add_argument(
+        "--outbox", action="store_true", help="escalate through the SQLite outbox"
+    )
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark-retrieval.json")
+    parser.add_argument("--compare", help="earlier result JSON to diff against")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=os.environ.get("BENCH_LOG_LEVEL", "WARNING"))
+    result = asyncio.run(run(args))
+
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result["stages"], indent=2))
+    print(
+        f"{result['throughput_rps']} req/s, {result['errors']} errors -> {args.output}"
+    )
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(result, json.load(f)))
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
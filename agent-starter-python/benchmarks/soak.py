@@ -0,0 +1,564 @@
+"""Multi-room soak test: how many concurrent calls one worker process can host.
+
+Ramps up the number of ``AgentSession``s running the real ``Assistant`` in
+this process, each with scripted STT/LLM/TTS from ``benchmarks.voice_fakes``
+and the HITL/embeddings stand-ins running on their own thread. Every simulated
+caller asks a question, waits for the agent to finish speaking, pauses and asks
+again. Per step it records turn latency (end of user speech to first agent
+audio), event-loop lag, RSS, open sockets and default thread-pool usage, and
+the report names the largest room count that stayed within the limits.
+
+    uv run python -m benchmarks.soak --rooms 1,5,10,20,40 --step-seconds 60
+"""
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import numpy as np
+import psutil
+from livekit.agents import (
+    AgentSession,
+    AgentStateChangedEvent,
+    MetricsCollectedEvent,
+    UserInputTranscribedEvent,
+    metrics,
+)
+from openai import AsyncOpenAI
+
+import agent
+from agent import Assistant, send_escalation
+from answer_cache import SemanticAnswerCache
+from embedding_cache import EmbeddingCache
+from embeddings import EmbeddingClient
+from escalation_outbox import EscalationOutbox
+from firebase_client import FirebaseClient
+from kb_index import LocalVectorIndex
+from turn_tracing import TurnTracer
+
+from .retrieval import git_commit, summarize
+from .standins import FakeEmbeddingsServer, FakeFirebaseServer, kb_question
+from .voice_fakes import (
+    FakeTTS,
+    PlayoutClock,
+    ScriptedLLM,
+    ScriptedSTT,
+    SilentAudioInput,
+)
+
+logger = logging.getLogger("agent")
+
+_job: contextvars.ContextVar[SimpleNamespace] = contextvars.ContextVar("job")
+
+
+def current_job() -> SimpleNamespace:
+    """``get_job_context`` for whichever simulated room the calling task belongs to."""
+    return _job.get()
+
+
+class StandinThread:
+    """Runs the stand-in servers on their own loop so they don't skew the agent's."""
+
+    def __init__(self, *servers) -> None:
+        self.servers = servers
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="standins", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+        for server in self.servers:
+            asyncio.run_coroutine_threadsafe(server.start(), self.loop).result()
+
+    def stop(self) -> None:
+        for server in self.servers:
+            asyncio.run_coroutine_threadsafe(server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    @property
+    def ports(self) -> set[int]:
+        return {int(server.url.rsplit(":", 1)[1]) for server in self.servers}
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """The loop's default executor, counting its own work to report pool usage."""
+
+    def __init__(self) -> None:
+        super().__init__(thread_name_prefix="asyncio")
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self._counts_lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._counts_lock:
+            self.submitted += 1
+        future = super().submit(self._run, fn, *args, **kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    @property
+    def busy(self) -> int:
+        return self.started - self.completed
+
+    @property
+    def queued(self) -> int:
+        return self.submitted - self.started - self.cancelled
+
+    def _run(self, fn, *args, **kwargs):
+        with self._counts_lock:
+            self.started += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._counts_lock:
+                self.completed += 1
+
+    def _on_done(self, future) -> None:
+        if future.cancelled():
+            with self._counts_lock:
+                self.cancelled += 1
+
+
+class Window:
+    """Samples collected during one ramp step."""
+
+    def __init__(self) -> None:
+        self.response: list[float] = []
+        self.turn: list[float] = []
+        self.loop_lag: list[float] = []
+        self.rss: list[int] = []
+        self.sockets: list[int] = []
+        self.threads: list[int] = []
+        self.pool_busy: list[int] = []
+        self.pool_queued: list[int] = []
+        self.turns = 0
+        self.timeouts = 0
+        self.errors = 0
+
+
+class Room:
+    """One simulated call: a session, its caller, and the caller's script."""
+
+    def __init__(self, index: int, shared: dict, args: argparse.Namespace, rng):
+        self.index = index
+        self.shared = shared
+        self.args = args
+        self.rng = rng
+        self.name = f"soak-room-{index}"
+        self.window: Optional[Window] = None
+        self.task: Optional[asyncio.Task] = None
+        self.session: Optional[AgentSession] = None
+        self.assistant: Optional[Assistant] = None
+        self._first_audio = asyncio.Event()
+        self._first_audio_at = 0.0
+        self._listening = asyncio.Event()
+
+    def start(self) -> None:
+        participant = SimpleNamespace(attributes={"user_id": f"soak-user-{self.index}"})
+        job = SimpleNamespace(
+            room=SimpleNamespace(
+                name=self.name, remote_participants={"p": participant}
+            ),
+            job=SimpleNamespace(id=f"soak-job-{self.index}"),
+        )
+        # every task the session spawns inherits this room's job context
+        context = contextvars.copy_context()
+        context.run(_job.set, job)
+        self.task = context.run(asyncio.create_task, self._run(), name=self.name)
+
+    async def aclose(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            with contextlib.suppress(BaseException):
+                await self.task
+        if self.session is not None:
+            with contextlib.suppress(Exception):
+                await self.session.aclose()
+        if self.assistant is not None:
+            self.assistant.tracer.end_turn()
+
+    def _on_first_frame(self, at: float) -> None:
+        self._first_audio_at = at
+        self._first_audio.set()
+
+    async def _run(self) -> None:
+        args = self.args
+        caller = ScriptedSTT(word_interval=args.word_interval_ms / 1000)
+        self.session = session = AgentSession(
+            stt=caller,
+            llm=ScriptedLLM(ttft=args.llm_ttft_ms / 1000),
+            tts=FakeTTS(ttfb=args.tts_ttfb_ms / 1000),
+            turn_detection="stt",
+            min_endpointing_delay=args.endpointing_ms / 1000,
+            user_away_timeout=None,
+            # PlayoutClock can't pause
+            resume_false_interruption=False,
+        )
+        session.input.audio = SilentAudioInput()
+        session.output.audio = PlayoutClock(on_first_frame=self._on_first_frame)
+
+        self.assistant = assistant = Assistant(
+            kb_index=self.shared["kb_index"],
+            embedder=self.shared["embedder"],
+            firebase=self.shared["firebase"],
+            answer_cache=self.shared["answer_cache"],
+            outbox=self.shared["outbox"],
+            tracer=TurnTracer(room_name=self.name, job_id=f"soak-job-{self.index}"),
+        )
+        assistant.FIREBASE_URL = self.shared["firebase_url"]
+
+        # the entrypoint's session hooks, minus its usage logging
+        @session.on("user_input_transcribed")
+        def _on_user_input_transcribed(ev: UserInputTranscribedEvent):
+            assistant.prefetch.update(ev.transcript, ev.is_final)
+            if ev.is_final:
+                assistant.tracer.stt_final()
+
+        @session.on("agent_state_changed")
+        def _on_agent_state_changed(ev: AgentStateChangedEvent):
+            if ev.new_state == "speaking":
+                assistant.tracer.agent_speaking()
+            elif ev.new_state == "listening":
+                assistant.tracer.agent_listening()
+                self._listening.set()
+
+        @session.on("metrics_collected")
+        def _on_metrics_collected(ev: MetricsCollectedEvent):
+            assistant.tracer.observe_metrics(ev.metrics)
+            if assistant.answer_cache is not None and isinstance(
+                ev.metrics, metrics.LLMMetrics
+            ):
+                assistant.answer_cache.observe_llm_ttft(ev.metrics.ttft)
+
+        await session.start(agent=assistant)
+        # stagger the callers so their turns don't line up
+        await asyncio.sleep(self.rng.uniform(0, args.think_ms / 1000))
+
+        turn = 0
+        while True:
+            turn += 1
+            if self.rng.random() < args.hit_ratio:
+                query = kb_question(int(self.rng.integers(max(args.kb_size, 1))))
+            else:
+                query = f"do you offer the unusual treatment number {self.index}-{turn}"
+            await self._turn(caller, query)
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+    async def _turn(self, caller: ScriptedSTT, query: str) -> None:
+        window = self.window
+        self._first_audio.clear()
+        self._listening.clear()
+        try:
+            end_of_speech = await caller.say(query)
+            await asyncio.wait_for(self._first_audio.wait(), self.args.turn_timeout)
+            response = self._first_audio_at - end_of_speech
+            self._listening.clear()
+            await asyncio.wait_for(self._listening.wait(), self.args.turn_timeout)
+        except asyncio.TimeoutError:
+            window.timeouts += 1
+            logger.warning(f"{self.name}: no reply within {self.args.turn_timeout}s")
+            return
+        except Exception:
+            window.errors += 1
+            logger.exception(f"{self.name}: turn failed")
+            return
+        # a turn counts toward the step it finished in
+        window = self.window
+        window.turns += 1
+        window.response.append(response)
+        window.turn.append(time.perf_counter() - end_of_speech)
+
+
+async def monitor_loop_lag(windows: list[Window], interval: float = 0.05) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        windows[-1].loop_lag.append(max(loop.time() - started - interval, 0.0))
+
+
+async def sample_process(
+    windows: list[Window],
+    standin_ports: set[int],
+    executor: CountingExecutor,
+    interval: float = 0.5,
+) -> None:
+    proc = psutil.Process()
+    while True:
+        window = windows[-1]
+        window.rss.append(proc.memory_info().rss)
+        window.threads.append(proc.num_threads())
+        # client-side sockets only: the stand-ins' own ends live in this process too
+        window.sockets.append(
+            sum(
+                1
+                for conn in proc.net_connections(kind="inet")
+                if conn.raddr and conn.raddr.port in standin_ports
+            )
+        )
+        window.pool_busy.append(executor.busy)
+        window.pool_queued.append(executor.queued)
+        await asyncio.sleep(interval)
+
+
+def report_step(rooms: int, window: Window, seconds: float, baseline_rss: int) -> dict:
+    lag = summarize(window.loop_lag)
+    rss = max(window.rss) if window.rss else baseline_rss
+    return {
+        "rooms": rooms,
+        "seconds": round(seconds, 1),
+        "turns": window.turns,
+        "timeouts": window.timeouts,
+        "errors": window.errors,
+        "turns_per_s": round(window.turns / seconds, 2) if seconds else 0.0,
+        "response": summarize(window.response),
+        "turn": summarize(window.turn),
+        "loop_lag": lag,
+        "rss_mb": round(rss / 2**20, 1),
+        "rss_per_room_mb": round((rss - baseline_rss) / 2**20 / rooms, 2),
+        "sockets_max": max(window.sockets, default=0),
+        "threads_max": max(window.threads, default=0),
+        "pool_busy_max": max(window.pool_busy, default=0),
+        "pool_queue_max": max(window.pool_queued, default=0),
+    }
+
+
+def within_limits(step: dict, args: argparse.Namespace) -> list[str]:
+    """Reasons ``step`` is over the limits; empty when the room count is safe."""
+    reasons = []
+    if step["timeouts"] or step["errors"]:
+        reasons.append(f"{step['timeouts']} timeouts, {step['errors']} errors")
+    p95 = step["response"].get("p95_ms")
+    if p95 is None:
+        reasons.append("no completed turns")
+    elif p95 > args.max_response_p95_ms:
+        reasons.append(f"response p95 {p95:.0f}ms > {args.max_response_p95_ms:.0f}ms")
+    lag = step["loop_lag"].get("p99_ms", 0.0)
+    if lag > args.max_loop_lag_ms:
+        reasons.append(f"loop lag p99 {lag:.0f}ms > {args.max_loop_lag_ms:.0f}ms")
+    if step["pool_queue_max"]:
+        reasons.append(f"thread pool backlog of {step['pool_queue_max']}")
+    return reasons
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    executor = CountingExecutor()
+    asyncio.get_running_loop().set_default_executor(executor)
+    embeddings = FakeEmbeddingsServer(latency=args.embed_latency_ms / 1000)
+    firebase_server = FakeFirebaseServer(
+        kb_size=args.kb_size,
+        search_latency=args.search_latency_ms / 1000,
+        addquery_latency=args.addquery_latency_ms / 1000,
+    )
+    standins = StandinThread(embeddings, firebase_server)
+    standins.start()
+
+    # the process-wide clients prewarm would create
+    openai_client = AsyncOpenAI(base_url=embeddings.base_url, api_key="soak")
+    embedder = EmbeddingClient(
+        client=openai_client,
+        cache=EmbeddingCache() if args.embedding_cache else None,
+    )
+    firebase = FirebaseClient(firebase_server.url)
+    kb_index = None
+    answer_cache = None
+    if args.local_index:
+        kb_index = LocalVectorIndex()
+        for doc_id, doc in firebase_server.kb_docs():
+            kb_index.upsert(doc_id, doc)
+        kb_index.mark_synced()
+        # the answer cache matches against the in-process index, so it needs one
+        answer_cache = SemanticAnswerCache(kb_index, embedder)
+    outbox = None
+    if args.outbox:
+        outbox = EscalationOutbox(functools.partial(send_escalation, firebase))
+    shared = {
+        "kb_index": kb_index,
+        "embedder": embedder,
+        "firebase": firebase,
+        "firebase_url": firebase_server.url,
+        "answer_cache": answer_cache,
+        "outbox": outbox,
+    }
+    # post_user_query takes the room and job from livekit's job context, which
+    # only a worker sets up; each simulated room supplies its own instead
+    worker_job_context = agent.get_job_context
+    agent.get_job_context = current_job
+
+    baseline_rss = psutil.Process().memory_info().rss
+    rng = np.random.default_rng(args.seed)
+    windows = [Window()]
+    monitors = [
+        asyncio.create_task(monitor_loop_lag(windows)),
+        asyncio.create_task(sample_process(windows, standins.ports, executor)),
+    ]
+
+    rooms: list[Room] = []
+    steps = []
+    safe_rooms = 0
+    failed = False
+    try:
+        for target in args.rooms:
+            window = Window()
+            windows.append(window)
+            for room in rooms:
+                room.window = window
+            while len(rooms) < target:
+                room = Room(
+                    len(rooms), shared, args, np.random.default_rng(rng.integers(2**32))
+                )
+                room.window = window
+                room.start()
+                rooms.append(room)
+
+            started = time.perf_counter()
+            await asyncio.sleep(args.step_seconds)
+            step = report_step(
+                target, window, time.perf_counter() - started, baseline_rss
+            )
+            step["over_limits"] = within_limits(step, args)
+            steps.append(step)
+            print(
+                f"{target:>4} rooms: response p95 {step['response'].get('p95_ms', 0):.0f}ms,"
+                f" loop lag p99 {step['loop_lag'].get('p99_ms', 0):.1f}ms,"
+                f" {step['turns']} turns, {step['rss_mb']}MB"
+                + (
+                    f"  OVER: {'; '.join(step['over_limits'])}"
+                    if step["over_limits"]
+                    else ""
+                ),
+                flush=True,
+            )
+            if step["over_limits"]:
+                failed = True
+                if not args.keep_going:
+                    break
+            elif not failed:
+                safe_rooms = target
+    finally:
+        for task in monitors:
+            task.cancel()
+        await asyncio.gather(*(room.aclose() for room in rooms))
+        agent.get_job_context = worker_job_context
+        if outbox is not None:
+            await outbox.aclose()
+            outbox.close()
+        await embedder.aclose()
+        await firebase.aclose()
+        await openai_client.close()
+        standins.stop()
+
+    recommended = int(safe_rooms * args.headroom)
+    return {
+        "benchmark": "soak",
+        "git_commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "cpu_count": os.cpu_count(),
+        "baseline_rss_mb": round(baseline_rss / 2**20, 1),
+        "steps": steps,
+        "capacity": {
+            "largest_safe_rooms": safe_rooms,
+            "recommended_rooms_per_worker": recommended,
+            "limits": {
+                "response_p95_ms": args.max_response_p95_ms,
+                "loop_lag_p99_ms": args.max_loop_lag_ms,
+            },
+            "worker_options": (
+                "WorkerOptions(job_executor_type=JobExecutorType.THREAD,"
+                f" load_fnc=lambda server: len(server.active_jobs) / {max(recommended, 1)},"
+                " load_threshold=1.0)"
+            ),
+        },
+        "answer_cache": answer_cache.stats() if answer_cache is not None else None,
+        "pool_tasks": executor.completed,
+        "standins": {
+            "embedding_requests": embeddings.requests,
+            "firebase_requests": firebase_server.requests,
+            "escalations": len(firebase_server.queries),
+        },
+    }
+
+
+def parse_rooms(value: str) -> list[int]:
+    rooms = sorted({int(v) for v in value.split(",") if v.strip()})
+    if not rooms or rooms[0] < 1:
+        raise argparse.ArgumentTypeError("room counts must be positive integers")
+    return rooms
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rooms",
+        type=parse_rooms,
+        default=parse_rooms("1,2,5,10,20,40"),
+        help="comma-separated room counts to ramp through",
+    )
+    parser.add_argument("--step-seconds", type=float, default=30.0)
+    parser.add_argument(
+        "--think-ms", type=float, default=2000.0, help="caller pause between turns"
+    )
+    parser.add_argument("--turn-timeout", type=float, default=15.0)
+    parser.add_argument("--kb-size", type=int, default=1000)
+    parser.add_argument("--hit-ratio", type=float, default=0.7)
+    parser.add_argument("--word-interval-ms", type=float, default=150.0)
+    parser.add_argument("--endpointing-ms", type=float, default=500.0)
+    parser.add_argument("--llm-ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tts-ttfb-ms", type=float, default=200.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0)
+    parser.add_argument("--search-latency-ms", type=float, default=20.0)
+    parser.add_argument("--addquery-latency-ms", type=float, default=60.0)
+    parser.add_argument("--local-index", action="store_true")
+    parser.add_argument("--embedding-cache", action="store_true")
+    parser.add_argument("--outbox", action="store_true")
+    parser.add_argument("--max-response-p95-ms", type=float, default=2000.0)
+    parser.add_argument("--max-loop-lag-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--headroom",
+        type=float,
+        default=0.8,
+        help="share of the largest safe room count to recommend",
+    )
+    parser.add_argument(
+        "--keep-going",
+        action="store_true",
+        help="finish the ramp past the first failure",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark-soak.json")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=os.environ.get("BENCH_LOG_LEVEL", "WARNING"))
+    result = asyncio.run(run(args))
+
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    capacity = result["capacity"]
+    print(
+        f"safe up to {capacity['largest_safe_rooms']} rooms;"
+        f" recommend {capacity['recommended_rooms_per_worker']} per worker -> {args.output}"
+    )
+    return 0 if capacity["largest_safe_rooms"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
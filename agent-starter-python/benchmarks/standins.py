@@ -0,0 +1,178 @@
+"""Local stand-ins for OpenAI embeddings and the HITL Cloud Functions.
+
+Both are small aiohttp servers on 127.0.0.1 with configurable latency, so the
+agent's real HTTP clients (AsyncOpenAI, FirebaseClient) can be exercised
+without network access or API keys.
+"""
+
+import asyncio
+import base64
+import hashlib
+import time
+import uuid
+from typing import Optional
+
+import numpy as np
+from aiohttp import web
+
+from embedding_cache import normalize_query
+from vector_codec import decode_vector
+
+DIM = 1536
+DISTANCE_THRESHOLD = 0.6
+
+
+def fake_embedding(text: str, dim: int = DIM) -> np.ndarray:
+    """Deterministic unit vector for ``text``; equal after normalization, equal vector."""
+    seed = hashlib.sha256(normalize_query(text).encode("utf-8")).digest()
+    rng = np.random.default_rng(int.from_bytes(seed[:8], "little"))
+    vec = rng.standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def kb_question(i: int) -> str:
+    return f"what is the price of service number {i}"
+
+
+class _Server:
+    def __init__(self) -> None:
+        self.app = web.Application()
+        self.requests = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self) -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class FakeEmbeddingsServer(_Server):
+    """OpenAI-compatible ``POST /v1/embeddings`` returning ``fake_embedding`` vectors."""
+
+    def __init__(self, *, latency: float = 0.03, dim: int = DIM) -> None:
+        super().__init__()
+        self.latency = latency
+        self.dim = dim
+        self.inputs = 0
+        self.app.router.add_post("/v1/embeddings", self._embeddings)
+
+    @property
+    def base_url(self) -> str:
+        return self.url + "/v1"
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self.inputs += len(inputs)
+        await asyncio.sleep(self.latency)
+
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(inputs):
+            vec = fake_embedding(text, body.get("dimensions") or self.dim)
+            embedding = (
+                base64.b64encode(vec.astype("<f4").tobytes()).decode("ascii")
+                if as_base64
+                else vec.tolist()
+            )
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        return web.json_response(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model"),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+
+class FakeFirebaseServer(_Server):
+    """``/vector_search`` and ``/addquery`` over an in-memory KB of ``kb_size`` answers.
+
+    KB entry ``i`` is stored under the embedding of ``kb_question(i)``, so asking
+    that question is an exact hit while any other text almost surely misses.
+    """
+
+    def __init__(
+        self,
+        *,
+        kb_size: int = 1000,
+        search_latency: float = 0.02,
+        addquery_latency: float = 0.06,
+        dim: int = DIM,
+    ) -> None:
+        super().__init__()
+        self.search_latency = search_latency
+        self.addquery_latency = addquery_latency
+        self.queries: list[dict] = []
+        self.ids = [f"kb-{i}" for i in range(kb_size)]
+        self.answers = [
+            f"Service number {i} costs ${20 + i % 200}." for i in range(kb_size)
+        ]
+        self.matrix = (
+            np.stack([fake_embedding(kb_question(i), dim) for i in range(kb_size)])
+            if kb_size
+            else np.zeros((0, dim), dtype=np.float32)
+        )
+        self.app.router.add_post("/vector_search", self._vector_search)
+        self.app.router.add_post("/addquery", self._addquery)
+
+    def kb_docs(self):
+        """``(id, answers_index doc)`` pairs, e.g. to seed a LocalVectorIndex."""
+        for doc_id, text, vec in zip(self.ids, self.answers, self.matrix):
+            yield doc_id, {"answer_text": text, "query_embedding": vec.tolist()}
+
+    def search(self, vec: list[float], top_k: int) -> list[dict]:
+        q = np.asarray(vec, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        distances = 1.0 - self.matrix @ q
+        order = np.argsort(distances)[:top_k]
+        return [
+            {
+                "id": self.ids[i],
+                "answer_text": self.answers[i],
+                "score": float(distances[i]),
+            }
+            for i in order
+            if distances[i] <= DISTANCE_THRESHOLD
+        ]
+
+    async def _vector_search(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        body = await request.json()
+        encoding = body.get("encoding", "json")
+        top_k = int(body.get("top_k", 5))
+        await asyncio.sleep(self.search_latency)
+        if "query_vectors" in body:
+            vectors = [decode_vector(v, encoding) for v in body["query_vectors"]]
+            return web.json_response(
+                {"results": [{"matches": self.search(v, top_k)} for v in vectors]}
+            )
+        vec = decode_vector(body["query_vector"], encoding)
+        return web.json_response({"matches": self.search(vec, top_k)})
+
+    async def _addquery(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        body = await request.json()
+        await asyncio.sleep(self.addquery_latency)
+        doc = {
+            "id": uuid.uuid4().hex,
+            "query": body.get("query"),
+            "status": "pending",
+            "created_at": time.time(),
+        }
+        self.queries.append(doc)
+        return web.json_response(doc, status=201)
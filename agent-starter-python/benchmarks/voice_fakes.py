@@ -0,0 +1,285 @@
+"""Scripted STT, LLM and TTS plus silent audio I/O for in-process voice sessions.
+
+They keep the AgentSession pipeline intact (audio in, STT events, turn
+detection, tool calls, TTS, playout) while replacing every network model
+with a fixed-latency script, so many rooms can run in one process.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Callable, Optional
+
+from livekit import rtc
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    APIConnectOptions,
+    llm,
+    stt,
+    tts,
+)
+from livekit.agents.voice import io
+
+INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 24000
+FRAME_MS = 20
+
+
+class ScriptedLLM(llm.LLM):
+    """Calls ``answer`` with every user utterance, then reads the tool result out.
+
+    ``ttft`` is the delay before the first chunk; text is streamed word by word.
+    """
+
+    def __init__(
+        self, *, ttft: float = 0.3, token_interval: float = 0.01, tool: str = "answer"
+    ) -> None:
+        super().__init__()
+        self.ttft = ttft
+        self.token_interval = token_interval
+        self.tool = tool
+        self.requests = 0
+
+    @property
+    def model(self) -> str:
+        return "scripted"
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: Optional[list] = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs,
+    ) -> "_ScriptedLLMStream":
+        self.requests += 1
+        return _ScriptedLLMStream(
+            self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options
+        )
+
+
+class _ScriptedLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        script: ScriptedLLM = self._llm
+        request_id = uuid.uuid4().hex
+        items = self._chat_ctx.items
+        last = items[-1] if items else None
+        await asyncio.sleep(script.ttft)
+
+        if last is not None and last.type == "message" and last.role == "user":
+            call = llm.FunctionToolCall(
+                name=script.tool,
+                arguments=json.dumps({"query": last.text_content or ""}),
+                call_id=f"call_{request_id[:12]}",
+            )
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=request_id,
+                    delta=llm.ChoiceDelta(role="assistant", tool_calls=[call]),
+                )
+            )
+            return
+
+        text = "How can I help you today?"
+        if last is not None and last.type == "function_call_output":
+            text = last.output or "Sorry, I didn't get that."
+        for i, word in enumerate(text.split(" ")):
+            if i:
+                await asyncio.sleep(script.token_interval)
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=request_id,
+                    delta=llm.ChoiceDelta(
+                        role="assistant", content=word if i == 0 else " " + word
+                    ),
+                )
+            )
+
+
+class ScriptedSTT(stt.STT):
+    """Streaming STT whose transcripts come from ``say`` instead of the audio.
+
+    Audio frames are still pulled from the session and discarded, so the input
+    path costs what it would with a real provider minus the network.
+    """
+
+    def __init__(self, *, word_interval: float = 0.15) -> None:
+        super().__init__(
+            capabilities=stt.STTCapabilities(streaming=True, interim_results=True)
+        )
+        self.word_interval = word_interval
+        self._stream: Optional[_ScriptedRecognizeStream] = None
+
+    @property
+    def model(self) -> str:
+        return "scripted"
+
+    async def _recognize_impl(self, buffer, *, language=None, conn_options=None):
+        raise NotImplementedError("ScriptedSTT only supports streaming")
+
+    def stream(
+        self,
+        *,
+        language=None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> "_ScriptedRecognizeStream":
+        self._stream = _ScriptedRecognizeStream(stt=self, conn_options=conn_options)
+        return self._stream
+
+    async def say(self, text: str) -> float:
+        """Speak ``text`` as the user; returns the end-of-speech ``perf_counter``."""
+        if self._stream is None:
+            raise RuntimeError("the session has not opened an STT stream yet")
+        return await self._stream.say(text)
+
+
+class _ScriptedRecognizeStream(stt.RecognizeStream):
+    def __init__(self, *, stt: ScriptedSTT, conn_options: APIConnectOptions) -> None:
+        super().__init__(stt=stt, conn_options=conn_options)
+        self._word_interval = stt.word_interval
+
+    async def say(self, text: str) -> float:
+        words = text.split()
+        self._emit(stt.SpeechEventType.START_OF_SPEECH)
+        for i in range(1, len(words)):
+            await asyncio.sleep(self._word_interval)
+            self._emit(stt.SpeechEventType.INTERIM_TRANSCRIPT, " ".join(words[:i]))
+        await asyncio.sleep(self._word_interval)
+        self._emit(stt.SpeechEventType.FINAL_TRANSCRIPT, text)
+        self._emit(stt.SpeechEventType.END_OF_SPEECH)
+        return time.perf_counter()
+
+    def _emit(self, kind: stt.SpeechEventType, text: Optional[str] = None) -> None:
+        alternatives = []
+        if text is not None:
+            alternatives = [stt.SpeechData(language="en", text=text, confidence=1.0)]
+        self._event_ch.send_nowait(
+            stt.SpeechEvent(type=kind, alternatives=alternatives)
+        )
+
+    async def _run(self) -> None:
+        async for _ in self._input_ch:
+            pass
+
+
+class FakeTTS(tts.TTS):
+    """Returns silence after ``ttfb``, lasting as long as ``text`` would take to say."""
+
+    def __init__(self, *, ttfb: float = 0.2, chars_per_second: float = 15.0) -> None:
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=OUTPUT_SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.ttfb = ttfb
+        self.chars_per_second = chars_per_second
+        self.requests = 0
+
+    @property
+    def model(self) -> str:
+        return "silence"
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> "_SilentChunkedStream":
+        self.requests += 1
+        return _SilentChunkedStream(
+            tts=self, input_text=text, conn_options=conn_options
+        )
+
+
+class _SilentChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        fake: FakeTTS = self._tts
+        output_emitter.initialize(
+            request_id=uuid.uuid4().hex,
+            sample_rate=OUTPUT_SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        await asyncio.sleep(fake.ttfb)
+        seconds = max(len(self._input_text) / fake.chars_per_second, 0.1)
+        output_emitter.push(bytes(int(OUTPUT_SAMPLE_RATE * seconds) * 2))
+        output_emitter.flush()
+
+
+class SilentAudioInput(io.AudioInput):
+    """A caller's microphone: 20 ms frames of silence at real-time pace."""
+
+    def __init__(self) -> None:
+        super().__init__(label="Silence")
+        self._samples = INPUT_SAMPLE_RATE * FRAME_MS // 1000
+        self._data = bytes(self._samples * 2)
+        self._next_at: Optional[float] = None
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        now = time.monotonic()
+        if self._next_at is None or self._next_at < now - 1.0:
+            self._next_at = now
+        self._next_at += FRAME_MS / 1000
+        await asyncio.sleep(max(self._next_at - now, 0))
+        return rtc.AudioFrame(
+            data=self._data,
+            sample_rate=INPUT_SAMPLE_RATE,
+            num_channels=1,
+            samples_per_channel=self._samples,
+        )
+
+
+class PlayoutClock(io.AudioOutput):
+    """A caller's speaker: "plays" captured audio in real time and drops it.
+
+    ``on_first_frame`` fires with ``perf_counter()`` when a segment starts,
+    which is when the caller would start hearing the agent.
+    """
+
+    def __init__(self, on_first_frame: Optional[Callable[[float], None]] = None):
+        super().__init__(
+            label="PlayoutClock",
+            next_in_chain=None,
+            sample_rate=OUTPUT_SAMPLE_RATE,
+            capabilities=io.AudioOutputCapabilities(pause=False),
+        )
+        self.on_first_frame = on_first_frame
+        self._pushed = 0.0
+        self._started_at = 0.0
+        self._interrupted = asyncio.Event()
+        self._playout: Optional[asyncio.Task] = None
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if self._playout is not None and not self._playout.done():
+            await self._playout
+        if not self._pushed:
+            self._started_at = time.monotonic()
+            self.on_playback_started(created_at=time.time())
+            if self.on_first_frame is not None:
+                self.on_first_frame(time.perf_counter())
+        self._pushed += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if self._pushed:
+            self._interrupted.clear()
+            self._playout = asyncio.create_task(self._play())
+
+    def clear_buffer(self) -> None:
+        if self._pushed:
+            self._interrupted.set()
+
+    async def _play(self) -> None:
+        remaining = self._pushed - (time.monotonic() - self._started_at)
+        interrupted = False
+        if remaining > 0:
+            try:
+                await asyncio.wait_for(self._interrupted.wait(), remaining)
+                interrupted = True
+            except asyncio.TimeoutError:
+                pass
+        played = min(time.monotonic() - self._started_at, self._pushed)
+        self._pushed = 0.0
+        self.on_playback_finished(playback_position=played, interrupted=interrupted)
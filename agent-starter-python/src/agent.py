@@ -1,39 +1,74 @@
 import asyncio
+import functools
 import json
 import logging
 import os
-from typing import Annotated, List
-from google.cloud import firestore
+import sqlite3
+import tempfile
+from typing import List, Optional
+
 import aiohttp
-import openai as openai_client
 from dotenv import load_dotenv
+from google.cloud import firestore
 from livekit.agents import (
     NOT_GIVEN,
     Agent,
     AgentFalseInterruptionEvent,
     AgentSession,
+    AgentStateChangedEvent,
     JobContext,
     JobProcess,
     MetricsCollectedEvent,
     RoomInputOptions,
     RunContext,
+    StopResponse,
+    UserInputTranscribedEvent,
     WorkerOptions,
     cli,
+    get_job_context,
     llm,
     metrics,
-    get_job_context
 )
 from livekit.agents.llm import function_tool
 from livekit.plugins import cartesia, deepgram, noise_cancellation, openai, silero
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from answer_cache import SemanticAnswerCache
+from answer_watcher import AnswerWatcher
+from embedding_cache import EmbeddingCache
+from embeddings import EmbeddingClient
+from escalation_outbox import EscalationOutbox
+from firebase_client import CircuitOpenError, FirebaseClient
+from followups import FollowUpDelivery
+from kb_index import LocalVectorIndex
+from prefetch import SpeculativeRetriever
+from query_split import is_question, merge_matches, split_compound_query
+from turn_tracing import TurnTracer, speculative, stage_span
+from vector_codec import encode_vector
+
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
 
+# KB matches at or below this cosine distance are spoken verbatim, skipping the LLM
+DIRECT_SPEAK_DISTANCE = float(os.environ.get("DIRECT_SPEAK_DISTANCE", "0.15"))
+
+# How query vectors go over the wire to vector_search: f32, f16 or json
+VECTOR_WIRE_ENCODING = os.environ.get("VECTOR_WIRE_ENCODING", "f32")
+
 
 class Assistant(Agent):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        *,
+        kb_index: Optional[LocalVectorIndex] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        embedder: Optional[EmbeddingClient] = None,
+        firebase: Optional[FirebaseClient] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        outbox: Optional[EscalationOutbox] = None,
+        tracer: Optional[TurnTracer] = None,
+    ) -> None:
         super().__init__(
             instructions = """
             You are a helpful assistant for a fictional beauty salon, Luxe Locks (downtown Springfield).
@@ -59,38 +94,150 @@ class Assistant(Agent):
 
         )
         self.collection_name = "answers_index"
-        openai_client.api_key = os.getenv("OPENAI_API_KEY")
         self.FIREBASE_URL= os.environ.get("FIREBASE_URL")
-
-    def _get_query_embedding(self, text: str) -> List[float]:
+        self.firebase = firebase or FirebaseClient(self.FIREBASE_URL)
+        self.answer_cache = answer_cache
+        self.outbox = outbox
+        # KB lookups started from interim transcripts, reused by `answer` when they match
+        self.prefetch = SpeculativeRetriever(self._prefetch_kb)
+        self.kb_index = kb_index
+        self.embedder = embedder or EmbeddingClient(cache=embedding_cache)
+        self.vector_encoding = VECTOR_WIRE_ENCODING
+        # What vector_search last advertised in X-Vector-Encodings; None until it answers
+        self.server_vector_encodings: Optional[frozenset[str]] = None
+        # Per-turn stage latencies, exported as Prometheus histograms
+        self.tracer = tracer or TurnTracer()
+
+    async def _get_query_embedding(self, text: str) -> List[float]:
         """Compute the embedding for the given text using the same model as ingestion."""
-        response = openai_client.embeddings.create(
-            input=text,
-            model="text-embedding-3-small",
-            dimensions=1536,
-        )
-        return response.data[0].embedding
+        with self.tracer.span("embedding"):
+            return await self.embedder.embed(text)
 
     async def _firebase_vector_search(self, *, collection_name: str, query_vector: list[float] = None, limit: int = 3):
         """Call the Firebase search_vectors endpoint and return matches."""
-        if not self.FIREBASE_URL:
-            raise RuntimeError("FIREBASE_URL is not set")
         if not query_vector:
             raise ValueError("Provide query_vector")
+        results = await self._firebase_vector_search_many(
+            collection_name=collection_name, query_vectors=[query_vector], limit=limit
+        )
+        return results[0]
+
+    async def _firebase_vector_search_many(self, *, collection_name: str, query_vectors: list[list[float]], limit: int = 3):
+        """Search several vectors in one vector_search call; one match list per vector."""
+        if not self.FIREBASE_URL:
+            raise RuntimeError("FIREBASE_URL is not set")
+        if not query_vectors:
+            raise ValueError("Provide query_vectors")
+        encoding = self._wire_encoding()
+        status, text, headers = await self._post_vector_search(collection_name, query_vectors, limit, encoding)
+        advertised = headers.get("X-Vector-Encodings")
+        if advertised is not None:
+            self.server_vector_encodings = frozenset(e.strip() for e in advertised.split(","))
+        if status == 400 and encoding != "json" and encoding not in (self.server_vector_encodings or ()):
+            if advertised is None:
+                # Server predates compact vectors and doesn't advertise any
+                self.server_vector_encodings = frozenset({"json"})
+            logger.warning(f"vector_search does not accept {encoding} vectors, retrying as JSON")
+            status, text, _ = await self._post_vector_search(collection_name, query_vectors, limit, "json")
+        if status != 200:
+            raise RuntimeError(f"Firebase search failed: {status} {text}")
+        data = json.loads(text)
+        if "results" in data:
+            return [r.get("matches", []) for r in data["results"]]
+        return [data.get("matches", [])]
+
+    async def _post_vector_search(self, collection_name: str, query_vectors: list[list[float]], limit: int, encoding: str):
         payload = {
-            "query_vector": query_vector,
             "collection": collection_name,
             "top_k": limit,
         }
+        if encoding != "json":
+            payload["encoding"] = encoding
+        encoded = [encode_vector(v, encoding) for v in query_vectors]
+        if len(encoded) == 1:
+            payload["query_vector"] = encoded[0]
+        else:
+            payload["query_vectors"] = encoded
+
+        # Reads are idempotent, so the client may retry within the deadline
+        return await self.firebase.post_with_headers(
+            "/vector_search", payload, deadline=3.0, idempotent=True
+        )
+
+    def _wire_encoding(self) -> str:
+        """The preferred vector encoding unless the server advertised it doesn't take it."""
+        if self.server_vector_encodings is None or self.vector_encoding in self.server_vector_encodings:
+            return self.vector_encoding
+        return "json"
+
+    async def _vector_search(self, query_vector: list[float], limit: int = 3):
+        """Search the in-process index, falling back to Firebase when it is cold or stale."""
+        return (await self._vector_search_many([query_vector], limit=limit))[0]
+
+    async def _vector_search_many(self, query_vectors: list[list[float]], limit: int = 3):
+        """Like _vector_search for several vectors, with at most one Firebase round trip."""
+        with self.tracer.span("vector_search"):
+            return await self._search_vectors(query_vectors, limit)
+
+    async def _search_vectors(self, query_vectors: list[list[float]], limit: int):
+        if self.kb_index is not None:
+            results = [self.kb_index.search(v, limit=limit) for v in query_vectors]
+            if all(matches is not None for matches in results):
+                logger.info(f"Local vector search returned {sum(map(len, results))} matches")
+                return results
+            logger.info("Local vector index not ready, falling back to Firebase search")
+        return await self._firebase_vector_search_many(
+            collection_name=self.collection_name,
+            query_vectors=query_vectors,
+            limit=limit,
+        )
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.FIREBASE_URL+"/vector_search", json=payload, timeout=10) as r:
-                text = await r.text()
-                if r.status != 200:
-                    raise RuntimeError(f"Firebase search failed: {r.status} {text}")
-                data = json.loads(text)
-                return data.get("matches", [])
-            
+    async def _search_kb(self, query: str):
+        """Embed the query and return the top KB matches.
+
+        Multi-part questions are split so each part gets its own nearest answers;
+        the parts are embedded in one batched call and searched in one round trip.
+        """
+        parts = split_compound_query(query)
+        if len(parts) <= 1:
+            query_embedding = await self._get_query_embedding(query)
+            return await self._vector_search(query_embedding, limit=3)
+
+        logger.info(f"Searching KB for {len(parts)} sub-questions: {parts}")
+        with self.tracer.span("embedding"):
+            embeddings = await self.embedder.embed_many(parts)
+        results = await self._vector_search_many(embeddings, limit=3)
+        return merge_matches(results, limit=3)
+
+    async def _prefetch_kb(self, query: str):
+        """``_search_kb`` for a guessed transcript; its spans don't count toward the turn."""
+        with speculative():
+            return await self._search_kb(query)
+
+    async def on_user_turn_completed(
+        self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage
+    ) -> None:
+        self.prefetch.end_turn()
+
+        # Repeated FAQ: answer from the cache and skip the LLM for this turn entirely
+        if self.answer_cache is None:
+            return
+        text = new_message.text_content
+        if not text or not self._worth_cache_lookup(text):
+            return
+        cached = await self.answer_cache.lookup(text)
+        if cached is None:
+            return
+        logger.info(f"Answer cache hit for: {text}")
+        self.session.say(cached)
+        raise StopResponse()
+
+    def _worth_cache_lookup(self, text: str) -> bool:
+        """Only FAQ-shaped turns, or ones whose embedding is already on hand, wait on the cache."""
+        return is_question(text) or self.embedder.ready(text)
+
+    async def on_exit(self) -> None:
+        await self.prefetch.aclose()
 
     async def post_user_query(self, context: RunContext, query: str):
         """Post a user message to the HITL endpoint.
@@ -110,24 +257,47 @@ class Assistant(Agent):
             "room_name": room.name,
             "job_id": job_id,
         }
+        # Hand over the embedding from the KB lookup so addanswer needn't recompute it
+        query_embedding = self.embedder.peek(query)
+        if query_embedding is not None:
+            encoding = self._wire_encoding()
+            query_data["query_embedding"] = encode_vector(query_embedding, encoding)
+            query_data["embedding_encoding"] = encoding
+            query_data["embedding_model"] = self.embedder.model
 
         logger.info(f"Posting user query to {url}: {query}")
         logger.info(f"Extracted user_id: {participant.attributes.get('user_id')}")
         logger.info(f"Extracted job_id: {job_id}")
         logger.info(f"Extracted room_name: {room.name}")
+
+        # Durable hand-off: the drainer delivers it so the caller isn't left in dead air
+        if self.outbox is not None:
+            try:
+                outbox_id = self.outbox.enqueue(query_data)
+                logger.info(f"Escalation {outbox_id} queued for delivery")
+                return "Contacting supervisor. Escalation queued for delivery."
+            except sqlite3.Error:
+                logger.exception("Escalation outbox unavailable, posting directly")
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=query_data) as response:
-                    response_text = await response.text()
-                    logger.info(f"Response status: {response.status}")
-                    logger.info(f"Response body: {response_text}")
-                    
-                    if response.status == 201:
-                        return f"Contacting supervisor. Response: {response_text}"
-                    else:
-                        return f"Failed to post query. Status: {response.status}, Response: {response_text}"
-                    
-        except aiohttp.ClientError as e:
+            # addquery dedupes on job_id + normalized query, so retries are safe
+            with stage_span("addquery"):
+                status, response_text = await self.firebase.post(
+                    "/addquery", query_data, deadline=5.0, idempotent=True
+                )
+            logger.info(f"Response status: {status}")
+            logger.info(f"Response body: {response_text}")
+
+            if status in (200, 201):
+                return f"Contacting supervisor. Response: {response_text}"
+            else:
+                return f"Failed to post query. Status: {status}, Response: {response_text}"
+
+        except CircuitOpenError as e:
+            error_msg = f"Request skipped: {e}"
+            logger.warning(error_msg)
+            return error_msg
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             error_msg = f"Request failed: {str(e)}"
             logger.error(error_msg)
             return error_msg
@@ -136,14 +306,55 @@ class Assistant(Agent):
             logger.error(error_msg)
             return error_msg
 
+    def _direct_answer(self, matches) -> Optional[str]:
+        """The stored answer text when the top KB match is close enough to speak verbatim."""
+        if not matches:
+            return None
+        top = matches[0]
+        score = top.get("score")
+        text = (top.get("answer_text") or "").strip()
+        if score is None or score > DIRECT_SPEAK_DISTANCE or not text:
+            return None
+        return text
+
     @function_tool
-    async def answer(self, context: RunContext, query: str) -> str:
+    async def answer(self, context: RunContext, query: str) -> Optional[str]:
         """
         Resolve user questions by checking the KB first, then escalating if needed.
         Returns the exact text the agent should say to the user.
         """
+        self.tracer.tool_started()
+        with self.tracer.span("tool"):
+            return await self._answer(context, query)
+
+    async def _answer(self, context: RunContext, query: str) -> Optional[str]:
+        # 0) Firebase is down and the local index can't answer: don't wait on a timeout
+        local_ready = self.kb_index is not None and self.kb_index.ready
+        if not local_ready and not self.firebase.available:
+            logger.warning("Firebase circuit open, escalating without KB lookup")
+            with self.tracer.span("escalation"):
+                await self.post_user_query(context, query=query)
+            return "Let me check with my supervisor and get back to you."
+
         # 1) Try KB
-        kb_resp = await self.retrieve_info(context, query=query)
+        matches, kb_resp = await self._retrieve(query)
+
+        # Near-exact hit: speak the supervisor's answer ourselves instead of having
+        # the LLM generate another completion that repeats it. Returning None tells
+        # the framework no tool reply is needed; say() adds the text to the chat ctx.
+        # A compound question needs every part answered, so leave it to the LLM.
+        direct_text = None
+        if len(split_compound_query(query)) == 1:
+            direct_text = self._direct_answer(matches)
+        if direct_text is not None:
+            try:
+                context.session.say(direct_text)
+                logger.info(f"Direct KB answer (distance {matches[0]['score']:.3f})")
+                return None
+            except RuntimeError as e:
+                # e.g. no TTS configured for this session; let the LLM relay it instead
+                logger.warning(f"Direct KB answer unavailable: {e}")
+
         if kb_resp and "I couldn't find relevant information" not in kb_resp:
             # Strip the "Here's what I found:\n" prefix if present
             if kb_resp.lower().startswith("here's what i found"):
@@ -152,7 +363,8 @@ class Assistant(Agent):
 
         # 2) Escalate (HITL)
         # Post to supervisor, then return the mandated line
-        await self.post_user_query(context, query=query)
+        with self.tracer.span("escalation"):
+            await self.post_user_query(context, query=query)
         return "Let me check with my supervisor and get back to you."
 
     async def retrieve_info(self, context: RunContext, query: str) -> str:
@@ -160,20 +372,22 @@ class Assistant(Agent):
         Args:
             query: The user's query to search in knowledge base.
         """
+        _, response = await self._retrieve(query)
+        return response
+
+    async def _retrieve(self, query: str):
+        """Return the raw KB matches along with the text response built from them."""
         try:
             logger.info(f"retrieve_info called with query: {query}")
 
-            # Step 2: Compute embedding for the query
-            query_embedding = await asyncio.to_thread(self._get_query_embedding, query)
-            # Step 3: Perform a semantic search using the query embedding
-            semantic_results = await self._firebase_vector_search(
-                collection_name=self.collection_name,
-                query_vector=query_embedding,
-                limit=3,  # Retrieve top 3 most relevant results
-            )
+            # Step 2: Reuse the search started while the user was still talking
+            semantic_results = await self.prefetch.take(query)
+            if semantic_results is None:
+                # Step 3: Embed the query and perform a semantic search
+                semantic_results = await self._search_kb(query)
             logger.info(f"Semantic search returned {len(semantic_results)} points")
             if not semantic_results or len(semantic_results) == 0:
-                return "I couldn't find relevant information in our knowledge base."
+                return [], "I couldn't find relevant information in our knowledge base."
 
             # Step 4: Combine retrieved results into a concise response
             retrieved_texts = []
@@ -184,21 +398,73 @@ class Assistant(Agent):
                     retrieved_texts.append(text)
             logger.info(f"Retrieved texts: {retrieved_texts}")
             if not retrieved_texts:
-                return "I couldn't find relevant information in our knowledge base."
+                return [], "I couldn't find relevant information in our knowledge base."
 
             combined_response = "\n".join(retrieved_texts)
             truncated_response = combined_response[:1000]  # Limit response length
             logger.info(f"Returning combined response: {truncated_response}")
-            return f"Here's what I found:\n{truncated_response}"
+            return semantic_results, f"Here's what I found:\n{truncated_response}"
 
         except Exception as e:
             logger.error(f"Error in retrieve_info: {e}")
-            return f"Error retrieving information: {str(e)}"
+            return [], f"Error retrieving information: {str(e)}"
+
+
+async def send_escalation(firebase: FirebaseClient, payload: dict) -> bool:
+    """Deliver one outbox escalation to addquery; False means try again later."""
+    with stage_span("addquery"):
+        status, text = await firebase.post(
+            "/addquery", payload, deadline=10.0, idempotent=True
+        )
+    if status in (200, 201):
+        return True
+    if 400 <= status < 500 and status not in (408, 429):
+        # retrying a request the function rejects won't help
+        logger.error(f"addquery rejected escalation: {status} {text}")
+        return True
+    return False
 
 
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
 
+    db = firestore.Client(project="frontdeskdemo-will")
+    proc.userdata["db"] = db
+
+    # Keep a local copy of answers_index so KB lookups don't need a round trip
+    kb_index = LocalVectorIndex()
+    try:
+        kb_index.start(db)
+    except Exception:
+        logger.exception("Failed to start local vector index, using Firebase search only")
+    proc.userdata["kb_index"] = kb_index
+
+    # One answers listener for every room this worker hosts, instead of one per job
+    answer_watcher = AnswerWatcher()
+    try:
+        answer_watcher.start(db)
+    except Exception:
+        logger.exception("Failed to start answer watcher, follow-ups disabled")
+    proc.userdata["answer_watcher"] = answer_watcher
+
+    # Repeat questions across sessions in this process skip the embeddings call
+    embedding_cache = EmbeddingCache(path=os.environ.get("EMBEDDING_CACHE_PATH"))
+    proc.userdata["embedding_cache"] = embedding_cache
+    # One pooled async client per process; identical concurrent queries share a call
+    proc.userdata["embedder"] = EmbeddingClient(cache=embedding_cache)
+    # Keep-alive connection pool to the HITL functions, shared by every session
+    firebase = FirebaseClient(os.environ.get("FIREBASE_URL"))
+    proc.userdata["firebase"] = firebase
+    # Escalations are persisted locally and delivered to addquery in the background
+    proc.userdata["outbox"] = EscalationOutbox(
+        functools.partial(send_escalation, firebase),
+        path=os.environ.get("ESCALATION_OUTBOX_PATH", "escalation_outbox.db"),
+    )
+    # Repeated FAQ turns are answered from answers_index before reaching the LLM
+    proc.userdata["answer_cache"] = SemanticAnswerCache(
+        kb_index, proc.userdata["embedder"]
+    )
+
 
 async def entrypoint(ctx: JobContext):
     # Logging setup
@@ -261,6 +527,31 @@ async def entrypoint(ctx: JobContext):
         logger.info("false positive interruption, resuming")
         session.generate_reply(instructions=ev.extra_instructions or NOT_GIVEN)
 
+    assistant = Assistant(
+        kb_index=ctx.proc.userdata.get("kb_index"),
+        embedding_cache=ctx.proc.userdata.get("embedding_cache"),
+        embedder=ctx.proc.userdata.get("embedder"),
+        firebase=ctx.proc.userdata.get("firebase"),
+        answer_cache=ctx.proc.userdata.get("answer_cache"),
+        outbox=ctx.proc.userdata.get("outbox"),
+        tracer=TurnTracer(room_name=ctx.room.name, job_id=ctx.job.id),
+    )
+
+    # Start KB retrieval from interim transcripts so it's ready when `answer` runs
+    @session.on("user_input_transcribed")
+    def _on_user_input_transcribed(ev: UserInputTranscribedEvent):
+        assistant.prefetch.update(ev.transcript, ev.is_final)
+        if ev.is_final:
+            assistant.tracer.stt_final()
+
+    # Close each turn's latency spans once the reply has played
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(ev: AgentStateChangedEvent):
+        if ev.new_state == "speaking":
+            assistant.tracer.agent_speaking()
+        elif ev.new_state == "listening":
+            assistant.tracer.agent_listening()
+
     # Metrics collection, to measure pipeline performance
     # For more information, see https://docs.livekit.io/agents/build/metrics/
     usage_collector = metrics.UsageCollector()
@@ -269,13 +560,50 @@ async def entrypoint(ctx: JobContext):
     def _on_metrics_collected(ev: MetricsCollectedEvent):
         metrics.log_metrics(ev.metrics)
         usage_collector.collect(ev.metrics)
+        assistant.tracer.observe_metrics(ev.metrics)
+        if assistant.answer_cache is not None and isinstance(ev.metrics, metrics.LLMMetrics):
+            assistant.answer_cache.observe_llm_ttft(ev.metrics.ttft)
 
     async def log_usage():
+        assistant.tracer.end_turn()
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        embedding_cache = ctx.proc.userdata.get("embedding_cache")
+        if embedding_cache is not None:
+            logger.info(f"Embedding cache: {embedding_cache.stats()}")
+        embedder = ctx.proc.userdata.get("embedder")
+        if embedder is not None:
+            logger.info(f"Embedding client: {embedder.stats()}")
+        logger.info(f"KB prefetch: {assistant.prefetch.stats()}")
+        if assistant.answer_cache is not None:
+            logger.info(f"Answer cache: {assistant.answer_cache.stats()}")
+        answer_watcher = ctx.proc.userdata.get("answer_watcher")
+        if answer_watcher is not None:
+            logger.info(f"Answer watcher: {answer_watcher.stats()}")
+        firebase = ctx.proc.userdata.get("firebase")
+        if firebase is not None:
+            logger.info(f"Firebase calls: {firebase.stats()}")
 
     ctx.add_shutdown_callback(log_usage)
 
+    # Pick up escalations a previous job left behind
+    outbox = ctx.proc.userdata.get("outbox")
+    if outbox is not None:
+        outbox.start()
+
+    # Release the process-wide connection pools; they reopen lazily on next use
+    async def close_clients():
+        # shutdown callbacks run concurrently, so flush escalations before the pools close
+        if outbox is not None:
+            await outbox.aclose()
+            logger.info(f"Escalation outbox: {outbox.stats()}")
+        for key in ("embedder", "firebase"):
+            client = ctx.proc.userdata.get(key)
+            if client is not None:
+                await client.aclose()
+
+    ctx.add_shutdown_callback(close_clients)
+
     # # Add a virtual avatar to the session, if desired
     # # For other providers, see https://docs.livekit.io/agents/integrations/avatar/
     # avatar = hedra.AvatarSession(
@@ -286,7 +614,7 @@ async def entrypoint(ctx: JobContext):
 
     # Start the session, which initializes the voice pipeline and warms up the models
     await session.start(
-        agent=Assistant(),
+        agent=assistant,
         room=ctx.room,
         room_input_options=RoomInputOptions(
             # LiveKit Cloud enhanced noise cancellation
@@ -298,37 +626,22 @@ async def entrypoint(ctx: JobContext):
 
     await ctx.connect()
     
-    # Set up a watch for answers
-    db = firestore.Client(project="frontdeskdemo-will")
-    answers_query = (
-    db.collection("answers")
-      .where("room_name", "==", ctx.room.name)
-      .where("spoken", "==", False)
-    )
-    def _on_answers(docs, changes, read_time):
-        for ch in changes:
-            if ch.type.name not in ("ADDED", "MODIFIED"):
-                continue
-            data = ch.document.to_dict() or {}
-            text = (data.get("answer_text") or "").strip()
-            if not text:
-                continue
-
-            # 1) Immediately follow up to the caller (speak in the room)
-            # If you only want to simulate, replace with: print(f"[SIM] FOLLOW-UP: {text}")
-            asyncio.run_coroutine_threadsafe(session.say(text), asyncio.get_event_loop())
-
-            # 2) Mark as spoken to avoid repeats
-            try:
-                ch.document.reference.update({
-                    "spoken": True,
-                    "spoken_at": firestore.SERVER_TIMESTAMP,
-                })
-            except Exception:
-                logger.exception("Failed to mark answer as spoken")
+    # Route this room's supervisor answers from the worker-wide watcher
+    answer_watcher = ctx.proc.userdata["answer_watcher"]
 
-    answers_watch = answers_query.on_snapshot(_on_answers)
-    ctx.add_shutdown_callback(lambda: answers_watch.unsubscribe())
+    # The watcher calls back on Firestore's thread; delivery hops onto this job's loop
+    followups = FollowUpDelivery(session, ctx.proc.userdata["db"])
+    followups.start()
+
+    # registering resubscribes the listener to this worker's rooms: keep it off the loop
+    await asyncio.to_thread(answer_watcher.register, ctx.room.name, followups.submit)
+
+    async def unregister_answers():
+        await asyncio.to_thread(answer_watcher.unregister, ctx.room.name)
+        logger.info(f"Follow-ups: {followups.stats()}")
+        await followups.aclose()
+
+    ctx.add_shutdown_callback(unregister_answers)
 
     if ctx.room.remote_participants:
         for p in ctx.room.remote_participants.values():
@@ -344,4 +657,16 @@ async def entrypoint(ctx: JobContext):
 
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
+    # Job processes write their histograms here; the worker serves them all on /metrics
+    os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR",
+        os.path.join(tempfile.gettempdir(), "agent-prometheus"),
+    )
+    cli.run_app(
+        WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            prometheus_port=int(os.environ.get("PROMETHEUS_PORT", "9464")),
+            prometheus_multiproc_dir=os.environ["PROMETHEUS_MULTIPROC_DIR"],
+        )
+    )
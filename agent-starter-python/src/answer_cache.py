@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from embedding_cache import normalize_query
+from embeddings import EmbeddingClient
+from kb_index import LocalVectorIndex
+
+logger = logging.getLogger("agent")
+
+
+class SemanticAnswerCache:
+    """Per-worker FAQ cache consulted before the LLM sees a user turn.
+
+    A hit is either an utterance seen before (exact normalized text) or a query
+    embedding within ``distance_threshold`` of an ``answers_index`` entry, which is
+    much tighter than the KB search cutoff. Entries are dropped whenever the
+    answers they point at change, and any newly added answer clears the cache
+    since it may be a closer match for utterances already cached.
+    """
+
+    def __init__(
+        self,
+        kb_index: LocalVectorIndex,
+        embedder: EmbeddingClient,
+        *,
+        distance_threshold: float = 0.08,
+        embed_timeout: float = 0.3,
+        max_entries: int = 2_000,
+    ) -> None:
+        self.kb_index = kb_index
+        self.embedder = embedder
+        self.distance_threshold = distance_threshold
+        self.embed_timeout = embed_timeout
+        self.max_entries = max_entries
+
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_seconds = 0.0
+        self._llm_ttft_total = 0.0
+        self._llm_ttft_count = 0
+
+        self._lock = threading.Lock()
+        # normalized utterance -> (answers_index id, answer text)
+        self._entries: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        kb_index.add_listener(self._on_index_change)
+
+    async def lookup(self, text: str) -> Optional[str]:
+        """Return a cached answer for ``text`` or ``None`` to let the LLM handle it."""
+        key = normalize_query(text)
+        if not key:
+            return None
+        started = time.perf_counter()
+        self.lookups += 1
+        try:
+            answer = await self._lookup(key, text)
+        finally:
+            self.lookup_seconds += time.perf_counter() - started
+        if answer is not None:
+            self.hits += 1
+        return answer
+
+    def observe_llm_ttft(self, ttft: float) -> None:
+        """Feed LLM time-to-first-token samples used to estimate the latency saved."""
+        if ttft > 0:
+            self._llm_ttft_total += ttft
+            self._llm_ttft_count += 1
+
+    def stats(self) -> dict:
+        avg_ttft = (
+            self._llm_ttft_total / self._llm_ttft_count if self._llm_ttft_count else 0.0
+        )
+        # a KB turn normally costs two completions: the tool call and the reply
+        saved = self.hits * 2 * avg_ttft - self.lookup_seconds
+        return {
+            "entries": len(self._entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "latency_saved_s": round(max(saved, 0.0), 3),
+        }
+
+    async def _lookup(self, key: str, text: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        if not self.kb_index.ready:
+            return None
+        try:
+            # usually a cache hit already, since the transcript was prefetched
+            vec = await asyncio.wait_for(self.embedder.embed(text), self.embed_timeout)
+        except Exception as e:
+            logger.info(f"Answer cache skipped, embedding unavailable: {e!r}")
+            return None
+
+        matches = self.kb_index.search(vec, limit=1)
+        if not matches or matches[0]["score"] > self.distance_threshold:
+            return None
+        answer = (matches[0].get("answer_text") or "").strip()
+        if not answer:
+            return None
+
+        with self._lock:
+            self._entries[key] = (matches[0]["id"], answer)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return answer
+
+    def _on_index_change(self, changes: dict[str, str]) -> None:
+        with self._lock:
+            if "ADDED" in changes.values():
+                self._entries.clear()
+                return
+            stale = [k for k, (doc_id, _) in self._entries.items() if doc_id in changes]
+            for k in stale:
+                del self._entries[k]
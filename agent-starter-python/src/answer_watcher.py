@@ -0,0 +1,158 @@
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("agent")
+
+AnswerHandler = Callable[[Any], None]
+
+# Firestore accepts at most 30 values in an "in" filter
+MAX_ROOMS_PER_LISTENER = 30
+
+
+class AnswerWatcher:
+    """One ``answers`` listener per worker process, shared by every room it hosts.
+
+    Subscribes to unspoken answers for the rooms registered on this worker only
+    (``room_name in [...]``, one listener per 30 rooms) and routes each document
+    to its room's handler. Registering or unregistering a room resubscribes; the
+    new listener's first snapshot carries any answers already waiting for a newly
+    registered room. Each document is dispatched once while it stays unspoken;
+    handlers run on the listener thread. ``register``/``unregister`` block while
+    the listeners are replaced, so call them off the event loop.
+    """
+
+    def __init__(self, *, collection_name: str = "answers") -> None:
+        self.collection_name = collection_name
+        self.dispatched = 0
+        self.unrouted = 0
+
+        self._lock = threading.Lock()
+        self._routes: dict[str, AnswerHandler] = {}
+        # unspoken answers currently in view, and the ones already handed out
+        self._unspoken: dict[str, Any] = {}
+        self._delivered: set[str] = set()
+        self._db = None
+        self._watches: list = []
+        # bumped on every resubscribe; snapshots from older listeners are ignored
+        self._generation = 0
+
+    def start(self, db) -> None:
+        """Listen for unspoken answers in the rooms registered on this worker."""
+        with self._lock:
+            if self._db is not None:
+                return
+            self._db = db
+        self._resubscribe()
+        logger.info(f"Answer watcher listening on {self.collection_name}")
+
+    def stop(self) -> None:
+        with self._lock:
+            self._db = None
+            self._generation += 1
+            watches, self._watches = self._watches, []
+        for watch in watches:
+            watch.unsubscribe()
+
+    @property
+    def active(self) -> bool:
+        return self._db is not None and all(
+            getattr(watch, "is_active", True) for watch in self._watches
+        )
+
+    def register(self, room_name: str, handler: AnswerHandler) -> None:
+        """Route answers for ``room_name`` to ``handler`` and widen the listener."""
+        with self._lock:
+            self._routes[room_name] = handler
+        self._resubscribe()
+
+    def unregister(self, room_name: str) -> None:
+        """Stop routing ``room_name`` and forget its answers."""
+        with self._lock:
+            self._routes.pop(room_name, None)
+            for doc_id, doc in list(self._unspoken.items()):
+                if _room_of(doc) == room_name:
+                    del self._unspoken[doc_id]
+                    self._delivered.discard(doc_id)
+        self._resubscribe()
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self._routes),
+            "listeners": len(self._watches),
+            "unspoken": len(self._unspoken),
+            "dispatched": self.dispatched,
+            "unrouted": self.unrouted,
+        }
+
+    def _resubscribe(self) -> None:
+        """Replace the listeners with ones scoped to the rooms registered now."""
+        with self._lock:
+            if self._db is None:
+                return
+            db = self._db
+            self._generation += 1
+            generation = self._generation
+            rooms = sorted(self._routes)
+            old, self._watches = self._watches, []
+        # unsubscribing joins the listener thread, which may be waiting on the lock
+        for watch in old:
+            watch.unsubscribe()
+
+        def on_snapshot(docs, changes, read_time):
+            self._on_snapshot(docs, changes, read_time, generation=generation)
+
+        watches = []
+        for i in range(0, len(rooms), MAX_ROOMS_PER_LISTENER):
+            query = (
+                db.collection(self.collection_name)
+                .where("spoken", "==", False)
+                .where("room_name", "in", rooms[i : i + MAX_ROOMS_PER_LISTENER])
+            )
+            watches.append(query.on_snapshot(on_snapshot))
+
+        with self._lock:
+            if generation == self._generation:
+                self._watches = watches
+                return
+        # a newer register/unregister replaced these while they were starting
+        for watch in watches:
+            watch.unsubscribe()
+
+    def _on_snapshot(
+        self, docs, changes, read_time, *, generation: Optional[int] = None
+    ) -> None:
+        ready: list[tuple[AnswerHandler, Any]] = []
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            for change in changes:
+                doc = change.document
+                if change.type.name == "REMOVED":
+                    # marked spoken (or deleted): it may be delivered again if it returns
+                    self._unspoken.pop(doc.id, None)
+                    self._delivered.discard(doc.id)
+                    continue
+                handler = self._routes.get(_room_of(doc))
+                if handler is None:
+                    # the room left between the snapshot and now
+                    self.unrouted += 1
+                    continue
+                self._unspoken[doc.id] = doc
+                if doc.id in self._delivered:
+                    continue
+                self._delivered.add(doc.id)
+                ready.append((handler, doc))
+        for handler, doc in ready:
+            self._dispatch(handler, doc)
+
+    def _dispatch(self, handler: AnswerHandler, doc: Any) -> None:
+        self.dispatched += 1
+        try:
+            handler(doc)
+        except Exception:
+            logger.exception(f"Answer handler failed for {doc.id}")
+
+
+def _room_of(doc: Any) -> Optional[str]:
+    return (doc.to_dict() or {}).get("room_name")
@@ -0,0 +1,163 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger("agent")
+
+_PUNCT = re.compile(r"[^\w\s']+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for an utterance: lowercase, punctuation dropped, spaces collapsed."""
+    text = _PUNCT.sub(" ", (text or "").lower())
+    return _SPACE.sub(" ", text).strip()
+
+
+class EmbeddingCache:
+    """Process-wide LRU of query embeddings keyed by normalized text.
+
+    Entries expire after ``ttl`` seconds and the least recently used ones are
+    evicted past ``max_entries``. When ``path`` is set, entries are also spilled to
+    a SQLite file so a restarted worker starts warm.
+    """
+
+    def __init__(
+        self,
+        *,
+        model: str = "text-embedding-3-small",
+        dimensions: int = 1536,
+        max_entries: int = 10_000,
+        ttl: float = 7 * 24 * 3600,
+        path: Optional[str] = None,
+    ) -> None:
+        self.model = model
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._open(path)
+
+    def _open(self, path: str) -> None:
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT NOT NULL, model TEXT NOT NULL, dim INTEGER NOT NULL,"
+                " vec BLOB NOT NULL, created_at REAL NOT NULL,"
+                " PRIMARY KEY (key, model, dim))"
+            )
+            self._db.execute(
+                "DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+            self._db.commit()
+            logger.info(f"Embedding cache spilling to {path}")
+        except sqlite3.Error:
+            logger.exception(f"Failed to open embedding cache at {path}, memory only")
+            self._db = None
+
+    def get(self, text: str) -> Optional[list[float]]:
+        return self._get(text, count=True)
+
+    def peek(self, text: str) -> Optional[list[float]]:
+        """Like ``get``, but not counted as a hit or miss."""
+        return self._get(text, count=False)
+
+    def put(self, text: str, embedding: list[float]) -> None:
+        key = normalize_query(text)
+        if not key:
+            return
+        vec = np.asarray(embedding, dtype=np.float32)
+        now = time.time()
+        with self._lock:
+            self._remember(key, vec, now)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)",
+                        (key, self.model, self.dimensions, vec.tobytes(), now),
+                    )
+                    self._db.commit()
+                except sqlite3.Error:
+                    logger.exception("Failed to spill embedding to disk")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _get(self, text: str, *, count: bool) -> Optional[list[float]]:
+        key = normalize_query(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, vec = entry
+                if now - created_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return vec.tolist()
+                del self._entries[key]
+
+            loaded = self._load(key, now)
+            if loaded is not None:
+                # keep the stored age: a disk hit must not restart the entry's TTL
+                vec, created_at = loaded
+                self._remember(key, vec, created_at)
+                if count:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return vec.tolist()
+
+            if count:
+                self.misses += 1
+            return None
+
+    def _remember(self, key: str, vec: np.ndarray, created_at: float) -> None:
+        self._entries[key] = (created_at, vec)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str, now: float) -> Optional[tuple[np.ndarray, float]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT vec, created_at FROM embeddings"
+                " WHERE key = ? AND model = ? AND dim = ?",
+                (key, self.model, self.dimensions),
+            ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Failed to read embedding cache")
+            return None
+        if row is None or now - row[1] > self.ttl:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).copy(), row[1]
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from typing import Any, Optional
+
+from openai import AsyncOpenAI
+
+from embedding_cache import EmbeddingCache, normalize_query
+
+logger = logging.getLogger("agent")
+
+
+class EmbeddingClient:
+    """Async embeddings client shared by every session in the worker process.
+
+    Keeps one pooled ``AsyncOpenAI`` connection, coalesces identical in-flight
+    queries onto a single request and micro-batches whatever arrives within
+    ``batch_window`` seconds into one multi-input embeddings call.
+    """
+
+    def __init__(
+        self,
+        *,
+        model: str = "text-embedding-3-small",
+        dimensions: int = 1536,
+        cache: Optional[EmbeddingCache] = None,
+        batch_window: float = 0.005,
+        max_batch: int = 64,
+        client: Optional[Any] = None,
+    ) -> None:
+        self.model = model
+        self.dimensions = dimensions
+        self.cache = cache
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self.requests = 0
+        self.coalesced = 0
+        self.batched_inputs = 0
+
+        self._client = client
+        self._owns_client = client is None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._pending: list[tuple[str, str]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> list[float]:
+        """Embed one utterance, sharing the call with identical concurrent queries."""
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached
+
+        self._bind_loop()
+        key = normalize_query(text) or text
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+        else:
+            fut = self._loop.create_future()
+            # mark failures as retrieved even if every waiter has been cancelled
+            fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[key] = fut
+            self._pending.append((key, text))
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = self._loop.call_later(
+                    self.batch_window, self._flush
+                )
+        # one caller going away must not cancel the request other rooms wait on
+        return await asyncio.shield(fut)
+
+    def peek(self, text: str) -> Optional[list[float]]:
+        """The cached embedding for ``text``, without a request or a counted cache lookup."""
+        if self.cache is None:
+            return None
+        return self.cache.peek(text)
+
+    def ready(self, text: str) -> bool:
+        """Whether ``text`` is cached or already being embedded, so awaiting it sends nothing."""
+        key = normalize_query(text) or text
+        return key in self._inflight or self.peek(text) is not None
+
+    async def embed_many(self, texts: list[str]) -> list[list[float]]:
+        return list(await asyncio.gather(*(self.embed(t) for t in texts)))
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "batched_inputs": self.batched_inputs,
+        }
+
+    async def aclose(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._owns_client and self._client is not None:
+            await self._client.close()
+            self._client = None
+        self._loop = None
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # the pooled connection and futures belong to a single event loop
+        old_loop, self._loop = self._loop, loop
+        self._inflight.clear()
+        self._pending.clear()
+        self._flush_handle = None
+        if self._owns_client:
+            if self._client is not None:
+                self._retire_client(self._client, old_loop)
+            self._client = AsyncOpenAI()
+
+    def _retire_client(
+        self, client: Any, loop: Optional[asyncio.AbstractEventLoop]
+    ) -> None:
+        """Close a replaced client's connection pool, on its own loop while that still runs."""
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(_close_quietly(client), loop)
+            return
+        task = asyncio.get_running_loop().create_task(_close_quietly(client))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = self._loop.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, str]]) -> None:
+        self.requests += 1
+        self.batched_inputs += len(batch)
+        try:
+            response = await self._client.embeddings.create(
+                input=[text for _, text in batch],
+                model=self.model,
+                dimensions=self.dimensions,
+            )
+            embeddings = [
+                d.embedding for d in sorted(response.data, key=lambda d: d.index)
+            ]
+            if len(embeddings) != len(batch):
+                raise RuntimeError(
+                    f"Embeddings response size mismatch: {len(embeddings)} != {len(batch)}"
+                )
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+            for key, _ in batch:
+                fut = self._inflight.pop(key, None)
+                if fut is not None and not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for (key, text), embedding in zip(batch, embeddings):
+            if self.cache is not None:
+                self.cache.put(text, embedding)
+            fut = self._inflight.pop(key, None)
+            if fut is not None and not fut.done():
+                fut.set_result(embedding)
+
+
+async def _close_quietly(client: Any) -> None:
+    try:
+        await client.close()
+    except Exception as e:
+        # its loop is gone; the sockets are released when the client is collected
+        logger.debug(f"Closing replaced embeddings client failed: {e!r}")
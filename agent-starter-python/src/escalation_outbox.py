@@ -0,0 +1,252 @@
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Awaitable
+from typing import Callable, Optional
+
+logger = logging.getLogger("agent")
+
+# Returns True once the escalation needs no further attempts (delivered, or
+# rejected for good); False or an exception schedules a retry.
+Sender = Callable[[dict], Awaitable[bool]]
+
+
+class EscalationOutbox:
+    """Durable queue of supervisor escalations, drained in the background.
+
+    ``enqueue`` only writes a row to SQLite, so the ``answer`` tool can return
+    the hold line right away. A drainer task delivers due rows in batches with
+    jittered exponential backoff; rows are leased while in flight so several
+    worker processes can share one file, and whatever survives a crash is sent
+    by the next drainer once its lease expires. ``flush`` pushes out everything
+    pending, e.g. at job shutdown, except rows another outbox holds a live
+    lease on.
+    """
+
+    def __init__(
+        self,
+        send: Sender,
+        *,
+        path: str = ":memory:",
+        batch_size: int = 10,
+        poll_interval: float = 5.0,
+        lease: float = 30.0,
+        backoff: float = 0.5,
+        max_backoff: float = 60.0,
+    ) -> None:
+        self.send = send
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.enqueued = 0
+        self.delivered = 0
+        self.failures = 0
+
+        # identifies this outbox's leases among every process sharing the file
+        self.owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        # rows this outbox is sending right now; its own leases on others are stale
+        self._in_flight: set[int] = set()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL,"
+            " created_at REAL NOT NULL, last_error TEXT,"
+            " lease_owner TEXT, lease_until REAL)"
+        )
+        self._add_lease_columns()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drainer: Optional[asyncio.Task] = None
+
+    def enqueue(self, payload: dict) -> int:
+        """Persist ``payload`` for delivery and return its outbox id."""
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO outbox (payload, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?)",
+                (json.dumps(payload), now, now),
+            )
+        self.enqueued += 1
+        self.start()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return cur.lastrowid
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def start(self) -> None:
+        """Run the drainer on the current event loop (no-op when already running)."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if (
+            self._drainer is not None
+            and not self._drainer.done()
+            and self._loop is loop
+        ):
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._drainer = loop.create_task(self._drain_loop())
+
+    async def flush(self, timeout: float = 5.0) -> int:
+        """Try every pending row now, ignoring backoff; returns how many remain."""
+        give_up_at = time.monotonic() + timeout
+        while time.monotonic() < give_up_at:
+            rows = self._claim(due_only=False)
+            if not rows:
+                break
+            remaining = give_up_at - time.monotonic()
+            try:
+                await asyncio.wait_for(self._deliver(rows), max(remaining, 0.01))
+            except asyncio.TimeoutError:
+                break
+            if not any(self._exists(row_id) for row_id, _, _ in rows):
+                continue
+            # something failed again: no point hammering it inside the same flush
+            break
+        return self.pending()
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "failures": self.failures,
+            "pending": self.pending(),
+        }
+
+    async def aclose(self, timeout: float = 5.0) -> None:
+        """Flush what can be delivered within ``timeout`` and stop the drainer."""
+        if self._drainer is not None:
+            self._drainer.cancel()
+            with contextlib.suppress(BaseException):
+                await self._drainer
+            self._drainer = None
+        left = await self.flush(timeout)
+        if left:
+            logger.warning(f"{left} escalations still queued in the outbox")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _add_lease_columns(self) -> None:
+        """Upgrade an outbox file written before leases had their own columns."""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        for column, kind in (("lease_owner", "TEXT"), ("lease_until", "REAL")):
+            if column in columns:
+                continue
+            try:
+                self._db.execute(f"ALTER TABLE outbox ADD COLUMN {column} {kind}")
+            except sqlite3.OperationalError as e:
+                # another process sharing the file added it first
+                if "duplicate column" not in str(e):
+                    raise
+
+    async def _drain_loop(self) -> None:
+        while True:
+            rows = self._claim(due_only=True)
+            if rows:
+                await self._deliver(rows)
+                continue
+            self._wakeup.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self._next_wait())
+
+    def _next_wait(self) -> float:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(MAX(next_attempt_at, COALESCE(lease_until, 0))) FROM outbox"
+            ).fetchone()
+        if row[0] is None:
+            return self.poll_interval
+        return min(max(row[0] - time.time(), 0.05), self.poll_interval)
+
+    def _claim(self, *, due_only: bool) -> list[tuple[int, dict, int]]:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # a live lease held by another outbox means that row is in flight there;
+                # this outbox's own leases only count while it is still sending the row
+                rows = self._db.execute(
+                    "SELECT id, payload, attempts FROM outbox"
+                    " WHERE next_attempt_at <= ?"
+                    " AND (lease_until IS NULL OR lease_until <= ? OR lease_owner = ?)"
+                    " ORDER BY id LIMIT ?",
+                    (
+                        now if due_only else float("inf"),
+                        now,
+                        self.owner,
+                        self.batch_size + len(self._in_flight),
+                    ),
+                ).fetchall()
+                rows = [row for row in rows if row[0] not in self._in_flight]
+                rows = rows[: self.batch_size]
+                self._db.executemany(
+                    "UPDATE outbox SET lease_owner = ?, lease_until = ? WHERE id = ?",
+                    [(self.owner, now + self.lease, row[0]) for row in rows],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._in_flight.update(row[0] for row in rows)
+        return [
+            (row_id, json.loads(payload), attempts)
+            for row_id, payload, attempts in rows
+        ]
+
+    async def _deliver(self, rows: list[tuple[int, dict, int]]) -> None:
+        try:
+            results = await asyncio.gather(
+                *(self.send(payload) for _, payload, _ in rows), return_exceptions=True
+            )
+            self._record_results(rows, results)
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(row_id for row_id, _, _ in rows)
+
+    def _record_results(self, rows: list[tuple[int, dict, int]], results: list) -> None:
+        for (row_id, _, attempts), result in zip(rows, results):
+            if result is True:
+                self.delivered += 1
+                with self._lock:
+                    self._db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                continue
+            self.failures += 1
+            error = (
+                repr(result) if isinstance(result, BaseException) else "not accepted"
+            )
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempts))
+            logger.warning(f"Escalation {row_id} delivery failed ({error}), retrying")
+            with self._lock:
+                self._db.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ?,"
+                    " lease_owner = NULL, lease_until = NULL WHERE id = ?",
+                    (attempts + 1, time.time() + delay, error, row_id),
+                )
+
+    def _exists(self, row_id: int) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM outbox WHERE id = ?", (row_id,)
+            ).fetchone()
+        return row is not None
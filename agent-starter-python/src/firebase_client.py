@@ -0,0 +1,281 @@
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections.abc import Mapping
+from typing import Any, Optional
+
+import aiohttp
+
+logger = logging.getLogger("agent")
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+def parse_server_timing(header: Optional[str]) -> dict[str, float]:
+    """``{name: milliseconds}`` from a Server-Timing header, skipping entries without ``dur``."""
+    timings: dict[str, float] = {}
+    for entry in (header or "").split(","):
+        name, *params = (part.strip() for part in entry.split(";"))
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "dur" and name:
+                with contextlib.suppress(ValueError):
+                    timings[name] = timings.get(name, 0.0) + float(value)
+    return timings
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of making a request while the breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe."""
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            if self._opened_at is None or self._probing:
+                logger.warning(
+                    f"Firebase circuit opened after {self._failures} consecutive failures"
+                )
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def release_probe(self) -> None:
+        """End a half-open probe that produced no verdict (e.g. it was cancelled)."""
+        self._probing = False
+
+
+class FirebaseClient:
+    """Process-wide client for the HITL Cloud Functions.
+
+    Reuses one keep-alive connection pool (with DNS caching) across every session
+    in the worker, gives each call a total deadline budget, retries idempotent
+    calls with jittered backoff, and fails fast while the circuit breaker is open.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str],
+        *,
+        timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff: float = 0.1,
+        pool_size: int = 100,
+        dns_ttl: int = 300,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.dns_ttl = dns_ttl
+        self.breaker = breaker or CircuitBreaker()
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # per path: client-side time vs. the phases the function reports in Server-Timing
+        self._timings: dict[str, dict[str, Any]] = {}
+
+    @property
+    def available(self) -> bool:
+        """False while the breaker is open, so callers can skip straight to a fallback."""
+        return self.breaker.state != "open"
+
+    async def post(
+        self,
+        path: str,
+        payload: Any,
+        *,
+        deadline: Optional[float] = None,
+        idempotent: bool = False,
+    ) -> tuple[int, str]:
+        """POST ``payload`` as JSON to ``path`` and return ``(status, body)``.
+
+        ``deadline`` is the total budget in seconds across all attempts. Only
+        ``idempotent`` calls are retried. The breaker counts one success or
+        failure per call, not per attempt.
+        """
+        status, text, _ = await self.post_with_headers(
+            path, payload, deadline=deadline, idempotent=idempotent
+        )
+        return status, text
+
+    async def post_with_headers(
+        self,
+        path: str,
+        payload: Any,
+        *,
+        deadline: Optional[float] = None,
+        idempotent: bool = False,
+    ) -> tuple[int, str, Mapping[str, str]]:
+        """Like :meth:`post`, also returning the final response's headers."""
+        if not self.base_url:
+            raise RuntimeError("FIREBASE_URL is not set")
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Firebase circuit open, skipping {path}")
+
+        try:
+            status, text, headers = await self._post_with_retries(
+                path, payload, deadline=deadline, idempotent=idempotent
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.breaker.record_failure()
+            raise
+        else:
+            if status in RETRYABLE_STATUSES:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return status, text, headers
+        finally:
+            # cancelled (stale prefetch) or failed unexpectedly: let the next call probe
+            self.breaker.release_probe()
+
+    async def _post_with_retries(
+        self,
+        path: str,
+        payload: Any,
+        *,
+        deadline: Optional[float],
+        idempotent: bool,
+    ) -> tuple[int, str, Mapping[str, str]]:
+        session = self._ensure_session()
+        url = self.base_url + path
+        budget = self.timeout if deadline is None else deadline
+        give_up_at = time.monotonic() + budget
+        attempts = self.max_retries + 1 if idempotent else 1
+
+        for attempt in range(attempts):
+            remaining = give_up_at - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"Deadline of {budget}s exceeded")
+                started = time.perf_counter()
+                async with session.post(
+                    url, json=payload, timeout=aiohttp.ClientTimeout(total=remaining)
+                ) as r:
+                    text = await r.text()
+                    status = r.status
+                    headers = r.headers
+                self._record_timing(
+                    path, time.perf_counter() - started, headers.get("Server-Timing")
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not self._should_retry(attempt, attempts, give_up_at):
+                    raise
+                logger.warning(f"POST {path} failed ({e!r}), retrying")
+            else:
+                if status not in RETRYABLE_STATUSES:
+                    return status, text, headers
+                if not self._should_retry(attempt, attempts, give_up_at):
+                    return status, text, headers
+                logger.warning(f"POST {path} returned {status}, retrying")
+
+            await asyncio.sleep(self._backoff_delay(attempt, give_up_at))
+
+        raise AssertionError("unreachable")
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Mean time per call for each path, split into server phases and the rest.
+
+        ``network_ms`` is client time the function did not account for:
+        connection setup, transfer, and front-end queueing.
+        """
+        out = {}
+        for path, t in self._timings.items():
+            n = t["requests"]
+            out[path] = {
+                "requests": n,
+                "cold_starts": t["cold_starts"],
+                "client_ms": round(t["client_ms"] / n, 1),
+                "server_ms": round(t["server_ms"] / n, 1),
+                "network_ms": round((t["client_ms"] - t["server_ms"]) / n, 1),
+                "phases_ms": {
+                    name: round(ms / n, 1) for name, ms in t["phases_ms"].items()
+                },
+            }
+        return out
+
+    def _record_timing(self, path: str, elapsed: float, header: Optional[str]) -> None:
+        timing = parse_server_timing(header)
+        t = self._timings.setdefault(
+            path,
+            {
+                "requests": 0,
+                "cold_starts": 0,
+                "client_ms": 0.0,
+                "server_ms": 0.0,
+                "phases_ms": {},
+            },
+        )
+        t["requests"] += 1
+        t["client_ms"] += elapsed * 1000
+        # "total" covers the handler; "init" (cold start) happened before it
+        t["server_ms"] += timing.pop("total", 0.0)
+        if "init" in timing:
+            t["cold_starts"] += 1
+        for name, ms in timing.items():
+            t["phases_ms"][name] = t["phases_ms"].get(name, 0.0) + ms
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+        return self._session
+
+    def _should_retry(self, attempt: int, attempts: int, give_up_at: float) -> bool:
+        return (
+            attempt + 1 < attempts
+            and time.monotonic() < give_up_at
+            and self.breaker.state != "open"
+        )
+
+    def _backoff_delay(self, attempt: int, give_up_at: float) -> float:
+        # full jitter, never sleeping past the deadline
+        delay = random.uniform(0, self.backoff * (2**attempt))
+        return max(0.0, min(delay, give_up_at - time.monotonic()))
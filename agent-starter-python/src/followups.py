@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import logging
+from typing import Any, Optional
+
+from google.cloud import firestore
+
+logger = logging.getLogger("agent")
+
+
+class FollowUpDelivery:
+    """Speaks supervisor follow-ups for one room from the job's event loop.
+
+    ``submit`` is safe to call from the Firestore listener thread: it hands the
+    answer to the loop captured at construction. A single task speaks queued
+    answers in arrival order, each one after any speech already playing, and the
+    "spoken" acks are written back in periodic batches from a worker thread.
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        db: Any,
+        *,
+        ack_interval: float = 1.0,
+        max_ack_batch: int = 500,
+    ) -> None:
+        self.session = session
+        self.db = db
+        self.ack_interval = ack_interval
+        self.max_ack_batch = max_ack_batch
+
+        self.spoken = 0
+        self.ack_commits = 0
+
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[tuple[Any, str]] = asyncio.Queue()
+        self._acks: list[Any] = []
+        self._ack_ready = asyncio.Event()
+        self._speaker: Optional[asyncio.Task] = None
+        self._acker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._speaker is None:
+            self._speaker = self._loop.create_task(self._speak_loop())
+            self._acker = self._loop.create_task(self._ack_loop())
+
+    def submit(self, doc: Any) -> None:
+        """Queue an answers document for this room; callable from any thread."""
+        text = ((doc.to_dict() or {}).get("answer_text") or "").strip()
+        if not text:
+            return
+        try:
+            self._loop.call_soon_threadsafe(
+                self._queue.put_nowait, (doc.reference, text)
+            )
+        except RuntimeError:
+            logger.warning(f"Dropping follow-up {doc.id}: job loop is closed")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "spoken": self.spoken,
+            "pending_acks": len(self._acks),
+            "ack_commits": self.ack_commits,
+        }
+
+    async def aclose(self) -> None:
+        for task in (self._speaker, self._acker):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(BaseException):
+                    await task
+        self._speaker = self._acker = None
+        await self._flush_acks()
+
+    async def _speak_loop(self) -> None:
+        while True:
+            ref, text = await self._queue.get()
+            try:
+                # let whatever the agent is saying finish instead of talking over it
+                current = self.session.current_speech
+                if current is not None:
+                    await current.wait_for_playout()
+                handle = self.session.say(text)
+                await handle.wait_for_playout()
+                if handle.interrupted:
+                    logger.info(f"Follow-up {ref.id} was interrupted by the caller")
+                self.spoken += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Failed to speak follow-up {ref.id}")
+                continue
+            self._acks.append(ref)
+            if len(self._acks) >= self.max_ack_batch:
+                self._ack_ready.set()
+
+    async def _ack_loop(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._ack_ready.wait(), self.ack_interval)
+            self._ack_ready.clear()
+            await self._flush_acks()
+
+    async def _flush_acks(self) -> None:
+        while self._acks:
+            refs = self._acks[: self.max_ack_batch]
+            del self._acks[: self.max_ack_batch]
+            try:
+                await asyncio.to_thread(self._commit_acks, refs)
+            except Exception:
+                logger.exception(f"Failed to mark {len(refs)} answers as spoken")
+                # retry on the next tick; the answers stay routed to this room
+                self._acks[:0] = refs
+                return
+            self.ack_commits += 1
+
+    def _commit_acks(self, refs: list[Any]) -> None:
+        batch = self.db.batch()
+        for ref in refs:
+            batch.update(ref, {"spoken": True, "spoken_at": firestore.SERVER_TIMESTAMP})
+        batch.commit()
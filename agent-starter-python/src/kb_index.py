@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger("agent")
+
+# Same cutoff the vector_search function passes to find_nearest (cosine distance).
+DISTANCE_THRESHOLD = 0.6
+
+
+def _normalize_ts(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+class LocalVectorIndex:
+    """In-process copy of the ``answers_index`` collection.
+
+    Holds the row-normalized ``query_embedding`` vectors as a float32 matrix so a
+    cosine top-k is a single matrix-vector product. A Firestore snapshot listener
+    keeps it current; ``search`` returns ``None`` while the index is cold or the
+    listener has dropped so callers can fall back to the remote search.
+    """
+
+    def __init__(
+        self,
+        *,
+        dim: int = 1536,
+        vector_field: str = "query_embedding",
+        distance_threshold: float = DISTANCE_THRESHOLD,
+    ) -> None:
+        self.dim = dim
+        self.vector_field = vector_field
+        self.distance_threshold = distance_threshold
+
+        self._lock = threading.Lock()
+        self._rows: dict[str, tuple] = {}
+        # (ids, matrix, metadata) is swapped as a whole so readers never need the lock
+        self._snapshot = ([], np.zeros((0, dim), dtype=np.float32), [])
+        self._watch = None
+        self._synced = False
+        self._listeners: list[Callable[[dict[str, str]], None]] = []
+        self.last_sync: Optional[float] = None
+
+    def start(self, db, collection_name: str = "answers_index") -> None:
+        """Subscribe to ``collection_name`` and keep the matrix in sync."""
+        if self._watch is not None:
+            return
+        self._watch = db.collection(collection_name).on_snapshot(self._on_snapshot)
+        logger.info(f"Local vector index listening on {collection_name}")
+
+    def stop(self) -> None:
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+        self._synced = False
+
+    @property
+    def ready(self) -> bool:
+        """True once the initial snapshot landed and the listener is still alive."""
+        if not self._synced:
+            return False
+        # a watch that is no longer active won't deliver updates, so treat it as stale
+        return self._watch is None or getattr(self._watch, "is_active", True)
+
+    def __len__(self) -> int:
+        return len(self._snapshot[0])
+
+    def add_listener(self, callback: Callable[[dict[str, str]], None]) -> None:
+        """Call ``callback({doc_id: "ADDED" | "MODIFIED" | "REMOVED"})`` after each update."""
+        self._listeners.append(callback)
+
+    def upsert(self, doc_id: str, data: dict[str, Any]) -> None:
+        """Insert or replace one document (also used to seed the index directly)."""
+        with self._lock:
+            kind = "MODIFIED" if doc_id in self._rows else "ADDED"
+            self._apply(doc_id, data)
+            self._rebuild()
+        self._notify({doc_id: kind})
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            if self._rows.pop(doc_id, None) is None:
+                return
+            self._rebuild()
+        self._notify({doc_id: "REMOVED"})
+
+    def mark_synced(self) -> None:
+        self._synced = True
+        self.last_sync = time.time()
+
+    def search(
+        self, query_vector: Sequence[float], limit: int = 3
+    ) -> Optional[list[dict[str, Any]]]:
+        """Cosine top-k over the local matrix, in the shape vector_search returns.
+
+        Returns ``None`` when the index cannot answer authoritatively.
+        """
+        if not self.ready:
+            return None
+        ids, matrix, meta = self._snapshot
+        if not ids:
+            return []
+
+        q = np.asarray(query_vector, dtype=np.float32)
+        if q.shape != (self.dim,):
+            return None
+        norm = float(np.linalg.norm(q))
+        if norm == 0.0:
+            return []
+        distances = 1.0 - matrix @ (q / norm)
+
+        k = min(limit, len(ids))
+        top = (
+            np.argpartition(distances, k - 1)[:k]
+            if k < len(ids)
+            else np.arange(len(ids))
+        )
+        top = top[np.argsort(distances[top])]
+
+        results = []
+        for i in top:
+            distance = float(distances[i])
+            if distance > self.distance_threshold:
+                break
+            results.append({**meta[i], "id": ids[i], "score": distance})
+        return results
+
+    def _on_snapshot(self, docs, changes, read_time) -> None:
+        try:
+            with self._lock:
+                for ch in changes:
+                    if ch.type.name == "REMOVED":
+                        self._rows.pop(ch.document.id, None)
+                    else:
+                        self._apply(ch.document.id, ch.document.to_dict() or {})
+                self._rebuild()
+            self.mark_synced()
+            logger.info(f"Local vector index synced: {len(self)} vectors")
+        except Exception:
+            logger.exception("Failed to apply answers_index snapshot")
+            return
+        self._notify({ch.document.id: ch.type.name for ch in changes})
+
+    def _notify(self, changes: dict[str, str]) -> None:
+        for callback in self._listeners:
+            try:
+                callback(changes)
+            except Exception:
+                logger.exception("answers_index listener failed")
+
+    def _apply(self, doc_id: str, data: dict[str, Any]) -> None:
+        vec = data.get(self.vector_field)
+        if vec is None:
+            self._rows.pop(doc_id, None)
+            return
+        arr = np.asarray(list(vec), dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        if arr.shape != (self.dim,) or norm == 0.0:
+            logger.warning(
+                f"Skipping answers_index/{doc_id}: bad embedding shape {arr.shape}"
+            )
+            self._rows.pop(doc_id, None)
+            return
+        meta = {
+            k: _normalize_ts(v)
+            for k, v in data.items()
+            if k not in (self.vector_field, "embedding", "answer_embedding")
+        }
+        self._rows[doc_id] = (arr / norm, meta)
+
+    def _rebuild(self) -> None:
+        ids = list(self._rows)
+        if ids:
+            matrix = np.stack([self._rows[i][0] for i in ids])
+        else:
+            matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._snapshot = (ids, matrix, [self._rows[i][1] for i in ids])
@@ -0,0 +1,125 @@
+import asyncio
+import contextlib
+import logging
+from collections import OrderedDict
+from collections.abc import Awaitable
+from difflib import SequenceMatcher
+from typing import Any, Callable, Optional
+
+from embedding_cache import normalize_query
+
+logger = logging.getLogger("agent")
+
+
+class SpeculativeRetriever:
+    """Runs KB retrieval on the user's transcript while they are still talking.
+
+    Interim and final STT transcripts are fed in through ``update``; after a short
+    debounce the current turn text is searched in the background, and any older
+    in-flight speculation is cancelled. When the ``answer`` tool runs, ``take``
+    hands back the prefetched result if its query is close enough to the final one.
+    """
+
+    def __init__(
+        self,
+        search: Callable[[str], Awaitable[Any]],
+        *,
+        debounce: float = 0.15,
+        min_words: int = 3,
+        match_threshold: float = 0.85,
+        max_entries: int = 4,
+    ) -> None:
+        self._search = search
+        self.debounce = debounce
+        self.min_words = min_words
+        self.match_threshold = match_threshold
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._finals: list[str] = []
+        self._current: Optional[str] = None
+        self._tasks: OrderedDict[str, asyncio.Task] = OrderedDict()
+
+    def update(self, transcript: str, is_final: bool) -> None:
+        """Feed an STT transcript event for the turn in progress."""
+        transcript = (transcript or "").strip()
+        if is_final:
+            if transcript:
+                self._finals.append(transcript)
+            text = " ".join(self._finals)
+        else:
+            text = " ".join([*self._finals, transcript])
+        self._speculate(text)
+
+    def end_turn(self) -> None:
+        """Start accumulating a new turn; prefetched results stay available to ``take``."""
+        self._finals = []
+        self._current = None
+
+    async def take(self, query: str) -> Optional[Any]:
+        """Return the prefetched result for ``query``, or ``None`` if there isn't one."""
+        key = normalize_query(query)
+        best, best_ratio = None, 0.0
+        for candidate in self._tasks:
+            ratio = SequenceMatcher(None, key, candidate).ratio()
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+
+        if best is None or best_ratio < self.match_threshold:
+            self.misses += 1
+            return None
+
+        task = self._tasks[best]
+        try:
+            # still running is fine: it started earlier than a fresh search would
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.info(f"Prefetched retrieval for '{best}' unusable: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"Reusing prefetched retrieval (similarity {best_ratio:.2f})")
+        return result
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    async def aclose(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        for task in self._tasks.values():
+            with contextlib.suppress(BaseException):
+                await task
+        self._tasks.clear()
+
+    def _speculate(self, text: str) -> None:
+        key = normalize_query(text)
+        if len(key.split()) < self.min_words or key == self._current:
+            return
+
+        # the transcript moved on: the previous guess is stale unless it already finished
+        if self._current is not None:
+            stale = self._tasks.get(self._current)
+            if stale is not None and not stale.done():
+                stale.cancel()
+                del self._tasks[self._current]
+        self._current = key
+
+        if key not in self._tasks:
+            task = asyncio.create_task(self._run(text))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._tasks[key] = task
+            while len(self._tasks) > self.max_entries:
+                _, evicted = self._tasks.popitem(last=False)
+                evicted.cancel()
+
+    async def _run(self, text: str) -> Any:
+        await asyncio.sleep(self.debounce)
+        return await self._search(text)
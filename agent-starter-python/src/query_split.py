@@ -0,0 +1,105 @@
+import re
+
+# Words that start a new question, so "... and <word> ..." is a second question
+_QUESTION_STARTS = frozenset(
+    [
+        "are",
+        "is",
+        "do",
+        "does",
+        "did",
+        "can",
+        "could",
+        "will",
+        "would",
+        "should",
+        "what",
+        "how",
+        "when",
+        "where",
+        "which",
+        "who",
+        "why",
+    ]
+)
+_SENTENCES = re.compile(r"(?<=[?.;!])\s+")
+_JOINERS = re.compile(r"[,\s]+(?:and also|and|also)\s+", re.IGNORECASE)
+
+
+def split_compound_query(query: str, *, max_parts: int = 4) -> list[str]:
+    """Split a multi-part question into its sub-questions.
+
+    Splits on sentence punctuation only when at least two sentences are questions,
+    keeping any statement with the question after it ("I have long hair. How much
+    is a cut?"). Splits on "and"/"also" only when what follows reads as a new
+    question ("... open on Sunday and do you take walk-ins"), so "cut and color"
+    stays whole. Returns ``[query]`` when there is nothing to split.
+    """
+    query = (query or "").strip()
+    parts: list[str] = []
+    for sentence in _question_groups(query):
+        parts.extend(_split_joined(sentence))
+    parts = [p.strip(" ,;") for p in parts]
+    parts = [p for p in parts if len(p.split()) >= 2]
+    if len(parts) <= 1:
+        return [query] if query else []
+    return parts[:max_parts]
+
+
+def is_question(text: str) -> bool:
+    """True when ``text`` ends in "?" or opens with a question word."""
+    text = (text or "").strip()
+    if text.endswith("?"):
+        return True
+    words = text.split(maxsplit=1)
+    return bool(words) and words[0].lower().strip(",.!") in _QUESTION_STARTS
+
+
+def merge_matches(per_part: list[list[dict]], limit: int) -> list[dict]:
+    """Merge per-part match lists, best match of every part first, deduped by id.
+
+    Keeps at least one match per part even when that exceeds ``limit``.
+    """
+    merged: list[dict] = []
+    seen: set = set()
+    depth = max((len(m) for m in per_part), default=0)
+    # round-robin so each sub-question gets its top answer in before any runner-up
+    for rank in range(depth):
+        for matches in per_part:
+            if rank >= len(matches):
+                continue
+            match = matches[rank]
+            key = match.get("id") or id(match)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(match)
+    return merged[: max(limit, len(per_part))]
+
+
+def _question_groups(query: str) -> list[str]:
+    sentences = [s for s in _SENTENCES.split(query) if s.strip()]
+    if sum(is_question(s) for s in sentences) < 2:
+        return [query]
+    groups: list[str] = []
+    lead: list[str] = []
+    for sentence in sentences:
+        lead.append(sentence)
+        if is_question(sentence):
+            groups.append(" ".join(lead))
+            lead = []
+    if lead:
+        groups[-1] = " ".join([groups[-1], *lead])
+    return groups
+
+
+def _split_joined(sentence: str) -> list[str]:
+    parts: list[str] = []
+    start = 0
+    for m in _JOINERS.finditer(sentence):
+        following = sentence[m.end() :].split(maxsplit=1)
+        if following and following[0].lower().strip("?,.") in _QUESTION_STARTS:
+            parts.append(sentence[start : m.start()])
+            start = m.end()
+    parts.append(sentence[start:])
+    return parts
@@ -0,0 +1,170 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+from collections.abc import Callable, Iterator
+from typing import Optional
+
+from livekit.agents import metrics
+from prometheus_client import Histogram
+
+logger = logging.getLogger("agent")
+
+# Ordered as a turn flows; "response" is STT final to the agent starting to speak
+STAGES = (
+    "end_of_utterance",
+    "final_to_tool",
+    "embedding",
+    "vector_search",
+    "escalation",
+    "tool",
+    "llm_ttft",
+    "tts_ttfb",
+    "response",
+)
+
+# Labelled by stage only: room and job ids go in the per-turn log record, since
+# one series per room would grow without bound on a long-lived worker
+TURN_STAGE_SECONDS = Histogram(
+    "agent_turn_stage_seconds",
+    "Time spent in each stage of a voice turn",
+    ["stage"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0),
+)
+
+# Set while a speculative prefetch runs, so its spans are kept apart from the turn's
+_speculative: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "speculative_span", default=False
+)
+
+
+@contextlib.contextmanager
+def speculative() -> Iterator[None]:
+    """Report spans in this context as ``prefetch_<stage>``, outside any turn."""
+    token = _speculative.set(True)
+    try:
+        yield
+    finally:
+        _speculative.reset(token)
+
+
+@contextlib.contextmanager
+def stage_span(stage: str) -> Iterator[None]:
+    """Time work no session's turn waits on (e.g. outbox delivery); histogram only."""
+    with _timed(TURN_STAGE_SECONDS.labels(stage=stage).observe):
+        yield
+
+
+@contextlib.contextmanager
+def _timed(record: Callable[[float], None]) -> Iterator[None]:
+    started = time.perf_counter()
+    cancelled = False
+    try:
+        yield
+    except asyncio.CancelledError:
+        # abandoned work (a superseded prefetch, an interrupted reply) isn't a sample
+        cancelled = True
+        raise
+    finally:
+        if not cancelled:
+            record(time.perf_counter() - started)
+
+
+class TurnTracer:
+    """Per-session latency spans for each user turn.
+
+    A turn opens on the final STT transcript and closes when the agent is back
+    to listening after replying. Stage durations are observed into the
+    ``agent_turn_stage_seconds`` histogram as they happen and logged together,
+    tagged with the room and job id, when the turn closes. Spans recorded
+    outside a turn still count toward the histogram. Spans inside
+    ``speculative()`` go to ``prefetch_<stage>`` and never into a turn, and
+    cancelled spans are dropped.
+    """
+
+    def __init__(
+        self, *, room_name: Optional[str] = None, job_id: Optional[str] = None
+    ) -> None:
+        self.room_name = room_name
+        self.job_id = job_id
+        self.turns = 0
+
+        self._final_at: Optional[float] = None
+        self._tool_started = False
+        self._responded = False
+        self._stages: dict[str, float] = {}
+
+    @property
+    def in_turn(self) -> bool:
+        return self._final_at is not None
+
+    def stt_final(self) -> None:
+        """A final transcript arrived; the reply latency is measured from here."""
+        if self._responded:
+            # the caller spoke over the reply: report that turn before starting anew
+            self.end_turn()
+        if self._final_at is None:
+            self.turns += 1
+        self._final_at = time.perf_counter()
+
+    def tool_started(self) -> None:
+        if self._final_at is not None and not self._tool_started:
+            self._tool_started = True
+            self.observe("final_to_tool", time.perf_counter() - self._final_at)
+
+    def agent_speaking(self) -> None:
+        if self._final_at is not None and not self._responded:
+            self._responded = True
+            self.observe("response", time.perf_counter() - self._final_at)
+
+    def agent_listening(self) -> None:
+        """The agent finished replying; late model metrics have been collected by now."""
+        if self._responded:
+            self.end_turn()
+
+    def observe_metrics(self, ev: metrics.AgentMetrics) -> None:
+        """Pick the model-side stages out of the session's ``metrics_collected`` events."""
+        if isinstance(ev, metrics.EOUMetrics):
+            self.observe("end_of_utterance", ev.end_of_utterance_delay)
+        elif isinstance(ev, metrics.LLMMetrics) and not ev.cancelled:
+            self.observe("llm_ttft", ev.ttft)
+        elif isinstance(ev, metrics.TTSMetrics) and not ev.cancelled:
+            self.observe("tts_ttfb", ev.ttfb)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if seconds < 0:
+            return
+        TURN_STAGE_SECONDS.labels(stage=stage).observe(seconds)
+        if self._final_at is not None:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        if _speculative.get():
+            with stage_span(f"prefetch_{stage}"):
+                yield
+            return
+        with _timed(lambda seconds: self.observe(stage, seconds)):
+            yield
+
+    def end_turn(self) -> Optional[dict]:
+        """Close the open turn and log its spans; returns the logged record."""
+        if self._final_at is None:
+            return None
+        record = {
+            "room": self.room_name,
+            "job_id": self.job_id,
+            "turn": self.turns,
+            "stages_ms": {
+                stage: round(self._stages[stage] * 1000, 1)
+                for stage in STAGES
+                if stage in self._stages
+            },
+        }
+        logger.info(f"Turn {self.turns} timings: {record['stages_ms']}", extra=record)
+        self._final_at = None
+        self._tool_started = False
+        self._responded = False
+        self._stages = {}
+        return record
@@ -0,0 +1,26 @@
+import base64
+from collections.abc import Sequence
+
+import numpy as np
+
+# Wire encodings understood by the vector_search function: base64 of
+# little-endian float32 / float16, or the plain JSON float list.
+VECTOR_DTYPES = {"f32": "<f4", "f16": "<f2"}
+
+
+def encode_vector(vec: Sequence[float], encoding: str) -> object:
+    """Encode one query vector for the request body in ``encoding``."""
+    if encoding == "json":
+        return list(vec)
+    dtype = VECTOR_DTYPES.get(encoding)
+    if dtype is None:
+        raise ValueError(f"Unsupported vector encoding {encoding!r}")
+    return base64.b64encode(np.asarray(vec, dtype=dtype).tobytes()).decode("ascii")
+
+
+def decode_vector(value: object, encoding: str) -> list[float]:
+    """Inverse of ``encode_vector``."""
+    if encoding == "json":
+        return [float(x) for x in value]
+    raw = base64.b64decode(value)
+    return np.frombuffer(raw, dtype=VECTOR_DTYPES[encoding]).astype(float).tolist()
@@ -1,8 +1,13 @@
+import contextlib
+
 import pytest
+from aiohttp import web
 from livekit.agents import AgentSession, llm, mock_tools
 from livekit.plugins import openai
 
 from agent import Assistant
+from embedding_cache import EmbeddingCache
+from firebase_client import FirebaseClient
 
 
 def _llm() -> llm.LLM:
@@ -221,3 +226,105 @@ async def test_refuses_harmful_request() -> None:
 
         # Ensures there are no function calls or other unexpected events
         result.expect.no_more_events()
+
+
+def test_direct_answer_requires_close_match() -> None:
+    """Only near-exact KB hits bypass the LLM and are spoken verbatim."""
+    assistant = Assistant()
+    close = {"answer_text": "We open at 9am.", "score": 0.05}
+    loose = {"answer_text": "We open at 9am.", "score": 0.4}
+
+    assert assistant._direct_answer([close, loose]) == "We open at 9am."
+    assert assistant._direct_answer([loose]) is None
+    assert assistant._direct_answer([{"answer_text": "", "score": 0.0}]) is None
+    assert assistant._direct_answer([]) is None
+
+
+def test_cache_lookup_skips_unembedded_statements() -> None:
+    """Small talk whose embedding isn't on hand never waits on the answer cache."""
+    assistant = Assistant(embedding_cache=EmbeddingCache(dimensions=1))
+    assert assistant._worth_cache_lookup("What time do you close?")
+    assert assistant._worth_cache_lookup("do you take walk-ins")
+    assert not assistant._worth_cache_lookup("Okay, thanks so much.")
+    assistant.embedder.cache.put("Okay, thanks so much.", [0.1])
+    assert assistant._worth_cache_lookup("okay thanks so much")
+
+
+async def _vector_search_server(handler) -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_post("/vector_search", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def _search_twice(handler) -> Assistant:
+    runner, url = await _vector_search_server(handler)
+    assistant = Assistant(firebase=FirebaseClient(url, backoff=0.001))
+    assistant.FIREBASE_URL = url
+    try:
+        for _ in range(2):
+            with contextlib.suppress(RuntimeError):
+                await assistant._firebase_vector_search(
+                    collection_name="answers_index", query_vector=[0.1, 0.2]
+                )
+    finally:
+        await assistant.firebase.aclose()
+        await runner.cleanup()
+    return assistant
+
+
+async def test_vector_search_uses_advertised_encoding() -> None:
+    seen = []
+
+    async def handler(request):
+        body = await request.json()
+        seen.append(body.get("encoding", "json"))
+        if seen[-1] != "json":
+            return web.Response(
+                status=400,
+                text=f"Invalid query vector: unsupported encoding {seen[-1]!r}",
+                headers={"X-Vector-Encodings": "json"},
+            )
+        return web.json_response(
+            {"matches": []}, headers={"X-Vector-Encodings": "json"}
+        )
+
+    assistant = await _search_twice(handler)
+    # rejected once, then the advertised list picks JSON up front
+    assert seen == ["f32", "json", "json"]
+    assert assistant.server_vector_encodings == {"json"}
+
+
+async def test_unrelated_400_does_not_downgrade_encoding() -> None:
+    seen = []
+
+    async def handler(request):
+        body = await request.json()
+        seen.append(body.get("encoding", "json"))
+        return web.Response(
+            status=400,
+            text="collection is required",
+            headers={"X-Vector-Encodings": "json,f32,f16"},
+        )
+
+    assistant = await _search_twice(handler)
+    assert seen == ["f32", "f32"]
+    assert assistant._wire_encoding() == "f32"
+
+
+async def test_legacy_server_without_header_gets_json() -> None:
+    seen = []
+
+    async def handler(request):
+        body = await request.json()
+        seen.append(body.get("encoding", "json"))
+        if isinstance(body["query_vector"], str):
+            return web.Response(status=400, text="query_vector must be a list")
+        return web.json_response({"matches": []})
+
+    await _search_twice(handler)
+    assert seen == ["f32", "json", "json"]
@@ -0,0 +1,54 @@
+from answer_cache import SemanticAnswerCache
+from kb_index import LocalVectorIndex
+
+
+class _FakeEmbedder:
+    def __init__(self, vectors: dict[str, list[float]]) -> None:
+        self.vectors = vectors
+        self.calls = 0
+
+    async def embed(self, text: str) -> list[float]:
+        self.calls += 1
+        return self.vectors[text]
+
+
+def _cache() -> tuple[SemanticAnswerCache, LocalVectorIndex, _FakeEmbedder]:
+    index = LocalVectorIndex(dim=3)
+    index.upsert("hours", {"answer_text": "9am to 7pm.", "query_embedding": [1, 0, 0]})
+    index.mark_synced()
+    embedder = _FakeEmbedder(
+        {
+            "What are your hours?": [1, 0.01, 0],
+            "Do you sell gift cards?": [0.7, 0.7, 0],
+        }
+    )
+    return SemanticAnswerCache(index, embedder), index, embedder
+
+
+async def test_close_match_hits_and_is_memoized() -> None:
+    cache, _, embedder = _cache()
+    assert await cache.lookup("What are your hours?") == "9am to 7pm."
+    assert await cache.lookup("what are your hours") == "9am to 7pm."
+    assert embedder.calls == 1
+    assert cache.stats()["hits"] == 2
+
+
+async def test_loose_match_misses() -> None:
+    cache, _, _ = _cache()
+    assert await cache.lookup("Do you sell gift cards?") is None
+    assert cache.stats()["hit_rate"] == 0.0
+
+
+async def test_updated_answer_invalidates_entry() -> None:
+    cache, index, _ = _cache()
+    await cache.lookup("What are your hours?")
+    index.upsert("hours", {"answer_text": "10am to 6pm.", "query_embedding": [1, 0, 0]})
+    assert cache.stats()["entries"] == 0
+    assert await cache.lookup("What are your hours?") == "10am to 6pm."
+
+
+async def test_latency_saved_uses_observed_ttft() -> None:
+    cache, _, _ = _cache()
+    cache.observe_llm_ttft(0.5)
+    await cache.lookup("What are your hours?")
+    assert 0.9 < cache.stats()["latency_saved_s"] <= 1.0
@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+from answer_watcher import AnswerWatcher
+
+
+def _doc(doc_id: str, room: str) -> SimpleNamespace:
+    data = {"room_name": room, "answer_text": f"answer {doc_id}", "spoken": False}
+    return SimpleNamespace(id=doc_id, to_dict=lambda: dict(data))
+
+
+def _change(kind: str, doc: SimpleNamespace) -> SimpleNamespace:
+    return SimpleNamespace(type=SimpleNamespace(name=kind), document=doc)
+
+
+class _FakeQuery:
+    def __init__(self, db: "_FakeDB") -> None:
+        self.db = db
+        self.rooms: list[str] = []
+        self.callback = None
+        self.unsubscribed = False
+
+    def where(self, field: str, op: str, value) -> "_FakeQuery":
+        if field == "room_name":
+            self.rooms = list(value)
+        return self
+
+    def on_snapshot(self, callback) -> "_FakeQuery":
+        self.callback = callback
+        self.db.listeners.append(self)
+        return self
+
+    def unsubscribe(self) -> None:
+        self.unsubscribed = True
+
+
+class _FakeDB:
+    def __init__(self) -> None:
+        self.listeners: list[_FakeQuery] = []
+
+    def collection(self, name: str) -> _FakeQuery:
+        return _FakeQuery(self)
+
+    def live(self) -> list[_FakeQuery]:
+        return [q for q in self.listeners if not q.unsubscribed]
+
+
+def test_routes_answers_to_their_room() -> None:
+    watcher = AnswerWatcher()
+    seen: dict[str, list[str]] = {"a": [], "b": []}
+    watcher.register("room-a", lambda doc: seen["a"].append(doc.id))
+    watcher.register("room-b", lambda doc: seen["b"].append(doc.id))
+
+    watcher._on_snapshot(
+        [],
+        [_change("ADDED", _doc("1", "room-a")), _change("ADDED", _doc("2", "room-b"))],
+        None,
+    )
+    assert seen == {"a": ["1"], "b": ["2"]}
+
+
+def test_listener_is_scoped_to_registered_rooms() -> None:
+    db = _FakeDB()
+    watcher = AnswerWatcher()
+    watcher.start(db)
+    assert db.listeners == []
+
+    seen: list[str] = []
+    watcher.register("room-b", lambda doc: seen.append(doc.id))
+    watcher.register("room-a", lambda doc: seen.append(doc.id))
+    assert [q.rooms for q in db.live()] == [["room-a", "room-b"]]
+
+    # an answer already waiting arrives in the new listener's first snapshot
+    db.live()[0].callback([], [_change("ADDED", _doc("1", "room-a"))], None)
+    assert seen == ["1"]
+
+    watcher.unregister("room-b")
+    assert [q.rooms for q in db.live()] == [["room-a"]]
+
+
+def test_snapshots_from_replaced_listeners_are_ignored() -> None:
+    db = _FakeDB()
+    watcher = AnswerWatcher()
+    watcher.start(db)
+    seen: list[str] = []
+    watcher.register("room-a", lambda doc: seen.append(doc.id))
+    stale = db.live()[0]
+    watcher.register("room-b", lambda doc: seen.append(doc.id))
+
+    assert stale.unsubscribed
+    stale.callback([], [_change("ADDED", _doc("1", "room-a"))], None)
+    assert seen == []
+
+
+def test_unregister_forgets_the_rooms_answers() -> None:
+    watcher = AnswerWatcher()
+    watcher.register("room-a", lambda doc: None)
+    watcher._on_snapshot([], [_change("ADDED", _doc("1", "room-a"))], None)
+    assert watcher.stats()["unspoken"] == 1
+
+    watcher.unregister("room-a")
+    assert watcher.stats()["unspoken"] == 0
+
+
+def test_modified_doc_is_not_redelivered_until_removed() -> None:
+    watcher = AnswerWatcher()
+    seen: list[str] = []
+    watcher.register("room-a", lambda doc: seen.append(doc.id))
+    doc = _doc("1", "room-a")
+
+    watcher._on_snapshot([], [_change("ADDED", doc)], None)
+    watcher._on_snapshot([], [_change("MODIFIED", doc)], None)
+    assert seen == ["1"]
+
+    watcher._on_snapshot([], [_change("REMOVED", doc)], None)
+    watcher._on_snapshot([], [_change("ADDED", doc)], None)
+    assert seen == ["1", "1"]
+
+
+def test_unregistered_room_stops_receiving() -> None:
+    watcher = AnswerWatcher()
+    seen: list[str] = []
+    watcher.register("room-a", lambda doc: seen.append(doc.id))
+    watcher.unregister("room-a")
+
+    watcher._on_snapshot([], [_change("ADDED", _doc("1", "room-a"))], None)
+    assert seen == []
+    assert watcher.stats()["rooms"] == 0
+    assert watcher.stats()["unspoken"] == 0
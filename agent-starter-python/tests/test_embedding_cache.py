@@ -0,0 +1,70 @@
+import time
+
+from embedding_cache import EmbeddingCache, normalize_query
+
+
+def test_normalizes_phrasing_variants() -> None:
+    assert normalize_query("What are your hours?") == "what are your hours"
+    assert normalize_query("  what ARE your   hours ") == "what are your hours"
+
+
+def test_hit_and_miss_counters() -> None:
+    cache = EmbeddingCache(dimensions=3)
+    assert cache.get("Do you do balayage?") is None
+    cache.put("Do you do balayage?", [0.1, 0.2, 0.3])
+    vec = cache.get("do you do balayage")
+    assert vec is not None
+    assert [round(x, 3) for x in vec] == [0.1, 0.2, 0.3]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_peek_leaves_counters_alone() -> None:
+    cache = EmbeddingCache(dimensions=3)
+    assert cache.peek("Do you do balayage?") is None
+    cache.put("Do you do balayage?", [0.1, 0.2, 0.3])
+    assert cache.peek("do you do balayage") is not None
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 0
+
+
+def test_lru_eviction() -> None:
+    cache = EmbeddingCache(dimensions=1, max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+
+
+def test_ttl_expiry() -> None:
+    cache = EmbeddingCache(dimensions=1, ttl=-1)
+    cache.put("a", [1.0])
+    assert cache.get("a") is None
+
+
+def test_disk_spill_survives_restart(tmp_path) -> None:
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache(dimensions=2, path=path)
+    cache.put("What are your hours?", [0.5, 0.25])
+    cache.close()
+
+    restarted = EmbeddingCache(dimensions=2, path=path)
+    assert restarted.get("what are your hours") == [0.5, 0.25]
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_disk_hit_keeps_its_original_age(tmp_path, monkeypatch) -> None:
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache(dimensions=1, ttl=100, path=path)
+    cache.put("a", [1.0])
+    cache.close()
+
+    written = time.time()
+    restarted = EmbeddingCache(dimensions=1, ttl=100, path=path)
+    monkeypatch.setattr(time, "time", lambda: written + 60)
+    assert restarted.get("a") == [1.0]
+    # promoted from disk 60 s in; it still expires 100 s after it was written
+    monkeypatch.setattr(time, "time", lambda: written + 120)
+    assert restarted.get("a") is None
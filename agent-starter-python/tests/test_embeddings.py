@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from embedding_cache import EmbeddingCache
+from embeddings import EmbeddingClient
+
+
+class _FakeEmbeddings:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    async def create(self, *, input, model, dimensions):  # noqa: A002
+        self.calls.append(list(input))
+        await asyncio.sleep(0)
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(text))])
+            for i, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def _client(**kwargs) -> tuple[EmbeddingClient, _FakeEmbeddings]:
+    fake = _FakeEmbeddings()
+    return EmbeddingClient(client=SimpleNamespace(embeddings=fake), **kwargs), fake
+
+
+async def test_identical_queries_are_coalesced() -> None:
+    client, fake = _client()
+    results = await asyncio.gather(
+        client.embed("What are your hours?"), client.embed("what are your hours")
+    )
+    assert results[0] == results[1]
+    assert fake.calls == [["What are your hours?"]]
+    assert client.stats()["coalesced"] == 1
+
+
+async def test_concurrent_queries_are_micro_batched() -> None:
+    client, fake = _client()
+    results = await client.embed_many(["a", "bb", "ccc"])
+    assert results == [[1.0], [2.0], [3.0]]
+    assert fake.calls == [["a", "bb", "ccc"]]
+
+
+async def test_max_batch_flushes_early() -> None:
+    client, fake = _client(max_batch=2, batch_window=10)
+    await asyncio.wait_for(client.embed_many(["a", "b"]), timeout=1)
+    assert fake.calls == [["a", "b"]]
+
+
+async def test_cache_hits_skip_network() -> None:
+    client, fake = _client(cache=EmbeddingCache(dimensions=1))
+    await client.embed("Do you do balayage?")
+    await client.embed("do you do balayage")
+    assert len(fake.calls) == 1
+
+
+async def test_peek_never_calls_the_api() -> None:
+    client, fake = _client(cache=EmbeddingCache(dimensions=1))
+    assert client.peek("Do you do balayage?") is None
+    await client.embed("Do you do balayage?")
+    assert client.peek("do you do balayage") == [19.0]
+    assert len(fake.calls) == 1
+    # only embed()'s own lookup is counted
+    assert client.cache.stats()["misses"] == 1
+    assert client.cache.stats()["hits"] == 0
+
+
+async def test_ready_covers_cached_and_in_flight_texts() -> None:
+    client, _ = _client(cache=EmbeddingCache(dimensions=1))
+    assert not client.ready("Do you do balayage?")
+    pending = asyncio.ensure_future(client.embed("Do you do balayage?"))
+    await asyncio.sleep(0)
+    assert client.ready("do you do balayage")
+    await pending
+    assert client.ready("Do you do balayage?")
+
+
+async def test_failures_reach_every_waiter() -> None:
+    client, fake = _client()
+
+    async def boom(**kwargs):
+        raise RuntimeError("rate limited")
+
+    fake.create = boom
+    with pytest.raises(RuntimeError):
+        await asyncio.gather(client.embed("x"), client.embed("x"))
+
+
+def test_rebinding_to_a_new_loop_closes_the_old_client(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    client = EmbeddingClient()
+
+    async def bind():
+        client._bind_loop()
+        return client._client
+
+    first = asyncio.run(bind())
+
+    async def rebind():
+        second = await bind()
+        await asyncio.gather(*client._tasks)
+        return second
+
+    second = asyncio.run(rebind())
+    assert second is not first
+    assert first.is_closed()
+    assert not second.is_closed()
+    asyncio.run(client.aclose())
+    assert second.is_closed()
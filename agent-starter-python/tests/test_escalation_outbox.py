@@ -0,0 +1,102 @@
+import asyncio
+import sqlite3
+
+from escalation_outbox import EscalationOutbox
+
+
+class _Sender:
+    def __init__(self, fail_first: int = 0) -> None:
+        self.fail_first = fail_first
+        self.sent: list[dict] = []
+        self.calls = 0
+
+    async def __call__(self, payload: dict) -> bool:
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.calls <= self.fail_first:
+            raise ConnectionError("addquery unreachable")
+        self.sent.append(payload)
+        return True
+
+
+async def test_enqueue_returns_before_delivery_and_drains() -> None:
+    sender = _Sender()
+    outbox = EscalationOutbox(sender)
+    outbox.enqueue({"query": "Do you do balayage?"})
+    assert sender.sent == []
+
+    await asyncio.sleep(0.05)
+    assert sender.sent == [{"query": "Do you do balayage?"}]
+    assert outbox.pending() == 0
+    await outbox.aclose()
+
+
+async def test_failed_delivery_is_retried_with_backoff() -> None:
+    sender = _Sender(fail_first=1)
+    outbox = EscalationOutbox(sender, backoff=0.01)
+    outbox.enqueue({"query": "q"})
+
+    await asyncio.sleep(0.1)
+    assert sender.sent == [{"query": "q"}]
+    assert outbox.stats()["failures"] == 1
+    await outbox.aclose()
+
+
+async def test_rows_survive_a_restart(tmp_path) -> None:
+    path = str(tmp_path / "outbox.db")
+    first = EscalationOutbox(_Sender(fail_first=10), path=path, backoff=60)
+    first.enqueue({"query": "q"})
+    await asyncio.sleep(0.05)
+    await first.aclose(timeout=0.05)
+    first.close()
+
+    sender = _Sender()
+    second = EscalationOutbox(sender, path=path)
+    assert second.pending() == 1
+    assert await second.flush() == 0
+    assert sender.sent == [{"query": "q"}]
+    second.close()
+
+
+async def test_flush_skips_rows_leased_by_another_outbox(tmp_path) -> None:
+    path = str(tmp_path / "outbox.db")
+    holder = EscalationOutbox(_Sender(), path=path, lease=0.2)
+    holder._db.execute(
+        "INSERT INTO outbox (payload, next_attempt_at, created_at) VALUES ('{}', 0, 0)"
+    )
+    # claimed but never finished, as if its process stalled or died mid-send
+    assert len(holder._claim(due_only=True)) == 1
+
+    sender = _Sender()
+    other = EscalationOutbox(sender, path=path)
+    assert await other.flush() == 1
+    assert sender.calls == 0
+
+    await asyncio.sleep(0.25)
+    assert await other.flush() == 0
+    assert sender.calls == 1
+    holder.close()
+    other.close()
+
+
+async def test_old_outbox_files_gain_lease_columns(tmp_path) -> None:
+    path = str(tmp_path / "outbox.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE outbox ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL,"
+        " attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL,"
+        " created_at REAL NOT NULL, last_error TEXT)"
+    )
+    db.execute(
+        "INSERT INTO outbox (payload, next_attempt_at, created_at)"
+        ' VALUES (\'{"query": "q"}\', 0, 0)'
+    )
+    db.commit()
+    db.close()
+
+    sender = _Sender()
+    outbox = EscalationOutbox(sender, path=path)
+    assert await outbox.flush() == 0
+    assert sender.sent == [{"query": "q"}]
+    outbox.close()
@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from firebase_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    FirebaseClient,
+    parse_server_timing,
+)
+
+
+async def _serve(handler) -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_post("/{name}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def test_idempotent_calls_retry_on_5xx() -> None:
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        if calls < 3:
+            return web.Response(status=503, text="busy")
+        return web.json_response({"matches": []})
+
+    runner, url = await _serve(handler)
+    client = FirebaseClient(url, backoff=0.001)
+    try:
+        status, _ = await client.post("/vector_search", {}, idempotent=True)
+        assert status == 200
+        assert calls == 3
+    finally:
+        await client.aclose()
+        await runner.cleanup()
+
+
+async def test_non_idempotent_calls_are_not_retried() -> None:
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        return web.Response(status=503)
+
+    runner, url = await _serve(handler)
+    client = FirebaseClient(url, backoff=0.001)
+    try:
+        status, _ = await client.post("/addquery", {})
+        assert status == 503
+        assert calls == 1
+    finally:
+        await client.aclose()
+        await runner.cleanup()
+
+
+async def test_deadline_bounds_total_time() -> None:
+    async def handler(request):
+        await asyncio.sleep(1)
+        return web.Response()
+
+    runner, url = await _serve(handler)
+    client = FirebaseClient(url)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await client.post("/vector_search", {}, deadline=0.05, idempotent=True)
+    finally:
+        await client.aclose()
+        await runner.cleanup()
+
+
+async def test_open_breaker_fails_fast() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = FirebaseClient("http://127.0.0.1:9", breaker=breaker)
+    breaker.record_failure()
+    assert not client.available
+    with pytest.raises(CircuitOpenError):
+        await client.post("/vector_search", {})
+
+
+def test_breaker_half_open_allows_single_probe() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_parse_server_timing() -> None:
+    header = 'find_nearest;dur=12.5, init;dur=800;desc="cold start", cold, total;dur=20'
+    assert parse_server_timing(header) == {
+        "find_nearest": 12.5,
+        "init": 800.0,
+        "total": 20.0,
+    }
+    assert parse_server_timing(None) == {}
+
+
+async def test_stats_split_client_time_into_server_phases() -> None:
+    async def handler(request):
+        return web.json_response(
+            {"matches": []},
+            headers={
+                "Server-Timing": "decode;dur=1.0, find_nearest;dur=4.0, total;dur=6.0"
+            },
+        )
+
+    runner, url = await _serve(handler)
+    client = FirebaseClient(url)
+    try:
+        for _ in range(2):
+            await client.post("/vector_search", {})
+        stats = client.stats()["/vector_search"]
+        assert stats["requests"] == 2
+        assert stats["cold_starts"] == 0
+        assert stats["server_ms"] == 6.0
+        assert stats["phases_ms"] == {"decode": 1.0, "find_nearest": 4.0}
+        assert stats["network_ms"] == round(stats["client_ms"] - 6.0, 1)
+    finally:
+        await client.aclose()
+        await runner.cleanup()
+
+
+async def test_retried_call_counts_as_one_breaker_failure() -> None:
+    async def handler(request):
+        return web.Response(status=503)
+
+    runner, url = await _serve(handler)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client = FirebaseClient(url, backoff=0.001, breaker=breaker)
+    try:
+        status, _ = await client.post("/vector_search", {}, idempotent=True)
+        assert status == 503
+        assert breaker.state == "closed"
+        await client.post("/vector_search", {}, idempotent=True)
+        assert breaker.state == "open"
+    finally:
+        await client.aclose()
+        await runner.cleanup()
+
+
+async def test_cancelled_probe_releases_the_breaker() -> None:
+    async def handler(request):
+        await asyncio.sleep(1)
+        return web.json_response({"matches": []})
+
+    runner, url = await _serve(handler)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    client = FirebaseClient(url, breaker=breaker)
+    try:
+        probe = asyncio.create_task(client.post("/vector_search", {}))
+        await asyncio.sleep(0.05)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert breaker.allow()
+    finally:
+        await client.aclose()
+        await runner.cleanup()
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from followups import FollowUpDelivery
+
+
+class _FakeHandle:
+    def __init__(self, log: list[str], text: str) -> None:
+        self.interrupted = False
+        self._log = log
+        self._text = text
+
+    async def wait_for_playout(self) -> None:
+        self._log.append(f"start {self._text}")
+        await asyncio.sleep(0.01)
+        self._log.append(f"end {self._text}")
+
+
+class _FakeSession:
+    def __init__(self) -> None:
+        self.log: list[str] = []
+        self.current_speech = None
+
+    def say(self, text: str) -> _FakeHandle:
+        return _FakeHandle(self.log, text)
+
+
+class _FakeBatch:
+    def __init__(self, commits: list[list[str]]) -> None:
+        self._commits = commits
+        self._refs: list[str] = []
+
+    def update(self, ref, data) -> None:
+        assert data["spoken"] is True
+        self._refs.append(ref.id)
+
+    def commit(self) -> None:
+        self._commits.append(self._refs)
+
+
+def _doc(doc_id: str, text: str) -> SimpleNamespace:
+    ref = SimpleNamespace(id=doc_id)
+    return SimpleNamespace(
+        id=doc_id, reference=ref, to_dict=lambda: {"answer_text": text}
+    )
+
+
+async def test_speaks_in_order_and_batches_acks() -> None:
+    session = _FakeSession()
+    commits: list[list[str]] = []
+    db = SimpleNamespace(batch=lambda: _FakeBatch(commits))
+    delivery = FollowUpDelivery(session, db, ack_interval=0.05)
+    delivery.start()
+
+    # the listener thread is a foreign thread
+    thread = threading.Thread(
+        target=lambda: [delivery.submit(_doc(i, f"answer {i}")) for i in "12"]
+    )
+    thread.start()
+    thread.join()
+
+    await asyncio.sleep(0.15)
+    assert session.log == [
+        "start answer 1",
+        "end answer 1",
+        "start answer 2",
+        "end answer 2",
+    ]
+    assert commits == [["1", "2"]]
+    await delivery.aclose()
+    assert delivery.stats()["spoken"] == 2
+
+
+async def test_pending_acks_are_flushed_on_close() -> None:
+    session = _FakeSession()
+    commits: list[list[str]] = []
+    db = SimpleNamespace(batch=lambda: _FakeBatch(commits))
+    delivery = FollowUpDelivery(session, db, ack_interval=60)
+    delivery.start()
+
+    delivery.submit(_doc("1", "answer 1"))
+    delivery.submit(_doc("2", ""))
+    await asyncio.sleep(0.05)
+    assert commits == []
+    await delivery.aclose()
+    assert commits == [["1"]]
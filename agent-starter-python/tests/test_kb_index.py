@@ -0,0 +1,51 @@
+import numpy as np
+
+from kb_index import LocalVectorIndex
+
+
+def _index(dim: int = 4) -> LocalVectorIndex:
+    index = LocalVectorIndex(dim=dim)
+    index.upsert(
+        "a", {"answer_text": "We open at 9am.", "query_embedding": [1, 0, 0, 0]}
+    )
+    index.upsert(
+        "b", {"answer_text": "Balayage is $180.", "query_embedding": [0, 1, 0, 0]}
+    )
+    index.upsert(
+        "c", {"answer_text": "Closed Sundays.", "query_embedding": [1, 1, 0, 0]}
+    )
+    index.mark_synced()
+    return index
+
+
+def test_cold_index_defers_to_remote() -> None:
+    index = LocalVectorIndex(dim=4)
+    index.upsert("a", {"answer_text": "x", "query_embedding": [1, 0, 0, 0]})
+    assert index.search([1, 0, 0, 0]) is None
+
+
+def test_search_orders_by_cosine_distance() -> None:
+    matches = _index().search([2, 0.1, 0, 0], limit=2)
+    assert [m["id"] for m in matches] == ["a", "c"]
+    assert matches[0]["answer_text"] == "We open at 9am."
+    assert "query_embedding" not in matches[0]
+    assert matches[0]["score"] < matches[1]["score"]
+
+
+def test_search_applies_distance_threshold() -> None:
+    # orthogonal to every stored vector -> cosine distance 1.0
+    assert _index().search([0, 0, 1, 0]) == []
+
+
+def test_remove_drops_row() -> None:
+    index = _index()
+    index.remove("a")
+    assert len(index) == 2
+    assert all(m["id"] != "a" for m in index.search([1, 0, 0, 0], limit=3))
+
+
+def test_vectors_are_stored_normalized() -> None:
+    index = _index()
+    _, matrix, _ = index._snapshot
+    assert matrix.dtype == np.float32
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
@@ -0,0 +1,51 @@
+import asyncio
+
+from prefetch import SpeculativeRetriever
+
+
+def _retriever(calls: list[str]) -> SpeculativeRetriever:
+    async def search(text: str):
+        calls.append(text)
+        return [{"answer_text": f"match for {text}"}]
+
+    return SpeculativeRetriever(search, debounce=0)
+
+
+async def test_reuses_result_for_matching_query() -> None:
+    calls: list[str] = []
+    prefetch = _retriever(calls)
+    prefetch.update("do you do balayage", is_final=False)
+    prefetch.update("Do you do balayage?", is_final=True)
+    prefetch.end_turn()
+
+    result = await prefetch.take("Do you do balayage")
+    assert result == [{"answer_text": "match for do you do balayage"}]
+    assert calls == ["do you do balayage"]
+    assert prefetch.stats() == {"hits": 1, "misses": 0}
+
+
+async def test_changed_transcript_cancels_stale_speculation() -> None:
+    calls: list[str] = []
+    prefetch = _retriever(calls)
+    prefetch.debounce = 0.05
+    prefetch.update("how much is a", is_final=False)
+    prefetch.update("how much is a manicure", is_final=False)
+    await asyncio.sleep(0.1)
+    assert calls == ["how much is a manicure"]
+    await prefetch.aclose()
+
+
+async def test_unrelated_query_misses() -> None:
+    calls: list[str] = []
+    prefetch = _retriever(calls)
+    prefetch.update("what are your hours on sunday", is_final=True)
+    assert await prefetch.take("how much is a pedicure") is None
+    await prefetch.aclose()
+
+
+async def test_finals_accumulate_within_turn() -> None:
+    calls: list[str] = []
+    prefetch = _retriever(calls)
+    prefetch.update("are you open", is_final=True)
+    prefetch.update("on sunday", is_final=True)
+    assert await prefetch.take("are you open on sunday") is not None
@@ -0,0 +1,47 @@
+from query_split import is_question, merge_matches, split_compound_query
+
+
+def test_splits_questions_joined_by_and() -> None:
+    assert split_compound_query("Are you open on Sunday and do you take walk-ins?") == [
+        "Are you open on Sunday",
+        "do you take walk-ins?",
+    ]
+
+
+def test_splits_on_sentence_punctuation() -> None:
+    assert split_compound_query("What are your hours? Where are you located?") == [
+        "What are your hours?",
+        "Where are you located?",
+    ]
+
+
+def test_keeps_statements_with_their_question() -> None:
+    assert split_compound_query(
+        "I have long hair. How much is a cut? And do you take walk-ins?"
+    ) == ["I have long hair. How much is a cut?", "And do you take walk-ins?"]
+
+
+def test_does_not_split_sentences_without_two_questions() -> None:
+    query = "Hi, I booked for Friday. I need to move it to Saturday."
+    assert split_compound_query(query) == [query]
+    query = "I'm calling about my color appointment. Is it still on?"
+    assert split_compound_query(query) == [query]
+
+
+def test_keeps_single_question_with_and() -> None:
+    query = "How much is a cut and color?"
+    assert split_compound_query(query) == [query]
+
+
+def test_merge_puts_each_parts_best_match_first() -> None:
+    hours = [{"id": "h1"}, {"id": "h2"}, {"id": "p2"}]
+    parking = [{"id": "p1"}, {"id": "h1"}, {"id": "p2"}]
+
+    merged = merge_matches([hours, parking], limit=3)
+    assert [m["id"] for m in merged] == ["h1", "p1", "h2"]
+
+
+def test_is_question() -> None:
+    assert is_question("Do you take walk-ins")
+    assert is_question("You're open Sunday?")
+    assert not is_question("Thanks, that's all.")
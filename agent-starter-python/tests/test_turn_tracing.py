@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+from livekit.agents import metrics
+from prometheus_client import REGISTRY
+
+from turn_tracing import TurnTracer, speculative, stage_span
+
+
+def _count(stage: str) -> float:
+    return (
+        REGISTRY.get_sample_value("agent_turn_stage_seconds_count", {"stage": stage})
+        or 0.0
+    )
+
+
+def test_turn_collects_stages_until_the_agent_listens_again() -> None:
+    tracer = TurnTracer(room_name="room-1", job_id="job-1")
+    before = _count("embedding")
+
+    tracer.stt_final()
+    tracer.tool_started()
+    with tracer.span("embedding"):
+        time.sleep(0.01)
+    tracer.observe_metrics(
+        metrics.LLMMetrics(
+            label="llm",
+            request_id="r",
+            timestamp=0.0,
+            duration=0.5,
+            ttft=0.2,
+            cancelled=False,
+            completion_tokens=1,
+            prompt_tokens=1,
+            prompt_cached_tokens=0,
+            total_tokens=2,
+            tokens_per_second=2.0,
+        )
+    )
+    tracer.agent_speaking()
+    assert tracer.in_turn
+
+    record = tracer.end_turn()
+    assert not tracer.in_turn
+    assert record["room"] == "room-1"
+    assert record["job_id"] == "job-1"
+    assert record["turn"] == 1
+    stages = record["stages_ms"]
+    assert list(stages) == ["final_to_tool", "embedding", "llm_ttft", "response"]
+    assert stages["embedding"] >= 10
+    assert stages["llm_ttft"] == 200.0
+    assert _count("embedding") == before + 1
+
+
+def test_listening_before_a_reply_keeps_the_turn_open() -> None:
+    tracer = TurnTracer()
+    tracer.stt_final()
+    tracer.agent_listening()
+    assert tracer.in_turn
+
+    tracer.agent_speaking()
+    tracer.agent_listening()
+    assert not tracer.in_turn
+
+
+def test_barge_in_closes_the_previous_turn() -> None:
+    tracer = TurnTracer()
+    tracer.stt_final()
+    tracer.agent_speaking()
+    tracer.stt_final()
+    assert tracer.turns == 2
+    assert tracer.end_turn()["stages_ms"] == {}
+
+
+def test_spans_outside_a_turn_only_feed_the_histogram() -> None:
+    tracer = TurnTracer()
+    before = _count("vector_search")
+    with tracer.span("vector_search"):
+        pass
+    assert _count("vector_search") == before + 1
+    assert tracer.end_turn() is None
+
+
+def test_speculative_spans_stay_out_of_the_turn() -> None:
+    tracer = TurnTracer()
+    before = _count("embedding")
+    prefetch_before = _count("prefetch_embedding")
+    tracer.stt_final()
+    with speculative(), tracer.span("embedding"):
+        pass
+    assert _count("embedding") == before
+    assert _count("prefetch_embedding") == prefetch_before + 1
+    assert tracer.end_turn()["stages_ms"] == {}
+
+
+async def test_cancelled_spans_are_dropped() -> None:
+    tracer = TurnTracer()
+    before = _count("vector_search")
+    tracer.stt_final()
+
+    async def search() -> None:
+        with tracer.span("vector_search"):
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(search())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert _count("vector_search") == before
+    assert tracer.end_turn()["stages_ms"] == {}
+
+
+def test_stage_span_only_feeds_the_histogram() -> None:
+    before = _count("addquery")
+    with pytest.raises(RuntimeError), stage_span("addquery"):
+        raise RuntimeError("addquery down")
+    assert _count("addquery") == before + 1
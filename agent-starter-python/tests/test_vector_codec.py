@@ -0,0 +1,24 @@
+import base64
+
+import pytest
+
+from vector_codec import decode_vector, encode_vector
+
+
+@pytest.mark.parametrize("encoding,tolerance", [("f32", 1e-7), ("f16", 1e-3)])
+def test_round_trip(encoding: str, tolerance: float) -> None:
+    vec = [0.1, -0.25, 0.5, 0.0123]
+    encoded = encode_vector(vec, encoding)
+    assert isinstance(encoded, str)
+    assert len(base64.b64decode(encoded)) == len(vec) * (4 if encoding == "f32" else 2)
+    decoded = decode_vector(encoded, encoding)
+    assert all(abs(a - b) < tolerance for a, b in zip(vec, decoded))
+
+
+def test_json_is_a_plain_list() -> None:
+    assert encode_vector((1.0, 2.0), "json") == [1.0, 2.0]
+
+
+def test_rejects_unknown_encoding() -> None:
+    with pytest.raises(ValueError):
+        encode_vector([1.0], "f64")
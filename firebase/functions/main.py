@@ -2,20 +2,34 @@
 # To get started, simply uncomment the below code or create your own.
 # Deploy with `firebase deploy`
 
-import asyncio
-from firebase_functions import https_fn, firestore_fn
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import base64
+import contextlib
+import contextvars
+import csv
+import functools
+import hashlib
+import io
+import re
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from firebase_functions import https_fn, scheduler_fn
 from firebase_functions.options import set_global_options
 from firebase_admin import initialize_app, firestore
-from openai import OpenAI
 import os
-import google.cloud.firestore
+from google.api_core.exceptions import AlreadyExists
+from google.cloud.firestore_v1.base_query import FieldFilter
 from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
 from google.cloud.firestore_v1.vector import Vector
 import json
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List
-from flask import Flask
-from flask_cors import CORS
+from typing import TYPE_CHECKING, Dict, Any, List
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # For cost control, you can set the maximum number of containers that can be
 # running at the same time. This helps mitigate the impact of unexpected
@@ -28,9 +42,38 @@ EMBED_MODEL = os.environ.get("EMBED_MODEL", "text-embedding-3-small")
 EMBED_DIM = int(os.environ.get("EMBED_DIM", "1536"))
 initialize_app()
 
-# Initialize Flask app for CORS
-app = Flask(__name__)
-CORS(app, origins=["http://localhost:5173", "http://127.0.0.1:5173"])
+# Instance-scaling presets. Every function is its own Cloud Run service, so each
+# one pays its own cold start: the routed `api` function serves every operation
+# from one warm pool and takes concurrent requests; the per-operation
+# compatibility URLs scale from zero.
+HOT_MIN_INSTANCES = int(os.environ.get("HOT_MIN_INSTANCES", "1"))
+HOT_PATH_OPTIONS = dict(min_instances=HOT_MIN_INSTANCES, concurrency=80, cpu=1)
+SHIM_OPTIONS = dict(min_instances=0, concurrency=40, cpu=1)
+
+# Clients shared by every request on a warm instance. Created on first use and
+# not at import, so the firebase CLI's deploy-time discovery and functions that
+# never need OpenAI don't pay for them; openai is also imported lazily (it is
+# the largest import in this module).
+_firestore_client = None
+_openai_client = None
+_clients_lock = threading.Lock()
+
+def get_firestore():
+    global _firestore_client
+    if _firestore_client is None:
+        with _clients_lock:
+            if _firestore_client is None:
+                _firestore_client = firestore.client()
+    return _firestore_client
+
+def get_openai() -> "OpenAI":
+    global _openai_client
+    if _openai_client is None:
+        with _clients_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    return _openai_client
 
 def json_default(o):
     if isinstance(o, datetime):
@@ -43,30 +86,374 @@ def normalize_ts(v):
 def strip_vectors(d: Dict[str, Any]):
     d.pop("embedding", None)
     d.pop("answer_embedding", None)
+    d.pop("query_embedding", None)
+    d.pop("cluster_vector", None)
     return d
 
 def add_cors_headers(response):
     """Add CORS headers to response"""
     response.headers['Access-Control-Allow-Origin'] = '*'
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, If-None-Match'
+    response.headers['Access-Control-Expose-Headers'] = 'ETag, X-Vector-Encodings, Server-Timing'
+    response.headers['Timing-Allow-Origin'] = '*'
     return response
 
-# TTL deletion fires this and updates the query document to unresolved
-@firestore_fn.on_document_deleted(document="timers/{id}")
-def on_timer_deleted(event: firestore_fn.Event[firestore.DocumentSnapshot]) -> None:
-    data = event.data.to_dict() or {}
-    query_ref = data.get("query_ref")
-    if not query_ref:
+# Per-request instrumentation: every HTTPS handler is wrapped in @instrumented,
+# which times named phases, counts Firestore document reads/writes and payload
+# bytes, returns them in a Server-Timing header and logs one JSON line per call.
+_cold_start = True
+# concurrent requests on a fresh instance: only the first one reports the cold start
+_cold_start_lock = threading.Lock()
+_current_metrics: contextvars.ContextVar = contextvars.ContextVar("request_metrics", default=None)
+
+class RequestMetrics:
+    def __init__(self, function: str, cold_start: bool):
+        self.function = function
+        self.cold_start = cold_start
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.reads = 0
+        self.writes = 0
+        # phases and counts may be recorded from worker threads (vector_search batches)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def count(self, reads: int = 0, writes: int = 0):
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={secs * 1000:.1f}" for name, secs in self.phases.items()]
+        if self.cold_start:
+            parts.append(f'init;dur={IMPORT_DURATION_S * 1000:.1f};desc="cold start"')
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def log(self, req: https_fn.Request, response) -> None:
+        print(json.dumps({"request_metrics": {
+            "function": self.function,
+            "method": req.method,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "phases_ms": {name: round(secs * 1000, 1) for name, secs in self.phases.items()},
+            "reads": self.reads,
+            "writes": self.writes,
+            "request_bytes": req.content_length or 0,
+            "response_bytes": None if response.is_streamed else response.calculate_content_length(),
+            "cold_start": self.cold_start,
+        }}))
+
+@contextlib.contextmanager
+def phase(name: str):
+    """Time a block as phase name of the current request (no-op outside a request)."""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
         return
-    query_ref.update({
-        "status": "unresolved",
-        "updated_at": firestore.SERVER_TIMESTAMP,
-    })
+    with metrics.phase(name):
+        yield
 
-@https_fn.on_request()
-def addquery(req: https_fn.Request) -> https_fn.Response:
-    """Create a new query document from a POST request with JSON body."""
+def count_ops(reads: int = 0, writes: int = 0):
+    """Add Firestore document reads/writes to the current request's totals."""
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.count(reads, writes)
+
+# Operation handlers by name, served at /api/<name>. All but batch also keep a
+# standalone function of the same name for existing clients.
+ROUTES: Dict[str, Any] = {}
+
+def route(name: str):
+    def register(fn):
+        ROUTES[name] = fn
+        return fn
+    return register
+
+def instrumented(fn):
+    """Record phases, Firestore op counts and payload sizes for one HTTPS handler."""
+    @functools.wraps(fn)
+    def wrapper(req: https_fn.Request) -> https_fn.Response:
+        global _cold_start
+        with _cold_start_lock:
+            cold_start, _cold_start = _cold_start, False
+        metrics = RequestMetrics(fn.__name__, cold_start)
+        token = _current_metrics.set(metrics)
+        try:
+            response = fn(req)
+        finally:
+            _current_metrics.reset(token)
+        response.headers["Server-Timing"] = metrics.server_timing()
+        if response.is_streamed:
+            # ndjson exports read as they stream: log once the body is fully sent
+            response.response = _log_after_stream(response.response, metrics, req, response)
+        else:
+            metrics.log(req, response)
+        return response
+    return wrapper
+
+def _log_after_stream(body, metrics: RequestMetrics, req, response):
+    try:
+        yield from body
+    finally:
+        metrics.log(req, response)
+
+LIST_DEFAULT_LIMIT = 100
+LIST_MAX_LIMIT = 500
+CHANGES_DEFAULT_LIMIT = 200
+CHANGE_FEED_COLLECTIONS = ("queries", "answers")
+
+def request_params(req: https_fn.Request) -> Dict[str, Any]:
+    """Merge query-string args with a JSON body (callable clients nest it under "data")."""
+    params: Dict[str, Any] = dict(req.args)
+    if req.method == "POST":
+        body = req.get_json(silent=True) or {}
+        if isinstance(body.get("data"), dict):
+            body = body["data"]
+        if isinstance(body, dict):
+            params.update(body)
+    return params
+
+def encode_cursor(snap, field: str = "created_at") -> str:
+    """Opaque position of snap in a (field, __name__) ordering."""
+    data = snap.to_dict() or {}
+    raw = json.dumps({"t": normalize_ts(data.get(field)), "id": snap.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return {"t": datetime.fromisoformat(raw["t"]), "id": raw["id"]}
+
+def parse_list_params(params: Dict[str, Any], filter_fields: List[str]) -> Dict[str, Any]:
+    """Validate listing params; raises ValueError with a client-facing message."""
+    out: Dict[str, Any] = {"filters": {}}
+    for field in filter_fields:
+        if params.get(field):
+            out["filters"][field] = params[field]
+    for key in ("created_after", "created_before"):
+        if params.get(key):
+            try:
+                out[key] = datetime.fromisoformat(str(params[key]).replace("Z", "+00:00"))
+            except ValueError:
+                raise ValueError(f"{key} must be an ISO 8601 timestamp")
+    fields = params.get("fields")
+    if isinstance(fields, str):
+        fields = [f for f in fields.split(",") if f]
+    out["fields"] = fields or None
+    out["format"] = params.get("format") or "json"
+    if out["format"] not in ("json", "ndjson"):
+        raise ValueError("format must be json or ndjson")
+    # ndjson exports stream everything after the cursor unless a limit is given
+    default_limit = None if out["format"] == "ndjson" else LIST_DEFAULT_LIMIT
+    try:
+        limit = int(params["limit"]) if params.get("limit") else default_limit
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit is not None and out["format"] == "json":
+        limit = max(1, min(limit, LIST_MAX_LIMIT))
+    out["limit"] = limit
+    try:
+        out["cursor"] = decode_cursor(params["cursor"]) if params.get("cursor") else None
+    except Exception:
+        raise ValueError("invalid cursor")
+    return out
+
+def build_list_query(firestore_client, collection_name: str, opts: Dict[str, Any]):
+    """Newest-first query over collection_name with filters, projection and cursor applied."""
+    collection = firestore_client.collection(collection_name)
+    q = collection
+    for field, value in opts["filters"].items():
+        q = q.where(filter=FieldFilter(field, "==", value))
+    if opts.get("created_after"):
+        q = q.where(filter=FieldFilter("created_at", ">=", opts["created_after"]))
+    if opts.get("created_before"):
+        q = q.where(filter=FieldFilter("created_at", "<", opts["created_before"]))
+    q = q.order_by("created_at", direction=firestore.Query.DESCENDING)
+    q = q.order_by("__name__", direction=firestore.Query.DESCENDING)
+    if opts["fields"]:
+        q = q.select(sorted(set(opts["fields"]) | {"created_at"}))
+    if opts["cursor"]:
+        cursor = opts["cursor"]
+        q = q.start_after({
+            "created_at": cursor["t"],
+            "__name__": collection.document(cursor["id"]),
+        })
+    return q
+
+def serialize_doc(snap, fields) -> Dict[str, Any]:
+    data = strip_vectors(snap.to_dict() or {})
+    if fields:
+        data = {k: v for k, v in data.items() if k in fields}
+    return {"id": snap.id, **data}
+
+def list_documents(req: https_fn.Request, collection_name: str, result_key: str,
+                   filter_fields: List[str]) -> https_fn.Response:
+    """Shared handler for the paginated list endpoints."""
+    try:
+        opts = parse_list_params(request_params(req), filter_fields)
+    except ValueError as e:
+        response = https_fn.Response(str(e), status=400)
+        return add_cors_headers(response)
+
+    firestore_client = get_firestore()
+    q = build_list_query(firestore_client, collection_name, opts)
+
+    if opts["format"] == "ndjson":
+        if opts["limit"] is not None:
+            q = q.limit(opts["limit"])
+        # the body streams after the handler returns, outside the request context
+        metrics = _current_metrics.get()
+
+        def generate():
+            last = None
+            for snap in q.stream():
+                last = snap
+                if metrics is not None:
+                    metrics.count(reads=1)
+                yield json.dumps(serialize_doc(snap, opts["fields"]), default=json_default) + "\n"
+            next_cursor = encode_cursor(last) if last is not None and opts["limit"] else None
+            yield json.dumps({"next_cursor": next_cursor}) + "\n"
+
+        response = https_fn.Response(generate(), status=200, content_type="application/x-ndjson")
+        return add_cors_headers(response)
+
+    # fetch one extra row to know whether there is another page
+    with phase("firestore_query"):
+        snaps = list(q.limit(opts["limit"] + 1).stream())
+    count_ops(reads=max(len(snaps), 1))
+    page = snaps[:opts["limit"]]
+    next_cursor = encode_cursor(page[-1]) if len(snaps) > opts["limit"] else None
+    items = [serialize_doc(snap, opts["fields"]) for snap in page]
+    response = https_fn.Response(
+        json.dumps({"data": {result_key: items, "next_cursor": next_cursor}}, default=json_default),
+        status=200,
+        content_type="application/json"
+    )
+    return add_cors_headers(response)
+
+# Pending queries past their deadline are marked unresolved by a scheduled sweep
+SWEEP_BATCH_SIZE = 500          # Firestore's per-batch write limit
+SWEEP_TIME_BUDGET_S = float(os.environ.get("SWEEP_TIME_BUDGET_S", "50"))
+QUERY_TTL = timedelta(hours=24)
+
+@scheduler_fn.on_schedule(schedule="every 1 minutes")
+def sweep_expired_queries(event: scheduler_fn.ScheduledEvent) -> None:
+    """Mark pending queries whose deadline has passed as unresolved.
+
+    Reads (status, deadline) through a composite index, oldest deadline first,
+    and writes pages of up to 500 updates in one batch each. Run stats (count,
+    throughput, expiry lag) are logged and kept on system/deadline_sweeper.
+    """
+    firestore_client = get_firestore()
+    started = time.monotonic()
+    now = datetime.now(timezone.utc)
+    expired_query = (
+        firestore_client.collection("queries")
+        .where(filter=FieldFilter("status", "==", "pending"))
+        .where(filter=FieldFilter("deadline", "<=", now))
+        .order_by("deadline")
+        .limit(SWEEP_BATCH_SIZE)
+    )
+
+    swept = 0
+    batches = 0
+    max_lag = 0.0
+    total_lag = 0.0
+    while time.monotonic() - started < SWEEP_TIME_BUDGET_S:
+        snaps = list(expired_query.stream())
+        if not snaps:
+            break
+        batch = firestore_client.batch()
+        for snap in snaps:
+            updates = {
+                "status": "unresolved",
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            }
+            data = snap.to_dict() or {}
+            if "cluster_vector" in data:
+                updates["cluster_vector"] = firestore.DELETE_FIELD
+            batch.update(snap.reference, updates)
+            deadline = data.get("deadline")
+            if isinstance(deadline, datetime):
+                lag = (now - deadline).total_seconds()
+                max_lag = max(max_lag, lag)
+                total_lag += lag
+        batch.commit()
+        swept += len(snaps)
+        batches += 1
+        if len(snaps) < SWEEP_BATCH_SIZE:
+            break
+
+    duration = time.monotonic() - started
+    stats = {
+        "swept": swept,
+        "batches": batches,
+        "duration_s": round(duration, 3),
+        "throughput_per_s": round(swept / duration, 1) if duration > 0 else 0.0,
+        "max_lag_s": round(max_lag, 1),
+        "avg_lag_s": round(total_lag / swept, 1) if swept else 0.0,
+        "backlog_remaining": swept > 0 and duration >= SWEEP_TIME_BUDGET_S,
+    }
+    print(json.dumps({"deadline_sweeper": stats}))
+    firestore_client.collection("system").document("deadline_sweeper").set({
+        **stats,
+        "last_run_at": firestore.SERVER_TIMESTAMP,
+        "total_swept": firestore.Increment(swept),
+    }, merge=True)
+
+# Pending escalations closer than this (cosine distance) are treated as one question
+CLUSTER_DISTANCE = float(os.environ.get("CLUSTER_DISTANCE", "0.12"))
+
+def find_pending_duplicate(firestore_client, vec: Vector):
+    """Nearest pending cluster root within CLUSTER_DISTANCE of vec, or None.
+
+    Only cluster roots carry cluster_vector, so members never match, and a root
+    drops out of the search as soon as it stops being pending.
+    """
+    vector_query = (
+        firestore_client.collection("queries")
+        .where(filter=FieldFilter("status", "==", "pending"))
+        .find_nearest(
+            vector_field="cluster_vector",
+            query_vector=vec,
+            distance_measure=DistanceMeasure.COSINE,
+            distance_result_field="_vector_distance",
+            distance_threshold=CLUSTER_DISTANCE,
+            limit=1,
+        )
+    )
+    with phase("find_nearest"):
+        snaps = list(vector_query.stream())
+    count_ops(reads=max(len(snaps), 1))
+    return snaps[0] if snaps else None
+
+def normalize_query(text: str) -> str:
+    """Lowercase, punctuation dropped, spaces collapsed (matches the agent's cache key)."""
+    text = re.sub(r"[^\w\s']+", " ", (text or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+def query_doc_id(idempotency_key: str) -> str:
+    """Deterministic queries/{id} for an idempotency key, so a retry hits the same doc."""
+    return hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()[:32]
+
+@route("addquery")
+def handle_addquery(req: https_fn.Request) -> https_fn.Response:
+    """Create a new query document from a POST request with JSON body.
+
+    Idempotent: a repeat with the same idempotency_key (body field or
+    Idempotency-Key header; default job_id + hash of the normalized query)
+    returns the original document with status 200 instead of 201.
+    """
     # Handle CORS preflight request
     if req.method == "OPTIONS":
         response = https_fn.Response("", status=200)
@@ -84,7 +471,7 @@ def addquery(req: https_fn.Request) -> https_fn.Response:
     data = req.get_json(silent=True) or {}
     query = data.get("query")
     now = datetime.now(timezone.utc)
-    deadline = now + timedelta(hours=24)
+    deadline = now + QUERY_TTL
 
     if not query:
         response = https_fn.Response("Missing 'query' in request body", status=400)
@@ -101,9 +488,16 @@ def addquery(req: https_fn.Request) -> https_fn.Response:
     if not room_name:
         response = https_fn.Response("Missing 'room_name' in request body", status=400)
         return add_cors_headers(response)
-    firestore_client = firestore.client()
-    doc_ref = firestore_client.collection("queries").document() 
-    doc_ref.set({
+    # Retries of the same escalation (explicit key, or job + normalized text) map
+    # onto one document instead of creating duplicates
+    idempotency_key = (
+        data.get("idempotency_key")
+        or req.headers.get("Idempotency-Key")
+        or f"{job_id}:{hashlib.sha256(normalize_query(query).encode('utf-8')).hexdigest()}"
+    )
+    firestore_client = get_firestore()
+    doc_ref = firestore_client.collection("queries").document(query_doc_id(idempotency_key))
+    query_doc = {
         "query": query,
         "query_id": doc_ref.id, 
         "user_id": user_id,
@@ -112,17 +506,50 @@ def addquery(req: https_fn.Request) -> https_fn.Response:
         "room_name": room_name,
         "job_id": job_id,
         "status": "pending",
-        "deadline": deadline
-    })
+        "deadline": deadline,
+        "idempotency_key": idempotency_key,
+    }
+    # The agent already embedded the query for its KB lookup; keep it for addanswer
+    query_embedding = pack_query_embedding(data)
+    if query_embedding is not None:
+        query_doc["query_embedding"] = query_embedding
 
-    firestore_client.collection("timers").document(doc_ref.id).set({
-        "query_ref": doc_ref,        
-        "delete_at": deadline,        
-    })
+    # Attach to a pending question that means the same thing, or start a new cluster
+    cluster_vec = stored_query_vector(query_doc)
+    root = None
+    if cluster_vec is not None:
+        try:
+            root = find_pending_duplicate(firestore_client, cluster_vec)
+        except Exception as e:
+            print(f"Duplicate lookup failed, not clustering: {e}")
+    if root is not None and root.id == doc_ref.id:
+        # a retry found its own earlier write
+        return existing_query_response(doc_ref)
+
+    # One commit: the query itself plus the cluster root's counter
+    batch = firestore_client.batch()
+    if root is not None:
+        query_doc["duplicate_of"] = root.id
+        # the cluster expires as one, so a hidden duplicate never outlives its root
+        query_doc["deadline"] = (root.to_dict() or {}).get("deadline", deadline)
+        batch.update(root.reference, {
+            "duplicates": firestore.Increment(1),
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        })
+        print(f"Query {doc_ref.id} joins pending cluster {root.id}")
+    elif cluster_vec is not None:
+        query_doc["cluster_vector"] = cluster_vec
+    batch.create(doc_ref, query_doc)
+    try:
+        with phase("firestore_write"):
+            batch.commit()
+        count_ops(writes=2 if root is not None else 1)
+    except AlreadyExists:
+        return existing_query_response(doc_ref)
 
-    snap = doc_ref.get()
-    data = snap.to_dict() or {}
     print(f"Hey, I need help answering : {query}")
+    # Echo what was written; the server timestamps resolve to roughly now
+    data = strip_vectors({**query_doc, "created_at": now, "updated_at": now})
     response = https_fn.Response(
         json.dumps({"id": doc_ref.id, **data}, default=json_default),
         status=201,
@@ -130,8 +557,22 @@ def addquery(req: https_fn.Request) -> https_fn.Response:
     )
     return add_cors_headers(response)
 
-@https_fn.on_request()
-def getquery(req: https_fn.Request) -> https_fn.Response:
+def existing_query_response(doc_ref) -> https_fn.Response:
+    """200 with the stored query, for a replayed addquery."""
+    with phase("firestore_read"):
+        snap = doc_ref.get()
+    count_ops(reads=1)
+    data = strip_vectors(snap.to_dict() or {})
+    print(f"Replayed addquery for {doc_ref.id}")
+    response = https_fn.Response(
+        json.dumps({"id": doc_ref.id, **data, "replayed": True}, default=json_default),
+        status=200,
+        content_type="application/json",
+    )
+    return add_cors_headers(response)
+
+@route("getquery")
+def handle_getquery(req: https_fn.Request) -> https_fn.Response:
     """Fetch a query document by ID and return its data as JSON."""
     # Handle CORS preflight request
     if req.method == "OPTIONS":
@@ -158,15 +599,17 @@ def getquery(req: https_fn.Request) -> https_fn.Response:
         response = https_fn.Response("Missing id parameter", status=400)
         return add_cors_headers(response)
 
-    firestore_client = firestore.client()
+    firestore_client = get_firestore()
     doc_ref = firestore_client.collection("queries").document(message_id)
-    doc = doc_ref.get()
+    with phase("firestore_read"):
+        doc = doc_ref.get()
+    count_ops(reads=1)
 
     if not doc.exists:
         response = https_fn.Response(f"Query with ID {message_id} not found", status=404)
         return add_cors_headers(response)
 
-    data = doc.to_dict()
+    data = strip_vectors(doc.to_dict() or {})
     response = https_fn.Response(
         json.dumps({"data": {"id": doc.id, **data}}, default=json_default),
         status=200,
@@ -174,8 +617,8 @@ def getquery(req: https_fn.Request) -> https_fn.Response:
     )
     return add_cors_headers(response)
 
-@https_fn.on_request()
-def getanswer(req: https_fn.Request) -> https_fn.Response:
+@route("getanswer")
+def handle_getanswer(req: https_fn.Request) -> https_fn.Response:
     """Fetch a answer document by ID and return its data as JSON."""
     # Handle CORS preflight request
     if req.method == "OPTIONS":
@@ -202,9 +645,11 @@ def getanswer(req: https_fn.Request) -> https_fn.Response:
         response = https_fn.Response("Missing id parameter", status=400)
         return add_cors_headers(response)
 
-    firestore_client = firestore.client()
+    firestore_client = get_firestore()
     doc_ref = firestore_client.collection("answers").document(answer_id)
-    doc = doc_ref.get()
+    with phase("firestore_read"):
+        doc = doc_ref.get()
+    count_ops(reads=1)
 
     if not doc.exists:
         response = https_fn.Response(f"Answer with ID {answer_id} not found", status=404)
@@ -218,9 +663,15 @@ def getanswer(req: https_fn.Request) -> https_fn.Response:
     )
     return add_cors_headers(response)
 
-@https_fn.on_request()
-def getallqueries(req: https_fn.Request) -> https_fn.Response:
-    """Fetch all query documents and return them as JSON."""
+@route("getallqueries")
+def handle_getallqueries(req: https_fn.Request) -> https_fn.Response:
+    """List query documents, newest first.
+
+    Params (query string or JSON body): limit, cursor, fields (comma separated),
+    status, room_name, user_id, created_after, created_before (ISO 8601),
+    format=json|ndjson. JSON responses carry next_cursor for the following page;
+    ndjson streams one document per line and ends with a {"next_cursor"} line.
+    """
     # Handle CORS preflight request
     if req.method == "OPTIONS":
         response = https_fn.Response("", status=200)
@@ -235,25 +686,14 @@ def getallqueries(req: https_fn.Request) -> https_fn.Response:
         )
         return add_cors_headers(response)
 
-    firestore_client = firestore.client()
-    queries_ref = firestore_client.collection("queries")
-    docs = queries_ref.stream()
-
-    queries = []
-    for doc in docs:
-        data = doc.to_dict()
-        queries.append({"id": doc.id, **data})
+    return list_documents(req, "queries", "queries", ["status", "room_name", "user_id"])
 
-    response = https_fn.Response(
-        json.dumps({"data": {"queries": queries}}, default=json_default),
-        status=200,
-        content_type="application/json"
-    )
-    return add_cors_headers(response)
+@route("getallanswers")
+def handle_getallanswers(req: https_fn.Request) -> https_fn.Response:
+    """List answer documents, newest first.
 
-@https_fn.on_request()
-def getallanswers(req: https_fn.Request) -> https_fn.Response:
-    """Fetch all answer documents and return them as JSON."""
+    Same params as getallqueries, filtering on user_id and query_id.
+    """
     # Handle CORS preflight request
     if req.method == "OPTIONS":
         response = https_fn.Response("", status=200)
@@ -268,24 +708,185 @@ def getallanswers(req: https_fn.Request) -> https_fn.Response:
         )
         return add_cors_headers(response)
 
-    firestore_client = firestore.client()
-    answers_ref = firestore_client.collection("answers")
-    docs = answers_ref.stream()
+    return list_documents(req, "answers", "answers", ["user_id", "query_id"])
+
+@route("getchanges")
+def handle_getchanges(req: https_fn.Request) -> https_fn.Response:
+    """Change feed for the dashboard: documents updated after a watermark.
+
+    GET ?collection=queries|answers&since=<watermark>&limit=200
+    -> { "changes": [...], "watermark": "...", "has_more": bool }
+
+    Without `since` only the current watermark is returned. Responses carry an
+    ETag derived from the collection and the returned watermark, so a client
+    that sends it back as If-None-Match gets a bodyless 304 while nothing changed.
+    """
+    # Handle CORS preflight request
+    if req.method == "OPTIONS":
+        response = https_fn.Response("", status=200)
+        return add_cors_headers(response)
+
+    if req.method not in ["GET", "POST"]:
+        response = https_fn.Response(
+            "Method not allowed. Use GET or POST.",
+            status=405,
+            content_type="text/plain"
+        )
+        return add_cors_headers(response)
+
+    params = request_params(req)
+    collection_name = params.get("collection", "queries")
+    if collection_name not in CHANGE_FEED_COLLECTIONS:
+        response = https_fn.Response("collection must be queries or answers", status=400)
+        return add_cors_headers(response)
+    try:
+        limit = max(1, min(int(params.get("limit", CHANGES_DEFAULT_LIMIT)), LIST_MAX_LIMIT))
+        since = decode_cursor(params["since"]) if params.get("since") else None
+    except Exception:
+        response = https_fn.Response("invalid since or limit", status=400)
+        return add_cors_headers(response)
+
+    firestore_client = get_firestore()
+    collection = firestore_client.collection(collection_name)
 
-    answers = []
-    for doc in docs:
-        data = doc.to_dict()
-        answers.append({"id": doc.id, **data})
+    if since is None:
+        # bootstrap: hand out the newest position without shipping any documents
+        with phase("firestore_query"):
+            latest = list(
+                collection.order_by("updated_at", direction=firestore.Query.DESCENDING)
+                .order_by("__name__", direction=firestore.Query.DESCENDING)
+                .limit(1).stream()
+            )
+        count_ops(reads=1)
+        snaps, has_more = [], False
+        watermark = encode_cursor(latest[0], "updated_at") if latest else None
+    else:
+        q = (
+            collection.order_by("updated_at").order_by("__name__")
+            .start_after({"updated_at": since["t"], "__name__": collection.document(since["id"])})
+            .limit(limit + 1)
+        )
+        with phase("firestore_query"):
+            snaps = list(q.stream())
+        count_ops(reads=max(len(snaps), 1))
+        has_more = len(snaps) > limit
+        snaps = snaps[:limit]
+        watermark = encode_cursor(snaps[-1], "updated_at") if snaps else params["since"]
 
+    etag = '"' + hashlib.sha1(f"{collection_name}:{watermark}".encode()).hexdigest() + '"'
+    if not snaps and etag in (req.headers.get("If-None-Match") or ""):
+        response = https_fn.Response(status=304)
+        response.headers["ETag"] = etag
+        return add_cors_headers(response)
+
+    changes = [serialize_doc(snap, None) for snap in snaps]
     response = https_fn.Response(
-        json.dumps({"data": {"answers": answers}}, default=json_default),
+        json.dumps({"changes": changes, "watermark": watermark, "has_more": has_more},
+                   default=json_default),
         status=200,
         content_type="application/json"
     )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     return add_cors_headers(response)
 
-@https_fn.on_request()
-def vector_search(req: https_fn.Request) -> https_fn.Response:
+VECTOR_SEARCH_MAX_BATCH = 16
+
+# Compact vector encodings: base64 of little-endian float32 ("f32") or float16 ("f16").
+# Plain JSON float lists ("json") stay accepted for older clients.
+VECTOR_ENCODINGS = {"f32": ("f", 4), "f16": ("e", 2)}
+SUPPORTED_VECTOR_ENCODINGS = ",".join(["json", *VECTOR_ENCODINGS])
+
+def decode_vector(value, encoding: str) -> Vector:
+    """Decode one wire vector into a Firestore Vector; raises ValueError when malformed."""
+    if encoding == "json":
+        if not isinstance(value, list) or not value:
+            raise ValueError("vector must be a non-empty list")
+        # bool is an int subclass, but true/false in a vector is a client bug
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+            raise ValueError("vector elements must be numbers")
+        return Vector([float(v) for v in value])
+    if encoding not in VECTOR_ENCODINGS:
+        raise ValueError(f"unsupported encoding {encoding!r}")
+    if not isinstance(value, str):
+        raise ValueError(f"{encoding} vector must be a base64 string")
+    return unpack_vector(base64.b64decode(value, validate=True), encoding)
+
+def unpack_vector(raw: bytes, encoding: str) -> Vector:
+    """Vector from raw little-endian f32/f16 bytes."""
+    code, width = VECTOR_ENCODINGS[encoding]
+    if not raw or len(raw) % width:
+        raise ValueError(f"{encoding} vector has {len(raw)} bytes")
+    return Vector(struct.unpack(f"<{len(raw) // width}{code}", raw))
+
+def pack_query_embedding(body: Dict[str, Any]):
+    """Compact, model-tagged copy of the caller's query embedding for the query doc.
+
+    Returns None when the body carries no usable embedding; escalation never fails
+    over it, addanswer just embeds the text itself.
+    """
+    value = body.get("query_embedding")
+    if value is None:
+        return None
+    encoding = body.get("embedding_encoding", "json")
+    try:
+        vec = decode_vector(value, encoding)
+    except (ValueError, TypeError) as e:
+        print(f"Ignoring query_embedding: {e}")
+        return None
+    if encoding == "json":
+        encoding = "f32"
+    code, _ = VECTOR_ENCODINGS[encoding]
+    return {
+        "data": struct.pack(f"<{len(vec)}{code}", *vec),
+        "encoding": encoding,
+        "dim": len(vec),
+        "model": body.get("embedding_model"),
+    }
+
+def stored_query_vector(q: Dict[str, Any]):
+    """The embedding addquery stored on q, or None if absent or from another model/dim."""
+    stored = q.get("query_embedding")
+    if not isinstance(stored, dict):
+        return None
+    if stored.get("model") != EMBED_MODEL or stored.get("dim") != EMBED_DIM:
+        return None
+    try:
+        return unpack_vector(stored["data"], stored["encoding"])
+    except (KeyError, ValueError, struct.error):
+        return None
+
+def nearest_matches(firestore_client, collection_name: str, query_vector: Vector, top_k: int):
+    """Run one find_nearest over collection_name and return JSON-ready matches."""
+    collection = firestore_client.collection(collection_name)
+    vector_query = collection.find_nearest(
+        vector_field="query_embedding",
+        query_vector=query_vector,
+        distance_measure=DistanceMeasure.COSINE,
+        distance_result_field="_vector_distance",
+        distance_threshold=0.6,
+        limit=top_k,
+    )
+
+    with phase("find_nearest"):
+        snaps = list(vector_query.stream())
+    count_ops(reads=max(len(snaps), 1))
+
+    results = []
+    for snap in snaps:
+        doc = strip_vectors(snap.to_dict() or {})
+        doc["id"] = snap.id
+        # Firestore SDKs often attach vector_distance to dict
+        if "_vector_distance" in doc:
+            doc["score"] = doc.pop("_vector_distance")
+        for k in ("created_at", "updated_at"):
+            if k in doc:
+                doc[k] = normalize_ts(doc[k])
+        results.append(doc)
+    return results
+
+@route("vector_search")
+def handle_vector_search(req: https_fn.Request) -> https_fn.Response:
     """
     POST body:
     {
@@ -293,6 +894,14 @@ def vector_search(req: https_fn.Request) -> https_fn.Response:
       "collection": "embeddings",   // required
       "top_k": 5                   
     }
+    -> { "matches": [...] }
+
+    Batch mode: send "query_vectors": [[float...], ...] instead (up to 16).
+    The lookups run concurrently and come back in input order:
+    -> { "results": [{ "matches": [...] }, ...] }
+
+    Vectors may also be sent compactly with "encoding": "f32" or "f16", each one
+    a base64 string of little-endian floats (4x / 8x smaller than JSON text).
     """
     # Handle CORS preflight request
     if req.method == "OPTIONS":
@@ -305,46 +914,60 @@ def vector_search(req: https_fn.Request) -> https_fn.Response:
 
     body = req.get_json(silent=True) or {}
     query_vector = body.get("query_vector")
+    query_vectors = body.get("query_vectors")
     collection_name = body.get("collection")
+    encoding = body.get("encoding", "json")
 
     top_k = int(body.get("top_k", 5))
 
-    if not query_vector or not isinstance(query_vector, list):
-        response = https_fn.Response("query_vector must be a list", status=400)
+    if query_vectors is not None:
+        if not isinstance(query_vectors, list) or not query_vectors:
+            response = https_fn.Response("query_vectors must be a non-empty list", status=400)
+            return add_cors_headers(response)
+        if len(query_vectors) > VECTOR_SEARCH_MAX_BATCH:
+            response = https_fn.Response(
+                f"query_vectors accepts at most {VECTOR_SEARCH_MAX_BATCH} vectors", status=400
+            )
+            return add_cors_headers(response)
+    elif not query_vector:
+        response = https_fn.Response("query_vector is required", status=400)
+        return add_cors_headers(response)
+    try:
+        with phase("decode"):
+            if query_vectors is None:
+                query_vector = decode_vector(query_vector, encoding)
+            else:
+                query_vectors = [decode_vector(v, encoding) for v in query_vectors]
+    except (ValueError, TypeError) as e:
+        response = https_fn.Response(f"Invalid query vector: {e}", status=400)
+        response.headers["X-Vector-Encodings"] = SUPPORTED_VECTOR_ENCODINGS
         return add_cors_headers(response)
     if not collection_name:
         response = https_fn.Response("collection is required", status=400)
         return add_cors_headers(response)
 
     try:
-        firestore_client = firestore.client()
-        collection = firestore_client.collection(collection_name)
-        vector_query = collection.find_nearest(
-            vector_field="query_embedding",
-            query_vector=Vector([float(x) for x in query_vector]),
-            distance_measure=DistanceMeasure.COSINE,
-            distance_result_field="_vector_distance",
-            distance_threshold=0.6,
-            limit=top_k,
-        )
-
-        results = []
-        for snap in vector_query.stream():
-            doc = strip_vectors(snap.to_dict() or {})
-            doc["id"] = snap.id
-            # Firestore SDKs often attach vector_distance to dict
-            if "_vector_distance" in snap.to_dict():
-                doc["score"] = snap.to_dict()["_vector_distance"]
-            for k in ("created_at", "updated_at"):
-                if k in doc:
-                    doc[k] = normalize_ts(doc[k])
-            results.append(doc)
+        firestore_client = get_firestore()
+        if query_vectors is None:
+            payload = {"matches": nearest_matches(firestore_client, collection_name, query_vector, top_k)}
+        else:
+            # find_nearest time is summed across the concurrent lookups
+            context = contextvars.copy_context()
+            with ThreadPoolExecutor(max_workers=len(query_vectors)) as pool:
+                batches = list(pool.map(
+                    lambda v: context.copy().run(
+                        nearest_matches, firestore_client, collection_name, v, top_k
+                    ),
+                    query_vectors,
+                ))
+            payload = {"results": [{"matches": matches} for matches in batches]}
 
         response = https_fn.Response(
-            json.dumps({"matches": results}, default=json_default),
+            json.dumps(payload, default=json_default),
             status=200,
             content_type="application/json",
         )
+        response.headers["X-Vector-Encodings"] = SUPPORTED_VECTOR_ENCODINGS
         return add_cors_headers(response)
 
     except Exception as e:
@@ -353,19 +976,22 @@ def vector_search(req: https_fn.Request) -> https_fn.Response:
 
 def get_embedding_sync(text: str) -> list[float]:
     """Synchronous embedding call (OpenAI). Replace with your own if needed."""
-    client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-    resp = client.embeddings.create(model=EMBED_MODEL, input=text)
+    resp = get_openai().embeddings.create(model=EMBED_MODEL, input=text)
     vec = resp.data[0].embedding
     if len(vec) != EMBED_DIM:
         raise RuntimeError(f"Embedding dim mismatch: got {len(vec)}, expected {EMBED_DIM}")
     return vec
 
-@https_fn.on_request()
-def addanswer(req: https_fn.Request) -> https_fn.Response:
+@route("addanswer")
+def handle_addanswer(req: https_fn.Request) -> https_fn.Response:
     """
     POST JSON:
     { "query_id": "Q123", "answer_text": "…", "resolved_by": "sup_42" }
-    -> { "answer_id": "...", "query_id": "Q123", "status": "answered" }
+    -> { "answer_id": "...", "query_id": "Q123", "status": "answered",
+         "resolved_query_ids": ["Q123", ...] }
+
+    Answering any query of a duplicate cluster resolves every pending query in
+    it and writes one /answers doc per waiting room in the same commit.
     """
     # Handle CORS preflight request
     if req.method == "OPTIONS":
@@ -375,7 +1001,7 @@ def addanswer(req: https_fn.Request) -> https_fn.Response:
     if req.method != "POST":
         response = https_fn.Response("Method not allowed", status=405)
         return add_cors_headers(response)
-    firestore_client = firestore.client()
+    firestore_client = get_firestore()
     body: Dict[str, Any] = req.get_json(silent=True) or {}
     qid       = body.get("query_id")
     ans_text  = body.get("answer_text")
@@ -385,22 +1011,37 @@ def addanswer(req: https_fn.Request) -> https_fn.Response:
         response = https_fn.Response("query_id and answer_text required", status=400)
         return add_cors_headers(response)
     qref = firestore_client.collection("queries").document(qid)
-    qsnap = qref.get()
+    with phase("firestore_read"):
+        qsnap = qref.get()
+    count_ops(reads=1)
     if not qsnap.exists:
         response = https_fn.Response("Query not found", status=404)
         return add_cors_headers(response)
     q = qsnap.to_dict() or {}
 
-    # 1) Compute embedding outside the transaction (fast fail if missing key/model)
-    try:
-        vec = get_embedding_sync(q.get("query"))
-    except Exception as e:
-        response = https_fn.Response(f"Embedding failed: {e}", status=500)
-        return add_cors_headers(response)
+    # 1) Reuse the embedding the agent sent with the query; only embed here (outside
+    #    the transaction, fast fail if missing key/model) when it is absent or stale
+    vec = stored_query_vector(q)
+    if vec is None:
+        try:
+            with phase("embedding"):
+                vec = get_embedding_sync(q.get("query"))
+        except Exception as e:
+            response = https_fn.Response(f"Embedding failed: {e}", status=500)
+            return add_cors_headers(response)
 
-    qref = firestore_client.collection("queries").document(qid)
+    queries = firestore_client.collection("queries")
+    qref = queries.document(qid)
     aref = firestore_client.collection("answers").document()              # new answer id
     iref = firestore_client.collection("answers_index").document(aref.id) # mirror for vector search
+    # The whole cluster of duplicate escalations is resolved by this one answer
+    root_id = q.get("duplicate_of") or qid
+    root_ref = queries.document(root_id)
+    members_query = (
+        queries.where(filter=FieldFilter("duplicate_of", "==", root_id))
+        .where(filter=FieldFilter("status", "==", "pending"))
+    )
+    fanout: List[str] = []
 
     # 2) Transaction
     transaction = firestore_client.transaction()
@@ -411,54 +1052,493 @@ def addanswer(req: https_fn.Request) -> https_fn.Response:
         if not qsnap.exists:
             raise ValueError("Query not found")
 
-        q = qsnap.to_dict() or {}
-        user_id = q.get("user_id")
+        # every read happens before the first write
+        waiting = {qsnap.id: qsnap}
+        root_snap = root_ref.get(transaction=tx)
+        if root_snap.exists and (root_snap.to_dict() or {}).get("status") == "pending":
+            waiting[root_snap.id] = root_snap
+        for snap in tx.get(members_query):
+            waiting[snap.id] = snap
+
         now = firestore.SERVER_TIMESTAMP
+        fanout.clear()
+        for snap in waiting.values():
+            member = snap.to_dict() or {}
+            # /answers/{aid}: one per waiting room; the agent watching the room speaks it
+            member_aref = aref if snap.id == qid else firestore_client.collection("answers").document()
+            tx.set(member_aref, {
+                "query_id": snap.id,
+                "user_id": member.get("user_id"),
+                "room_name": member.get("room_name"),
+                "text": ans_text,
+                "answer_text": ans_text,
+                "spoken": False,
+                "created_at": now,
+                "updated_at": now,
+            })
 
-        # /answers/{aid}
-        tx.set(aref, {
-            "query_id": qid,
-            "user_id": user_id,
-            "text": ans_text,
-            "created_at": now,
-            "updated_at": now,
-        })
+            # /queries/{qid} update
+            updates = {
+                "status": "resolved",
+                "answer_id": member_aref.id,
+                "updated_at": now,
+                "last_response_at": now,
+            }
+            if resolved_by:
+                updates["resolved_by"] = resolved_by
+            if snap.id == root_id:
+                updates["cluster_vector"] = firestore.DELETE_FIELD
+            tx.update(snap.reference, updates)
+            fanout.append(snap.id)
 
         # /answers_index/{aid} (vector field must match your index field & dim)
         tx.set(iref, {
             "query_id": qid,
             "answer_text": ans_text,
-            "query_embedding": Vector(vec),   # vector field
+            "query_embedding": vec if isinstance(vec, Vector) else Vector(vec),   # vector field
             "embedding_dim": EMBED_DIM,
             "embedding_model": EMBED_MODEL,
             "created_at": now,
             "updated_at": now,
         })
 
-        # /queries/{qid} update
-        updates = {
-            "status": "resolved",
-            "answer_id": aref.id,
-            "updated_at": now,
-            "last_response_at": now,
-        }
-        if resolved_by:
-            updates["resolved_by"] = resolved_by
-
-        tx.update(qref, updates)
-
     try:
-        txn(transaction)   # run the transactional function with the transaction object
+        with phase("transaction"):
+            txn(transaction)   # run the transactional function with the transaction object
+        # last attempt's reads (query, root, members) and writes (answers, queries, index)
+        count_ops(reads=len(fanout) + 1, writes=2 * len(fanout) + 1)
     except ValueError as ve:
         response = https_fn.Response(str(ve), status=404)
         return add_cors_headers(response)
     except Exception as e:
         response = https_fn.Response(f"Write failed: {e}", status=500)
         return add_cors_headers(response)
-    print(f"Supervisor answered the query:{qid} with answer:{ans_text}")
+    print(f"Supervisor answered the query:{qid} with answer:{ans_text} ({len(fanout)} waiting)")
     response = https_fn.Response(
-        json.dumps({"answer_id": aref.id, "query_id": qid, "status": "answered"}),
+        json.dumps({"answer_id": aref.id, "query_id": qid, "status": "answered",
+                    "resolved_query_ids": fanout}),
         status=201,
         content_type="application/json",
     )
-    return add_cors_headers(response)
\ No newline at end of file
+    return add_cors_headers(response)
+
+BULK_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", "100"))
+BULK_EMBED_CONCURRENCY = int(os.environ.get("BULK_EMBED_CONCURRENCY", "4"))
+BULK_EMBED_RPM = int(os.environ.get("BULK_EMBED_RPM", "500"))
+
+def get_embeddings_batch_sync(client: "OpenAI", texts: List[str]) -> List[List[float]]:
+    """Embed several texts in one multi-input call, preserving input order."""
+    resp = client.embeddings.create(model=EMBED_MODEL, input=texts)
+    vecs = [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+    for vec in vecs:
+        if len(vec) != EMBED_DIM:
+            raise RuntimeError(f"Embedding dim mismatch: got {len(vec)}, expected {EMBED_DIM}")
+    return vecs
+
+def iter_bulk_rows(req: https_fn.Request, fmt: str):
+    """
+    Yield (row, error) for each {query, answer_text, resolved_by?} row of a JSONL
+    or CSV body without buffering it. A line that isn't a JSON object comes back
+    as (None, reason) so it is skipped like any other invalid row.
+    """
+    stream = io.TextIOWrapper(req.stream, encoding="utf-8", newline="")
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield row, None
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield None, "row must be a JSON object"
+            continue
+        yield row, None
+
+def bulk_doc_id(import_id: str, row_number: int) -> str:
+    """Deterministic id so re-running an import overwrites rather than duplicates."""
+    return hashlib.sha1(f"{import_id}:{row_number}".encode()).hexdigest()[:20]
+
+# one import per instance: it holds an embedding pool and a Firestore batch
+@https_fn.on_request(timeout_sec=540, memory=1024, concurrency=1)
+@instrumented
+def bulkaddanswers(req: https_fn.Request) -> https_fn.Response:
+    """
+    POST a JSONL (application/x-ndjson) or CSV (text/csv) body of
+    {"query": "...", "answer_text": "...", "resolved_by"?: "..."} rows.
+
+    Query params:
+      import_id    identifies the import; re-using it resumes / overwrites
+      resume_from  row cursor returned as next_cursor by a previous call
+      max_rows     stop after this many rows and return a cursor
+
+    -> { "import_id", "imported", "skipped", "errors", "failed_rows", "next_cursor", "done" }
+    Progress is also kept in imports/{import_id}. If a row fails to write, the
+    call stops with next_cursor at the first failed row, so resuming replays it.
+    """
+    # Handle CORS preflight request
+    if req.method == "OPTIONS":
+        response = https_fn.Response("", status=200)
+        return add_cors_headers(response)
+
+    if req.method != "POST":
+        response = https_fn.Response("Method not allowed", status=405)
+        return add_cors_headers(response)
+
+    content_type = (req.content_type or "").lower()
+    fmt = req.args.get("format") or ("csv" if "csv" in content_type else "jsonl")
+    if fmt not in ("csv", "jsonl"):
+        response = https_fn.Response("format must be csv or jsonl", status=400)
+        return add_cors_headers(response)
+    try:
+        resume_from = int(req.args.get("resume_from", "0"))
+        max_rows = int(req.args["max_rows"]) if req.args.get("max_rows") else None
+    except ValueError:
+        response = https_fn.Response("resume_from and max_rows must be integers", status=400)
+        return add_cors_headers(response)
+    firestore_client = get_firestore()
+    import_id = req.args.get("import_id") or firestore_client.collection("imports").document().id
+    progress_ref = firestore_client.collection("imports").document(import_id)
+    # same connection pool as the shared client, with more retries for rate limits
+    openai_client = get_openai().with_options(max_retries=6)
+    # batches embed on pool threads, so record against this request explicitly
+    metrics = _current_metrics.get()
+
+    errors: List[Dict[str, Any]] = []
+    # row number of every document path written, to map BulkWriter failures back
+    row_by_doc: Dict[str, int] = {}
+    failed_rows: set = set()
+
+    writer = firestore_client.bulk_writer()
+
+    def _on_write_error(err, _writer) -> bool:
+        if err.attempts < 3:
+            return True
+        path = err.operation.reference.path
+        row_number = row_by_doc.get(path)
+        errors.append({"row": row_number, "doc": path, "error": err.message})
+        if row_number is not None:
+            failed_rows.add(row_number)
+        return False
+
+    writer.on_write_error(_on_write_error)
+
+    # Space out embedding calls so concurrent batches stay under the RPM budget
+    min_interval = 60.0 / BULK_EMBED_RPM if BULK_EMBED_RPM > 0 else 0.0
+    pace_lock = threading.Lock()
+    next_slot = [time.monotonic()]
+
+    def _embed(rows):
+        with pace_lock:
+            wait = next_slot[0] - time.monotonic()
+            next_slot[0] = max(next_slot[0], time.monotonic()) + min_interval
+        if wait > 0:
+            time.sleep(wait)
+        with metrics.phase("embedding"):
+            return get_embeddings_batch_sync(openai_client, [r["query"] for _, r in rows])
+
+    def _write(rows, vecs):
+        now = firestore.SERVER_TIMESTAMP
+        for (row_number, row), vec in zip(rows, vecs):
+            doc_id = bulk_doc_id(import_id, row_number)
+            row_by_doc[f"answers/{doc_id}"] = row_number
+            row_by_doc[f"answers_index/{doc_id}"] = row_number
+            writer.set(firestore_client.collection("answers").document(doc_id), {
+                "query_id": None,
+                "user_id": None,
+                "text": row["answer_text"],
+                "import_id": import_id,
+                "created_at": now,
+                "updated_at": now,
+            })
+            writer.set(firestore_client.collection("answers_index").document(doc_id), {
+                "query_id": None,
+                "query": row["query"],
+                "answer_text": row["answer_text"],
+                "query_embedding": Vector(vec),
+                "embedding_dim": EMBED_DIM,
+                "embedding_model": EMBED_MODEL,
+                "import_id": import_id,
+                "resolved_by": row.get("resolved_by"),
+                "created_at": now,
+                "updated_at": now,
+            })
+
+    def _save_progress(cursor: int, done: bool):
+        progress_ref.set({
+            "import_id": import_id,
+            "cursor": cursor,
+            "imported": imported,
+            "skipped": skipped,
+            "errors": errors[-20:],
+            "status": "done" if done else "running",
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }, merge=True)
+
+    imported = 0
+    skipped = 0
+    cursor = resume_from
+    done = False
+    window: List[List[tuple]] = []
+    batch: List[tuple] = []
+
+    def _flush_window(pool):
+        nonlocal imported, cursor
+        if not window:
+            return
+        futures = [pool.submit(_embed, rows) for rows in window]
+        for rows, fut in zip(window, futures):
+            try:
+                vecs = fut.result()
+            except Exception as e:
+                # stop here; the cursor still points at the first row of this batch
+                raise RuntimeError(f"Embedding failed at row {rows[0][0]}: {e}") from e
+            _write(rows, vecs)
+            imported += len(rows)
+            cursor = rows[-1][0] + 1
+        with metrics.phase("firestore_write"):
+            writer.flush()
+        metrics.count(writes=2 * sum(len(rows) for rows in window) + 1)
+        if failed_rows:
+            # rewind so a resume replays the first failed row; rows after it are
+            # replayed too and overwritten in place (document ids are deterministic)
+            cursor = min(failed_rows)
+            imported -= sum(1 for rows in window for row_number, _ in rows if row_number >= cursor)
+            window.clear()
+            raise RuntimeError(f"{len(failed_rows)} rows failed to write; resume from row {cursor}")
+        window.clear()
+        _save_progress(cursor, False)
+
+    try:
+        with ThreadPoolExecutor(max_workers=BULK_EMBED_CONCURRENCY) as pool:
+            row_number = resume_from - 1
+            stop_at = None
+            for row_number, (row, row_error) in enumerate(iter_bulk_rows(req, fmt)):
+                if row_number < resume_from:
+                    continue
+                if max_rows is not None and row_number >= resume_from + max_rows:
+                    stop_at = row_number
+                    break
+                if row_error is None:
+                    query = row.get("query")
+                    answer_text = row.get("answer_text")
+                    query = query.strip() if isinstance(query, str) else ""
+                    answer_text = answer_text.strip() if isinstance(answer_text, str) else ""
+                    if not query or not answer_text:
+                        row_error = "query and answer_text required"
+                if row_error is not None:
+                    skipped += 1
+                    errors.append({"row": row_number, "error": row_error})
+                    continue
+                batch.append((row_number, {**row, "query": query, "answer_text": answer_text}))
+                if len(batch) >= BULK_BATCH_SIZE:
+                    window.append(batch)
+                    batch = []
+                if len(window) >= BULK_EMBED_CONCURRENCY:
+                    _flush_window(pool)
+            else:
+                done = True
+            if batch:
+                window.append(batch)
+            _flush_window(pool)
+            # rows skipped for validation after the last written batch count as handled
+            cursor = max(cursor, row_number + 1 if stop_at is None else stop_at)
+    except Exception as e:
+        writer.close()
+        _save_progress(cursor, False)
+        response = https_fn.Response(
+            json.dumps({
+                "import_id": import_id,
+                "imported": imported,
+                "skipped": skipped,
+                "errors": errors + [{"error": str(e)}],
+                "failed_rows": sorted(failed_rows),
+                "next_cursor": cursor,
+                "done": False,
+            }),
+            status=500,
+            content_type="application/json",
+        )
+        return add_cors_headers(response)
+
+    writer.close()
+    _save_progress(cursor, done)
+    print(f"Bulk import {import_id}: {imported} imported, {skipped} skipped, cursor {cursor}")
+    response = https_fn.Response(
+        json.dumps({
+            "import_id": import_id,
+            "imported": imported,
+            "skipped": skipped,
+            "errors": errors,
+            "failed_rows": [],
+            "next_cursor": None if done else cursor,
+            "done": done,
+        }),
+        status=200,
+        content_type="application/json",
+    )
+    return add_cors_headers(response)
+
+# Most operations one /batch call may carry; each gets its own worker thread
+BATCH_MAX_OPERATIONS = 16
+# bulkaddanswers is left out: it streams its own body and needs a 540 s timeout
+BATCH_OPERATIONS = ("addquery", "getquery", "getanswer", "getallqueries",
+                    "getallanswers", "getchanges", "vector_search", "addanswer")
+
+def operation_request(spec: Dict[str, Any]) -> https_fn.Request:
+    """Build the request one batch operation would have sent on its own."""
+    # imported here: werkzeug.test adds ~100 ms to every instance's cold start
+    from werkzeug.test import EnvironBuilder
+    body = spec.get("body")
+    builder = EnvironBuilder(
+        path=f"/{spec['op']}",
+        method=spec.get("method") or ("GET" if body is None else "POST"),
+        query_string=spec.get("params") or None,
+        headers=spec.get("headers") or None,
+        json=body,
+    )
+    try:
+        return https_fn.Request(builder.get_environ())
+    finally:
+        builder.close()
+
+def run_operation(spec: Dict[str, Any]) -> Dict[str, Any]:
+    op = spec["op"]
+    try:
+        response = ROUTES[op](operation_request(spec))
+    except Exception as e:
+        return {"op": op, "status": 500, "body": f"Error running {op}: {e}"}
+    result: Dict[str, Any] = {"op": op, "status": response.status_code}
+    if response.is_json:
+        result["body"] = response.get_json()
+    else:
+        result["body"] = response.get_data(as_text=True)
+    if response.headers.get("ETag"):
+        result["etag"] = response.headers["ETag"]
+    return result
+
+@route("batch")
+def handle_batch(req: https_fn.Request) -> https_fn.Response:
+    """
+    POST body:
+    {
+      "operations": [
+        { "op": "vector_search", "body": {...} },
+        { "op": "addquery", "body": {...}, "headers": {"Idempotency-Key": "..."} },
+        { "op": "getquery", "params": {"id": "..."} }
+      ]
+    }
+    -> { "results": [{ "op", "status", "body", "etag"? }, ...] }
+
+    Up to 16 operations run concurrently, each exactly as its own endpoint
+    would handle it, and come back in input order. "method" defaults to POST
+    when a body is given and GET otherwise. A failed operation only fails its
+    own result.
+    """
+    # Handle CORS preflight request
+    if req.method == "OPTIONS":
+        response = https_fn.Response("", status=200)
+        return add_cors_headers(response)
+
+    if req.method != "POST":
+        response = https_fn.Response("Method not allowed", status=405)
+        return add_cors_headers(response)
+
+    body = req.get_json(silent=True) or {}
+    operations = body.get("operations")
+    if not isinstance(operations, list) or not operations:
+        response = https_fn.Response("operations must be a non-empty list", status=400)
+        return add_cors_headers(response)
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        response = https_fn.Response(
+            f"operations accepts at most {BATCH_MAX_OPERATIONS} entries", status=400
+        )
+        return add_cors_headers(response)
+    for spec in operations:
+        if not isinstance(spec, dict) or spec.get("op") not in BATCH_OPERATIONS:
+            response = https_fn.Response(
+                f"each operation needs an op, one of: {', '.join(BATCH_OPERATIONS)}", status=400
+            )
+            return add_cors_headers(response)
+
+    # operations record their phases and reads/writes against this request
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=len(operations)) as pool:
+        results = list(pool.map(lambda spec: context.copy().run(run_operation, spec), operations))
+
+    response = https_fn.Response(
+        json.dumps({"results": results}, default=json_default),
+        status=200,
+        content_type="application/json",
+    )
+    return add_cors_headers(response)
+
+@https_fn.on_request(**HOT_PATH_OPTIONS)
+@instrumented
+def api(req: https_fn.Request) -> https_fn.Response:
+    """
+    Every operation behind one function: /api/addquery, /api/getquery, ...,
+    /api/batch. Requests and responses are the same as the per-operation URLs,
+    but they share one pool of warm instances and its clients.
+    """
+    name = req.path.rstrip("/").rsplit("/", 1)[-1]
+    handler = ROUTES.get(name)
+    if handler is None:
+        if req.method == "OPTIONS":
+            return add_cors_headers(https_fn.Response("", status=200))
+        response = https_fn.Response(
+            f"Unknown operation {name!r}; expected one of: {', '.join(ROUTES)}", status=404
+        )
+        return add_cors_headers(response)
+    _current_metrics.get().function = f"api/{name}"
+    return handler(req)
+
+# Per-operation URLs, kept for existing clients: each one serves its route only.
+
+@https_fn.on_request(**SHIM_OPTIONS)
+@instrumented
+def addquery(req: https_fn.Request) -> https_fn.Response:
+    return handle_addquery(req)
+
+@https_fn.on_request(**SHIM_OPTIONS)
+@instrumented
+def getquery(req: https_fn.Request) -> https_fn.Response:
+    return handle_getquery(req)
+
+@https_fn.on_request(**SHIM_OPTIONS)
+@instrumented
+def getanswer(req: https_fn.Request) -> https_fn.Response:
+    return handle_getanswer(req)
+
+@https_fn.on_request(**SHIM_OPTIONS)
+@instrumented
+def getallqueries(req: https_fn.Request) -> https_fn.Response:
+    return handle_getallqueries(req)
+
+@https_fn.on_request(**SHIM_OPTIONS)
+@instrumented
+def getallanswers(req: https_fn.Request) -> https_fn.Response:
+    return handle_getallanswers(req)
+
+@https_fn.on_request(**SHIM_OPTIONS)
+@instrumented
+def getchanges(req: https_fn.Request) -> https_fn.Response:
+    return handle_getchanges(req)
+
+@https_fn.on_request(**SHIM_OPTIONS)
+@instrumented
+def vector_search(req: https_fn.Request) -> https_fn.Response:
+    return handle_vector_search(req)
+
+@https_fn.on_request(**SHIM_OPTIONS)
+@instrumented
+def addanswer(req: https_fn.Request) -> https_fn.Response:
+    return handle_addanswer(req)
+
+# Import and module setup cost, reported as the "init" phase of cold-start requests
+IMPORT_DURATION_S = time.perf_counter() - _IMPORT_STARTED
@@ -0,0 +1,8 @@
+"""Run from firebase/functions with the functions' virtualenv: ``python -m pytest tests``."""
+
+import os
+import sys
+
+os.environ.setdefault("GCLOUD_PROJECT", "demo-test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,128 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, request
+from google.cloud.firestore_v1.bulk_writer import BulkWriteFailure, BulkWriterSetOperation
+
+import main
+
+
+class _Ref:
+    def __init__(self, store, path):
+        self.store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def set(self, data, merge=False):
+        if merge:
+            self.store.setdefault(self.path, {}).update(data)
+        else:
+            self.store[self.path] = dict(data)
+
+    def get(self):
+        data = self.store.get(self.path)
+        return SimpleNamespace(exists=data is not None, to_dict=lambda: data, id=self.id)
+
+
+class _Collection:
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+
+    def document(self, doc_id=None):
+        return _Ref(self.store, f"{self.name}/{doc_id or 'auto'}")
+
+
+class _FailingBulkWriter:
+    """Calls the error callback the way BulkWriter does: ``(failure, writer)``."""
+
+    def __init__(self, fail_path):
+        self.fail_path = fail_path
+        self.retries = []
+
+    def on_write_error(self, callback):
+        self.callback = callback
+
+    def set(self, reference, document_data, merge=False):
+        if reference.path != self.fail_path:
+            reference.set(document_data, merge)
+            return
+        operation = BulkWriterSetOperation(reference, document_data, merge)
+        while True:
+            operation.attempts += 1
+            failure = BulkWriteFailure(operation, code=14, message="unavailable")
+            retry = self.callback(failure, self)
+            self.retries.append(retry)
+            if not retry:
+                return
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _DB:
+    def __init__(self, writer):
+        self.store = {}
+        self.writer = writer
+
+    def collection(self, name):
+        return _Collection(self.store, name)
+
+    def bulk_writer(self):
+        return self.writer
+
+
+class _FakeOpenAI:
+    def __init__(self):
+        self.embeddings = self
+
+    def with_options(self, **kwargs):
+        return self
+
+    def create(self, model, input):  # noqa: A002
+        vec = [0.0] * main.EMBED_DIM
+        data = [SimpleNamespace(index=i, embedding=vec) for i in range(len(input))]
+        return SimpleNamespace(data=data)
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    def install(fail_path):
+        writer = _FailingBulkWriter(fail_path)
+        db = _DB(writer)
+        monkeypatch.setattr(main, "_firestore_client", db)
+        monkeypatch.setattr(main, "_openai_client", _FakeOpenAI())
+        monkeypatch.setattr(main, "BULK_BATCH_SIZE", 2)
+        return db, writer
+
+    return install
+
+
+def _post(body: str, query: str):
+    with Flask(__name__).test_request_context(
+        f"/?{query}", method="POST", data=body, content_type="application/x-ndjson"
+    ):
+        response = main.bulkaddanswers(request)
+        return response.status_code, json.loads(response.get_data(as_text=True))
+
+
+def test_write_failure_rewinds_cursor_to_failed_row(fake_backend):
+    failing_row = 3
+    db, writer = fake_backend(f"answers_index/{main.bulk_doc_id('imp', failing_row)}")
+    body = "".join(
+        json.dumps({"query": f"q{i}", "answer_text": f"a{i}"}) + "\n" for i in range(5)
+    )
+
+    status, out = _post(body, "import_id=imp")
+
+    # retried while attempts < 3, then given up
+    assert writer.retries == [True, True, False]
+    assert status == 500
+    assert out["failed_rows"] == [failing_row]
+    assert out["next_cursor"] == failing_row
+    assert out["errors"][0]["error"] == "unavailable"
+    assert db.store["imports/imp"]["status"] != "done"
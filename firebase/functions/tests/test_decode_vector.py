@@ -0,0 +1,38 @@
+import base64
+import struct
+
+import pytest
+from flask import Flask, request
+
+import main
+
+
+def test_json_vector_is_coerced_to_floats() -> None:
+    vec = main.decode_vector([1, 0.5, -2], "json")
+    assert list(vec) == [1.0, 0.5, -2.0]
+    assert all(isinstance(v, float) for v in vec)
+
+
+@pytest.mark.parametrize("value", [["0.1", "0.2"], [[0.1], [0.2]], [0.1, None], [True, 0.2], []])
+def test_malformed_json_vector_is_rejected(value) -> None:
+    with pytest.raises(ValueError):
+        main.decode_vector(value, "json")
+
+
+def test_compact_vector_round_trips() -> None:
+    raw = struct.pack("<2f", 0.25, -1.0)
+    vec = main.decode_vector(base64.b64encode(raw).decode(), "f32")
+    assert list(vec) == [0.25, -1.0]
+
+
+def test_unknown_encoding_is_rejected() -> None:
+    with pytest.raises(ValueError, match="unsupported encoding"):
+        main.decode_vector("AAAA", "f64")
+
+
+def test_vector_search_answers_400_for_non_numeric_vectors() -> None:
+    body = {"collection": "answers_index", "query_vector": ["0.1", "0.2"]}
+    with Flask(__name__).test_request_context("/", method="POST", json=body):
+        response = main.vector_search(request)
+    assert response.status_code == 400
+    assert "elements must be numbers" in response.get_data(as_text=True)
@@ -0,0 +1,124 @@
+"""Import-time profile of the Cloud Functions module.
+
+Every function instance imports ``main.py`` before serving its first request,
+and the firebase CLI imports it again at deploy time to discover the
+functions, so the import cost is paid on every cold start. This script
+imports the module in fresh interpreters with ``-X importtime`` and reports
+the median total plus the heaviest top-level packages.
+
+    python firebase/scripts/import_profile.py --output after.json
+    python firebase/scripts/import_profile.py --source /tmp/old/functions \\
+        --output before.json
+    python firebase/scripts/import_profile.py --compare before.json
+
+Run it with the functions' virtualenv python so the same packages load.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+DEFAULT_SOURCE = Path(__file__).resolve().parents[1] / "functions"
+
+
+def import_once(source: Path, module: str) -> tuple[float, dict[str, float]]:
+    """Import ``module`` in a new interpreter; returns (total_ms, ms per top-level package)."""
+    env = dict(os.environ, PYTHONPATH=str(source))
+    env.setdefault("GCLOUD_PROJECT", "import-profile")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=source,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_ms = 0.0
+    packages: dict[str, float] = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header row
+        indent = len(name) - len(name.lstrip())
+        name = name.strip()
+        cumulative_ms = int(cumulative) / 1000
+        if name == module:
+            total_ms = cumulative_ms
+        elif indent == 3:
+            # imported directly by the module: attribute its whole subtree
+            packages[name.split(".")[0]] += cumulative_ms
+    return total_ms, packages
+
+
+def profile(source: Path, module: str, runs: int) -> dict:
+    totals = []
+    packages: dict[str, list[float]] = defaultdict(list)
+    for _ in range(runs):
+        total_ms, by_package = import_once(source, module)
+        totals.append(total_ms)
+        for name, ms in by_package.items():
+            packages[name].append(ms)
+    medians = {name: statistics.median(values) for name, values in packages.items()}
+    return {
+        "source": str(source),
+        "runs": runs,
+        "total_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "packages_ms": {
+            name: round(ms, 1)
+            for name, ms in sorted(medians.items(), key=lambda kv: -kv[1])
+        },
+    }
+
+
+def print_report(result: dict, top: int) -> None:
+    print(
+        f"import {result['source']}: median {result['total_ms']:.0f} ms "
+        f"(min {result['min_ms']:.0f} ms, {result['runs']} runs)"
+    )
+    for name, ms in list(result["packages_ms"].items())[:top]:
+        print(f"  {name:<24} {ms:8.1f} ms")
+
+
+def print_comparison(before: dict, after: dict, top: int) -> None:
+    delta = after["total_ms"] - before["total_ms"]
+    pct = delta / before["total_ms"] * 100 if before["total_ms"] else 0.0
+    print(
+        f"\ntotal: {before['total_ms']:.0f} ms -> {after['total_ms']:.0f} ms "
+        f"({delta:+.0f} ms, {pct:+.0f}%)"
+    )
+    names = list(before["packages_ms"])[:top]
+    names += [n for n in list(after["packages_ms"])[:top] if n not in names]
+    for name in names:
+        old = before["packages_ms"].get(name, 0.0)
+        new = after["packages_ms"].get(name, 0.0)
+        print(f"  {name:<24} {old:8.1f} -> {new:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="earlier --output to diff against")
+    args = parser.parse_args()
+
+    result = profile(args.source.resolve(), args.module, args.runs)
+    print_report(result, args.top)
+    if args.compare:
+        print_comparison(json.loads(args.compare.read_text()), result, args.top)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,60 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import './App.css'
 import ApiService from './api'
 import type { Query, CreateAnswerRequest, Answer } from './types'
 
-type TabType = 'pending' | 'resolved' | 'unresolved' | 'allanswers'
+type QueryStatus = Query['status']
+type TabType = QueryStatus | 'allanswers'
+
+const CHANGE_POLL_MS = 5000
+const QUERY_STATUSES: QueryStatus[] = ['pending', 'resolved', 'unresolved']
+
+// Each status tab pages through its own server-filtered listing
+interface QueryList {
+  items: Query[]
+  cursor: string | null
+}
+
+const emptyQueryLists = (): Record<QueryStatus, QueryList> => ({
+  pending: { items: [], cursor: null },
+  resolved: { items: [], cursor: null },
+  unresolved: { items: [], cursor: null },
+})
+
+const byNewest = (a: Query, b: Query) => b.created_at.localeCompare(a.created_at)
+
+// Move changed queries into the list for their current status, keeping newest first.
+// Older ones that fall past a list's loaded pages are left for "Load more" to fetch.
+function applyQueryChanges(
+  lists: Record<QueryStatus, QueryList>,
+  changes: Query[]
+): Record<QueryStatus, QueryList> {
+  const changedIds = new Set(changes.map(q => q.query_id))
+  const next = emptyQueryLists()
+  for (const status of QUERY_STATUSES) {
+    const list = lists[status]
+    const oldest = list.items[list.items.length - 1]
+    const moved = changes.filter(q =>
+      q.status === status && (!list.cursor || !oldest || q.created_at >= oldest.created_at)
+    )
+    const items = [...list.items.filter(q => !changedIds.has(q.query_id)), ...moved]
+    next[status] = { items: items.sort(byNewest), cursor: list.cursor }
+  }
+  return next
+}
+
+// Replace changed items in place and put new ones first (lists are newest first)
+function mergeById<T>(items: T[], changes: T[], key: (item: T) => string): T[] {
+  const changed = new Map(changes.map(c => [key(c), c]))
+  const merged = items.map(item => changed.get(key(item)) ?? item)
+  const existing = new Set(items.map(key))
+  const added = changes.filter(c => !existing.has(key(c))).reverse()
+  return [...added, ...merged]
+}
 
 function App() {
   const [activeTab, setActiveTab] = useState<TabType>('pending')
-  const [queries, setQueries] = useState<Query[]>([])
+  const [queryLists, setQueryLists] = useState<Record<QueryStatus, QueryList>>(emptyQueryLists)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const [selectedQuery, setSelectedQuery] = useState<Query | null>(null)
@@ -20,20 +67,72 @@ function App() {
   const [selectedAnswerDetail, setSelectedAnswerDetail] = useState<Answer | null>(null)
   const [selectedQueryForAnswer, setSelectedQueryForAnswer] = useState<Query | null>(null)
   const [loadingQueryForAnswer, setLoadingQueryForAnswer] = useState(false)
+  const [answersCursor, setAnswersCursor] = useState<string | null>(null)
 
-  // Load all queries on component mount
+  // Change-feed positions; `since` is the watermark, `etag` lets idle polls end in a 304
+  const feeds = useRef({
+    queries: { since: null as string | null, etag: null as string | null },
+    answers: { since: null as string | null, etag: null as string | null },
+  })
+
+  // Take the change-feed watermarks first so nothing written during the initial load is missed,
+  // then load the lists and poll for deltas instead of re-downloading everything
   useEffect(() => {
-    loadQueries()
-    loadAllAnswers()
+    let cancelled = false
+    const start = async () => {
+      await Promise.all([syncChanges('queries'), syncChanges('answers')])
+      if (cancelled) return
+      loadAllQueries()
+      loadAllAnswers()
+    }
+    start()
+    const timer = setInterval(() => {
+      syncChanges('queries')
+      syncChanges('answers')
+    }, CHANGE_POLL_MS)
+    return () => {
+      cancelled = true
+      clearInterval(timer)
+    }
   }, [])
 
-  const loadQueries = async () => {
+  const syncChanges = async (collection: 'queries' | 'answers') => {
+    const feed = feeds.current[collection]
+    const bootstrapping = feed.since === null
+    let hasMore = true
+    while (hasMore) {
+      const response = collection === 'queries'
+        ? await ApiService.getChanges<Query>('queries', feed.since, feed.etag)
+        : await ApiService.getChanges<Answer>('answers', feed.since, feed.etag)
+      if (!response.success || !response.data) return
+      const { changes, watermark, has_more, etag } = response.data
+      feed.since = watermark
+      feed.etag = etag
+      hasMore = has_more
+      if (bootstrapping || changes.length === 0) continue
+      if (collection === 'queries') {
+        setQueryLists(prev => applyQueryChanges(prev, changes as Query[]))
+      } else {
+        setAllAnswers(prev => mergeById(prev, changes as Answer[], a => a.id))
+      }
+    }
+  }
+
+  // Pass a cursor to append the next page; without one the list restarts from the newest
+  const loadQueries = async (status: QueryStatus, cursor: string | null = null) => {
     setLoading(true)
     setError(null)
     try {
-      const response = await ApiService.getAllQueries()
+      const response = await ApiService.getAllQueries({ status, cursor })
       if (response.success && response.data) {
-        setQueries(response.data)
+        const page = response.data
+        setQueryLists(prev => {
+          // the change feed may already have placed some of this page
+          const kept = cursor ? prev[status].items : []
+          const seen = new Set(kept.map(q => q.query_id))
+          const items = [...kept, ...page.items.filter(q => !seen.has(q.query_id))]
+          return { ...prev, [status]: { items, cursor: page.next_cursor } }
+        })
       } else {
         setError(response.error || 'Failed to load queries')
       }
@@ -43,6 +142,8 @@ function App() {
       setLoading(false)
     }
   }
+
+  const loadAllQueries = () => Promise.all(QUERY_STATUSES.map(status => loadQueries(status)))
   
   const getAnswer = async (query?: Query) => {
     const targetQuery = query || selectedQuery
@@ -66,13 +167,15 @@ function App() {
     }
   }
 
-  const loadAllAnswers = async () => {
+  const loadAllAnswers = async (cursor: string | null = null) => {
     setLoadingAllAnswers(true)
     setError(null)
     try {
-      const response = await ApiService.getAllAnswers()
+      const response = await ApiService.getAllAnswers({ cursor })
       if (response.success && response.data) {
-        setAllAnswers(response.data)
+        const page = response.data
+        setAllAnswers(prev => cursor ? [...prev, ...page.items] : page.items)
+        setAnswersCursor(page.next_cursor)
       } else {
         setError(response.error || 'Failed to load all answers')
       }
@@ -117,7 +220,8 @@ function App() {
       if (response.success) {
         setAnswerText('')
         setSelectedQuery(null)
-        loadQueries() // Reload queries
+        loadQueries('pending') // Reload queries
+        loadQueries('resolved')
       } else {
         setError(response.error || 'Failed to submit answer')
       }
@@ -128,18 +232,14 @@ function App() {
     }
   }
 
-  const filteredQueries = queries.filter(query => {
-    switch (activeTab) {
-      case 'pending':
-        return query.status === 'pending'
-      case 'resolved':
-        return query.status === 'resolved'
-      case 'unresolved':
-        return query.status === 'unresolved'
-      default:
-        return true
-    }
-  })
+  // duplicates are resolved together with their cluster root
+  const visibleQueries = (status: QueryStatus) =>
+    queryLists[status].items.filter(q => status !== 'pending' || !q.duplicate_of)
+  // "100+" while there are pages the dashboard hasn't loaded yet
+  const tabCount = (count: number, cursor: string | null) => cursor ? `${count}+` : `${count}`
+
+  const activeList = activeTab === 'allanswers' ? null : queryLists[activeTab]
+  const filteredQueries = activeTab === 'allanswers' ? [] : visibleQueries(activeTab)
 
   const getStatusColor = (status: string) => {
     switch (status) {
@@ -195,10 +295,10 @@ function App() {
         borderBottom: '2px solid #e9ecef'
       }}>
         {[
-          { key: 'pending', label: 'Pending Requests', count: queries.filter(q => q.status === 'pending').length },
-          { key: 'resolved', label: 'Resolved', count: queries.filter(q => q.status === 'resolved').length },
-          { key: 'unresolved', label: 'Unresolved', count: queries.filter(q => q.status === 'unresolved').length },
-          { key: 'allanswers', label: 'Learned Answers', count: allAnswers.length }
+          { key: 'pending', label: 'Pending Requests', count: tabCount(visibleQueries('pending').length, queryLists.pending.cursor) },
+          { key: 'resolved', label: 'Resolved', count: tabCount(queryLists.resolved.items.length, queryLists.resolved.cursor) },
+          { key: 'unresolved', label: 'Unresolved', count: tabCount(queryLists.unresolved.items.length, queryLists.unresolved.cursor) },
+          { key: 'allanswers', label: 'Learned Answers', count: tabCount(allAnswers.length, answersCursor) }
         ].map(tab => (
           <button
             key={tab.key}
@@ -226,7 +326,7 @@ function App() {
         
         <button 
           onClick={()=>{
-            loadQueries()
+            loadAllQueries()
             loadAllAnswers()}}
           disabled={loading}
           style={{
@@ -310,13 +410,30 @@ function App() {
                       </div>
                     </div>
                   ))}
+                  {answersCursor && (
+                    <button
+                      onClick={() => loadAllAnswers(answersCursor)}
+                      disabled={loadingAllAnswers}
+                      style={{
+                        width: '100%',
+                        padding: '10px',
+                        margin: '8px 0',
+                        backgroundColor: '#f8f9fa',
+                        border: '1px solid #ddd',
+                        borderRadius: '6px',
+                        cursor: loadingAllAnswers ? 'not-allowed' : 'pointer'
+                      }}
+                    >
+                      {loadingAllAnswers ? 'Loading...' : 'Load more'}
+                    </button>
+                  )}
                 </div>
               )}
             </>
           ) : (
             // Original Queries Content
             <>
-              {filteredQueries.length === 0 ? (
+              {filteredQueries.length === 0 && !activeList?.cursor ? (
             <div style={{ 
               textAlign: 'center', 
               padding: '40px',
@@ -354,6 +471,11 @@ function App() {
                     <div style={{ flex: 1 }}>
                       <div style={{ fontWeight: 'bold', marginBottom: '4px' }}>
                         {query.query}
+                        {query.status === 'pending' && !!query.duplicates && (
+                          <span style={{ marginLeft: '8px', fontSize: '12px', color: '#666', fontWeight: 'normal' }}>
+                            +{query.duplicates} similar
+                          </span>
+                        )}
                       </div>
                       <div style={{ fontSize: '14px', color: '#666' }}>
                         <strong>User:</strong> {query.user_id} | 
@@ -380,6 +502,23 @@ function App() {
                   </div>
                 </div>
               ))}
+              {activeList?.cursor && (
+                <button
+                  onClick={() => loadQueries(activeTab as QueryStatus, activeList.cursor)}
+                  disabled={loading}
+                  style={{
+                    width: '100%',
+                    padding: '10px',
+                    margin: '8px 0',
+                    backgroundColor: '#f8f9fa',
+                    border: '1px solid #ddd',
+                    borderRadius: '6px',
+                    cursor: loading ? 'not-allowed' : 'pointer'
+                  }}
+                >
+                  {loading ? 'Loading...' : 'Load more'}
+                </button>
+              )}
             </div>
           )}
             </>
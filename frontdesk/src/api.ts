@@ -7,7 +7,10 @@ import type {
   CreateAnswerRequest,
   VectorSearchRequest,
   ApiResponse,
-  Answer
+  Answer,
+  ListOptions,
+  Page,
+  ChangeSet
 } from './types';
 
 // API Service class for Firebase Functions
@@ -60,15 +63,15 @@ export class ApiService {
     }
   }
 
-  // Get all queries
-  static async getAllQueries(): Promise<ApiResponse<Query[]>> {
+  // Get one page of queries, newest first (pass next_cursor back as cursor for more)
+  static async getAllQueries(options: ListOptions = {}): Promise<ApiResponse<Page<Query>>> {
     try {
       const getAllQueries = httpsCallable(functions, 'getallqueries');
-      const result = await getAllQueries();
-      console.log(result.data);
+      const result = await getAllQueries(options);
+      const data = result.data as { queries: Query[]; next_cursor: string | null };
       return {
         success: true,
-        data: (result.data as { queries: Query[] }).queries
+        data: { items: data.queries, next_cursor: data.next_cursor }
       };
     } catch (error) {
       console.error('Error getting all queries:', error);
@@ -130,15 +133,15 @@ export class ApiService {
     }
   }
 
-  // Get all answers
-  static async getAllAnswers(): Promise<ApiResponse<Answer[]>> {
+  // Get one page of answers, newest first (pass next_cursor back as cursor for more)
+  static async getAllAnswers(options: ListOptions = {}): Promise<ApiResponse<Page<Answer>>> {
     try {
       const getAllAnswers = httpsCallable(functions, 'getallanswers');
-      const result = await getAllAnswers();
-      console.log(result.data);
+      const result = await getAllAnswers(options);
+      const data = result.data as { answers: Answer[]; next_cursor: string | null };
       return {
         success: true,
-        data: (result.data as { answers: Answer[] }).answers
+        data: { items: data.answers, next_cursor: data.next_cursor }
       };
     } catch (error) {
       console.error('Error getting all answers:', error);
@@ -148,6 +151,44 @@ export class ApiService {
       };
     }
   }
+  // Fetch documents updated after `since`; data is null when the server answers 304 (no changes)
+  static async getChanges<T>(
+    collection: 'queries' | 'answers',
+    since: string | null,
+    etag: string | null
+  ): Promise<ApiResponse<ChangeSet<T> | null>> {
+    try {
+      const params = new URLSearchParams({ collection });
+      if (since) params.set('since', since);
+      const res = await fetch(
+        `http://localhost:5001/frontdeskdemo-will/us-central1/getchanges?${params}`,
+        {
+          method: "GET",
+          headers: etag ? { "If-None-Match": etag } : {},
+        }
+      );
+
+      if (res.status === 304) {
+        return { success: true, data: null };
+      }
+      if (!res.ok) {
+        return { success: false, error: await res.text() };
+      }
+
+      const result = await res.json();
+      return {
+        success: true,
+        data: { ...result, etag: res.headers.get('ETag') } as ChangeSet<T>
+      };
+    } catch (error) {
+      console.error("Error getting changes:", error);
+      return {
+        success: false,
+        error: error instanceof Error ? error.message : "Unknown error",
+      };
+    }
+  }
+
   // Perform vector search
   static async vectorSearch(request: VectorSearchRequest): Promise<ApiResponse<VectorSearchResult[]>> {
     try {
@@ -13,6 +13,8 @@ export interface Query {
   answer_id?: string;
   resolved_by?: string;
   last_response_at?: string;
+  duplicate_of?: string;
+  duplicates?: number;
 }
 
 export interface Answer {
@@ -53,6 +55,30 @@ export interface VectorSearchRequest {
   top_k?: number;
 }
 
+export interface ListOptions {
+  limit?: number;
+  cursor?: string | null;
+  fields?: string[];
+  status?: Query['status'];
+  room_name?: string;
+  user_id?: string;
+  query_id?: string;
+  created_after?: string;
+  created_before?: string;
+}
+
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
+export interface ChangeSet<T> {
+  changes: T[];
+  watermark: string | null;
+  has_more: boolean;
+  etag: string | null;
+}
+
 export interface ApiResponse<T> {
   success: boolean;
   data?: T;